@@ -4,23 +4,45 @@ Flask API Server for Global Customer Support Demo
 Provides REST endpoints for React frontend integration.
 """
 
+import os
 import json
+import hmac
+import math
 from datetime import datetime
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-from dataclasses import asdict
+from dataclasses import asdict, fields as dataclass_fields
+from routing import REGION_ENDPOINTS
+from identifiers import new_ulid
+from rate_limiting import RateLimiter
+from warmup import warmup_enabled
+import profiling
+import customer_ingest
 from customer_support import (
     GlobalCustomerSupportService,
     CustomerService,
+    Customer,
     SupportQuery,
     CollaborationLog
 )
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for React frontend
+CORS(app, expose_headers=['X-Stream-Id', 'X-Single-Flight', 'Retry-After'])  # Enable CORS for React frontend
+
+# Compact record mode keeps large customer bases in columnar arrays
+if os.getenv('CUSTOMER_RECORD_MODE') == 'compact':
+    CustomerService.use_compact_records()
+
+# Customer exports to load at startup, on top of the built-in demo customers
+if os.getenv('CUSTOMER_IMPORT_CUSTOMERS') or os.getenv('CUSTOMER_IMPORT_PURCHASES'):
+    startup_import = customer_ingest.ingest_files(os.getenv('CUSTOMER_IMPORT_CUSTOMERS'), os.getenv('CUSTOMER_IMPORT_PURCHASES')).as_dict()
+    print(f"📥 Imported {startup_import['rows']:,} customer rows at {startup_import['rows_per_second']:,} rows/s")
 
 # Initialize the customer support service
 support_service = GlobalCustomerSupportService()
+rate_limiter = RateLimiter.from_env()
+# Prime every endpoint before the first ticket; /api/ready reports not-ready until this ends
+warmup = support_service.warm_up() if warmup_enabled() else None
 
 
 @app.route('/api/health', methods=['GET'])
@@ -32,24 +54,219 @@ def health_check():
         'services': {
             'us_agent': 'active',
             'eu_agent': 'active'
-        }
+        },
+        'single_flight': support_service.flights.stats(),
+        'endpoint_slots': support_service.endpoint_slots.stats(),
+        'cascade': support_service.cascade.stats(),
+        'overload': support_service.overload.stats(),
+        'rate_limiting': rate_limiter.stats(),
+        'warmup': warmup.report() if warmup else None,
+        'llm_cassette': support_service.cassette.stats() if support_service.cassette else None
     })
 
 
-@app.route('/api/customers', methods=['GET'])
-def get_customers():
-    """Get all customers."""
-    region = request.args.get('region')
+def admin_authorized():
+    """Admin endpoints exist only when ADMIN_TOKEN is set, and need it in X-Admin-Token."""
+    admin_token = os.getenv('ADMIN_TOKEN')
+    return bool(admin_token) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token)
+
+
+@app.after_request
+def count_profiled_request(response):
+    """Let a running profiling session count support requests; a no-op otherwise."""
+    session = profiling.active()
+    if session is not None and request.path.startswith('/api/support/'):
+        # On close, so streamed responses count once their last event is sent
+        response.call_on_close(session.request_finished)
+    return response
+
+
+@app.route('/api/admin/profile', methods=['POST'])
+def profile_requests():
+    """
+    Profile the next `requests` support requests, or a window of `seconds`, in `wall` or `cpu`
+    mode; returns collapsed stacks. Only available when ADMIN_TOKEN is set, via X-Admin-Token.
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Not found'}), 404
     
-    if region:
-        customers = CustomerService.get_customers_by_region(region.upper())
-    else:
-        customers = CustomerService.CUSTOMERS
+    data = request.get_json(silent=True) or {}
+    try:
+        requests_to_profile = int(data['requests']) if 'requests' in data else None
+        seconds = float(data['seconds']) if 'seconds' in data else (None if requests_to_profile is not None else 10.0)
+        session = profiling.ProfileSession(
+            mode=data.get('mode', 'wall'),
+            requests=requests_to_profile,
+            seconds=seconds,
+            interval_ms=float(data.get('interval_ms', 10.0))
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify({
-        'customers': [asdict(customer) for customer in customers],
-        'count': len(customers)
+    try:
+        stacks = profiling.profile(session)
+    except profiling.ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+    return Response(stacks, mimetype='text/plain', headers={
+        'X-Profile-Mode': session.profiler.mode,
+        'X-Profile-Samples': str(session.profiler.samples),
+        'X-Profile-Requests': str(session.finished_requests),
+        'X-Profile-Seconds': f"{session.duration:.2f}"
+    })
+
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 503 until endpoint warm-up has finished or timed out."""
+    if warmup is not None and not warmup.ready:
+        return jsonify({'ready': False, 'warmup': warmup.report()}), 503
+    return jsonify({'ready': True, 'warmup': warmup.report() if warmup else None})
+
+
+def rate_limited(customer_id):
+    """429 if the customer, the API key (or client address) or the region is over quota; None to proceed."""
+    customer = CustomerService.get_customer_by_id(customer_id)
+    decision = rate_limiter.check(
+        customer_id if customer else 'unknown',  # unknown ids share one bucket rather than minting new ones
+        customer.tier if customer else None,
+        rate_limiter.client_key(request.headers.get('X-API-Key'), request.remote_addr),
+        customer.region if customer else 'US'
+    )
+    if decision.allowed:
+        return None
+    response = jsonify({
+        'error': 'Rate limit exceeded',
+        'limited_by': [key.partition(':')[0] for key in decision.limited_by],
+        'retry_after': round(decision.retry_after, 3)
     })
+    response.headers['Retry-After'] = decision.retry_after_header
+    return response, 429
+
+
+def overloaded():
+    """503 for a ticket arriving while the overload controller is shedding load."""
+    response = jsonify({
+        'error': 'Support service is overloaded, please retry later',
+        'degradation': support_service.overload.stats()
+    })
+    response.headers['Retry-After'] = str(support_service.overload.retry_after())
+    return response, 503
+
+
+SSE_KEEPALIVE_SECONDS = 15
+SSE_RETRY_MS = 3000
+MAX_SIMULATION_PACING = 10.0  # simulations are not rate-limited, so their duration is capped
+
+
+def event_stream(flight, start=0, progressive=True, headers=None):
+    """
+    Serve a pipeline flight as Server-Sent Events. Event ids are `<stream id>:<index>`
+    so clients can resume with Last-Event-ID; comments keep idle connections open.
+    """
+    return sse_response(flight.id, flight.follow(start, keepalive=SSE_KEEPALIVE_SECONDS), progressive, headers)
+
+
+def sse_response(stream_id, events, progressive=True, headers=None):
+    """Serve (index, event) pairs as Server-Sent Events; a None event is sent as a keepalive comment."""
+    def generate():
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        for index, event in events:
+            if event is None:
+                yield ": keepalive\n\n"
+            elif progressive or event.get('type') != 'provisional':
+                yield f"id: {stream_id}:{index}\ndata: {json.dumps(event)}\n\n"
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            'X-Stream-Id': stream_id,
+            **(headers or {})
+        }
+    )
+
+
+CUSTOMER_FIELDS = [f.name for f in dataclass_fields(Customer)]
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def parse_bool_arg(value):
+    """Parse a boolean query-string value, returning None when absent."""
+    if value is None:
+        return None
+    if value.lower() in ('true', '1', 'yes'):
+        return True
+    if value.lower() in ('false', '0', 'no'):
+        return False
+    raise ValueError(f'Invalid boolean value: {value}')
+
+
+def project_customer(customer, fields):
+    """Serialize only the requested customer fields (all fields when None)."""
+    if fields is None:
+        return asdict(customer)
+    projected = {}
+    for field in fields:
+        value = getattr(customer, field)
+        projected[field] = [asdict(p) for p in value] if field == 'purchases' else value
+    return projected
+
+
+@app.route('/api/customers', methods=['GET'])
+def get_customers():
+    """List customers with cursor pagination, filtering and field projection."""
+    try:
+        filters = {
+            'region': request.args.get('region', '').upper() or None,
+            'tier': request.args.get('tier') or None,
+            'language': request.args.get('language') or None,
+            'gdpr_consent': parse_bool_arg(request.args.get('gdpr_consent')),
+        }
+        
+        fields = None
+        if request.args.get('fields'):
+            fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+            unknown = [f for f in fields if f not in CUSTOMER_FIELDS]
+            if unknown:
+                return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+        
+        cursor = request.args.get('cursor')
+        stream = request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson'
+        limit_arg = request.args.get('limit')
+        limit = int(limit_arg) if limit_arg else (None if stream else DEFAULT_PAGE_SIZE)
+        if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+        
+        if stream:
+            # Validate the cursor before the response starts streaming
+            matches = CustomerService.iter_customers(cursor=cursor, **filters)
+            first = next(matches, None)
+            
+            def generate_customers():
+                """Stream one JSON customer per line, ending with the next cursor if paginated."""
+                customer, sent = first, 0
+                while customer is not None:
+                    if limit is not None and sent == limit:
+                        yield json.dumps({'next_cursor': CustomerService.encode_cursor(last_id)}) + '\n'
+                        return
+                    yield json.dumps(project_customer(customer, fields)) + '\n'
+                    last_id, sent = customer.id, sent + 1
+                    customer = next(matches, None)
+            
+            return Response(generate_customers(), mimetype='application/x-ndjson')
+        
+        customers, next_cursor = CustomerService.page_customers(limit, cursor=cursor, **filters)
+        return jsonify({
+            'customers': [project_customer(customer, fields) for customer in customers],
+            'count': len(customers),
+            'next_cursor': next_cursor
+        })
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
 
 @app.route('/api/customers/<customer_id>', methods=['GET'])
@@ -63,6 +280,65 @@ def get_customer(customer_id):
     return jsonify({'customer': asdict(customer)})
 
 
+@app.route('/api/customers/<customer_id>/analytics', methods=['GET'])
+def get_customer_analytics(customer_id):
+    """Get purchase-derived metrics for a specific customer."""
+    if not CustomerService.get_customer_by_id(customer_id):
+        return jsonify({'error': 'Customer not found'}), 404
+    
+    metrics = CustomerService.analytics().metrics(customer_id)
+    return jsonify({'analytics': asdict(metrics)})
+
+
+@app.route('/api/customers/<customer_id>/purchases', methods=['POST'])
+def add_customer_purchase(customer_id):
+    """Record a purchase (replacing one with the same id) and update the customer's analytics."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    
+    try:
+        _, purchase = customer_ingest.parse_purchase(data, customer_id)
+    except (customer_ingest.RowError, TypeError) as e:
+        return jsonify({'error': f'Invalid purchase: {e}'}), 400
+    
+    inserted = CustomerService.record_purchase(customer_id, purchase)
+    if inserted is None:
+        return jsonify({'error': 'Customer not found'}), 404
+    
+    return jsonify({
+        'purchase': asdict(purchase),
+        'analytics': asdict(CustomerService.analytics().metrics(customer_id))
+    }), 201 if inserted else 200
+
+
+@app.route('/api/customers/import', methods=['POST'])
+def import_customers():
+    """
+    Stream a CSV or JSONL export of customers or purchases into the customer store.
+    The body is parsed as it arrives and upserted in batches; answers with the ingestion report.
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Not found'}), 404
+    
+    kind = request.args.get('kind', 'customers')
+    fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'jsonl')
+    try:
+        batch_size = int(request.args.get('batch_size', customer_ingest.DEFAULT_BATCH_SIZE))
+        if batch_size < 1:
+            raise ValueError('batch_size must be positive')
+        report = customer_ingest.ingest(customer_ingest.text_stream(request.stream), kind, fmt, batch_size)
+    except (UnicodeDecodeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'report': report.as_dict()})
+
+
+@app.route('/api/analytics/summary', methods=['GET'])
+def get_analytics_summary():
+    """Get purchase analytics totals across all customers."""
+    return jsonify({'summary': CustomerService.analytics().summary()})
+
+
 @app.route('/api/support/query', methods=['POST'])
 def submit_support_query():
     """Submit a customer support query with real-time step-by-step processing."""
@@ -77,7 +353,7 @@ def submit_support_query():
         
         # Create support query
         query = SupportQuery(
-            id=f"q-{int(datetime.now().timestamp())}",
+            id=f"q-{new_ulid()}",
             customer_id=data['customer_id'],
             message=data['message'],
             timestamp=datetime.now().isoformat(),
@@ -85,6 +361,12 @@ def submit_support_query():
             category=data['category']
         )
         
+        limited = rate_limited(query.customer_id)
+        if limited:
+            return limited
+        if support_service.overload.rejecting():
+            return overloaded()
+        
         # Use real LLM processing with actual agent collaboration
         collaboration = support_service.process_query(query)
         
@@ -95,7 +377,10 @@ def submit_support_query():
                 'query_id': collaboration.query_id,
                 'steps': [asdict(step) for step in collaboration.steps],
                 'final_response': collaboration.final_response,
-                'processing_time': collaboration.processing_time
+                'processing_time': collaboration.processing_time,
+                'routing': collaboration.routing,
+                'topology': collaboration.topology,
+                'instrumentation': collaboration.instrumentation
             },
             'query': asdict(query),
             'customer': asdict(CustomerService.get_customer_by_id(query.customer_id))
@@ -121,7 +406,7 @@ def submit_support_query_stream():
         
         # Create support query
         query = SupportQuery(
-            id=f"q-{int(datetime.now().timestamp())}",
+            id=f"q-{new_ulid()}",
             customer_id=data['customer_id'],
             message=data['message'],
             timestamp=datetime.now().isoformat(),
@@ -129,24 +414,55 @@ def submit_support_query_stream():
             category=data['category']
         )
         
-        def generate_steps():
-            """Generator function for streaming collaboration steps."""
-            for step_data in support_service.process_query_stream(query):
-                yield f"data: {json.dumps(step_data)}\n\n"
+        # Simulation mode replays the demo collaboration without LLM calls; pacing 0 is instant
+        if data.get('mode') == 'simulation':
+            try:
+                pacing = float(data.get('pacing', 1.0))
+            except (TypeError, ValueError):
+                return jsonify({'error': 'pacing must be a number'}), 400
+            if not math.isfinite(pacing):
+                return jsonify({'error': 'pacing must be finite'}), 400
+            pacing = min(max(pacing, 0.0), MAX_SIMULATION_PACING)
+            # Served straight from the generator: no pipeline thread, grace timer or replay buffer,
+            # so simulation streams cannot be resumed; the client disconnecting closes the generator
+            events = enumerate(support_service.simulate_query_stream(query, pacing))
+            return sse_response(query.id, events, headers={'X-Single-Flight': 'none'})
         
-        return Response(
-            generate_steps(),
-            mimetype='text/plain',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive',
-            }
+        limited = rate_limited(query.customer_id)
+        if limited:
+            return limited
+        if support_service.overload.rejecting():
+            return overloaded()
+        
+        # Identical in-flight queries share one pipeline run
+        flight, joined = support_service.query_flight(query)
+        return event_stream(
+            flight,
+            progressive=bool(data.get('progressive', False)),
+            headers={'X-Single-Flight': 'coalesced' if joined else 'leader'}
         )
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/support/query-stream/<stream_id>', methods=['GET'])
+def resume_support_query_stream(stream_id):
+    """Reattach to a running or recently finished stream, resuming after Last-Event-ID."""
+    flight = support_service.flights.get(stream_id)
+    if flight is None:
+        return jsonify({'error': 'Stream not found or expired'}), 404
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    start = 0
+    if last_event_id:
+        flight_id, _, index = last_event_id.rpartition(':')
+        if flight_id != stream_id or not index.isdigit():
+            return jsonify({'error': f'Invalid Last-Event-ID: {last_event_id}'}), 400
+        start = int(index) + 1
+    return event_stream(flight, start=start, progressive=parse_bool_arg(request.args.get('progressive')) is not False)
+
+
 @app.route('/api/support/sample-queries', methods=['GET'])
 def get_sample_queries():
     """Get sample support queries for testing."""
@@ -215,21 +531,27 @@ def get_agents_status():
         'agents': {
             'us_agent': {
                 'role': support_service.us_agent.role,
-                'endpoint': 'http://20.185.179.136:61100/v1',
+                'endpoint': REGION_ENDPOINTS['US'],
                 'status': 'active',
                 'region': 'US'
             },
             'eu_agent': {
                 'role': support_service.eu_agent.role,
-                'endpoint': 'http://9.163.149.120:61102/v1',
+                'endpoint': REGION_ENDPOINTS['EU'],
+                'status': 'active',
+                'region': 'EU'
+            },
+            'eu_support_agent': {
+                'role': support_service.eu_support_agent.role,
+                'endpoint': REGION_ENDPOINTS['EU'],
                 'status': 'active',
                 'region': 'EU'
             }
         },
         'collaboration_flow': [
-            'US Agent analyzes incoming query',
-            'EU Agent handles GDPR-compliant data access (if EU customer)',
-            'US Agent generates personalized response using all available context'
+            'Support agent in the customer\'s data region analyzes the incoming query',
+            'EU Agent handles GDPR-compliant data access (EU customers, or US tickets touching EU data)',
+            'Support agent in the customer\'s data region generates the personalized response'
         ]
     })
 
@@ -248,8 +570,8 @@ def internal_error(error):
 
 if __name__ == '__main__':
     print("🚀 Starting Global Customer Support API Server...")
-    print("🇺🇸 US Agent: http://20.185.179.136:61100/v1")
-    print("🇪🇺 EU Agent: http://9.163.149.120:61102/v1")
+    print(f"🇺🇸 US Agent: {REGION_ENDPOINTS['US']}")
+    print(f"🇪🇺 EU Agent: {REGION_ENDPOINTS['EU']}")
     print("🌐 API Server: http://localhost:5001")
     print("-" * 50)
     
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Customer Record Memory Benchmark
+Compares resident memory of the customer store representations at scale.
+
+Usage: uv run benchmarks/customer_memory.py [--customers 1000000] [--purchases 2]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, fields, make_dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from customer_support import Customer, CustomerStore, Purchase
+from customer_store import ColumnarCustomerStore
+
+REGIONS = ["US", "EU"]
+TIERS = ["Bronze", "Silver", "Gold", "Platinum"]
+LANGUAGES = ["English", "German", "French", "Italian"]
+CHANNELS = ["email", "phone", "chat"]
+PRODUCTS = ["Enterprise Security Suite", "Compliance Module", "Advanced Threat Detection", "Starter Security Tools"]
+
+# The pre-slots record layout: identical fields, but with a per-instance __dict__
+DictPurchase = make_dataclass("DictPurchase", [(f.name, f.type) for f in fields(Purchase)])
+DictCustomer = make_dataclass("DictCustomer", [(f.name, f.type) for f in fields(Customer)])
+
+
+def synthetic_customers(count, purchases_per_customer, customer_cls=Customer, purchase_cls=Purchase):
+    """Yield deterministic synthetic customers."""
+    for i in range(count):
+        yield customer_cls(
+            id=f"cust-{i:08d}",
+            name=f"Customer {i}",
+            email=f"customer{i}@example.com",
+            region=REGIONS[i % 2],
+            tier=TIERS[i % 4],
+            language=LANGUAGES[i % 4],
+            gdpr_consent=bool(i % 3),
+            last_contact=f"2024-09-{1 + i % 28:02d}T{i % 24:02d}:30:00Z",
+            preferred_channel=CHANNELS[i % 3],
+            purchases=[
+                purchase_cls(f"p{i}-{j}", PRODUCTS[(i + j) % 4], 100.0 * (j + 1), f"2024-08-{1 + (i + j) % 28:02d}", "completed")
+                for j in range(purchases_per_customer)
+            ]
+        )
+
+
+def measure(label, build):
+    """Build a store under tracemalloc and report retained memory and build time."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    store = build()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {retained / 2**20:>10.1f} MiB {elapsed:>9.1f} s")
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--purchases", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"📊 {args.customers:,} customers × {args.purchases} purchases")
+    print(f"{'representation':<28} {'memory':>14} {'build':>11}")
+    print("-" * 55)
+
+    measure("dataclass (__dict__)", lambda: list(
+        synthetic_customers(args.customers, args.purchases, DictCustomer, DictPurchase)))
+    slotted = measure("dataclass (slots)", lambda: CustomerStore(
+        synthetic_customers(args.customers, args.purchases)))
+    columnar = measure("columnar arrays", lambda: ColumnarCustomerStore(
+        synthetic_customers(args.customers, args.purchases)))
+
+    # Materialization must be lossless
+    probe = f"cust-{args.customers // 2:08d}"
+    assert asdict(slotted.get(probe)) == asdict(columnar.get(probe))
+    print("✓ columnar records materialize to identical JSON")
+
+
+if __name__ == "__main__":
+    main()
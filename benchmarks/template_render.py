@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Response Template Microbenchmark
+Measures the per-response cost of the template catalog with warm and cold segment caches.
+
+Usage: uv run benchmarks/template_render.py [--responses 200000]
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("GDPR_AUDIT_LOG", "")
+
+from customer_support import AgentResponse, Customer, GlobalCustomerSupportService, SupportQuery
+from response_templates import TemplateCatalog
+
+LANGUAGES = ["English", "German", "French", "Italian"]
+CATEGORIES = ["technical", "billing", "general", "complaint"]
+TIERS = ["Bronze", "Silver", "Gold", "Platinum"]
+CHANNELS = ["email", "phone", "chat"]
+REGIONS = ["US", "EU"]
+
+
+def segments():
+    """Every (language, category, tier, channel, region, eu_collaboration) combination."""
+    return list(itertools.product(LANGUAGES, CATEGORIES, TIERS, CHANNELS, REGIONS, [True, False]))
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--responses", type=int, default=200_000)
+    args = parser.parse_args()
+
+    combos = segments()
+    catalog = TemplateCatalog()
+
+    def warm(i):
+        language, category, tier, channel, region, eu = combos[i % len(combos)]
+        catalog.render(language, category, tier, channel, region, eu, f"Customer {i}", "Compliance Module")
+
+    def cold(i):
+        catalog._skeletons.clear()
+        warm(i)
+
+    # The full service path, including the analytics lookup for the last product
+    service = object.__new__(GlobalCustomerSupportService)
+    service.templates = catalog
+    customers = [
+        Customer(f"cust-{i}", f"Customer {i}", "c@example.com", region, tier, language, True, "2024-01-01T00:00:00Z", channel, [])
+        for i, (language, _, tier, channel, region, _) in enumerate(combos)
+    ]
+    queries = [SupportQuery("q", c.id, "Help", "2024-01-01T00:00:00Z", "medium", combo[1]) for c, combo in zip(customers, combos)]
+    steps = {eu: [AgentResponse("EU" if eu else "US", "", "")] for eu in (True, False)}
+
+    def service_path(i):
+        j = i % len(combos)
+        service.generate_enhanced_personalized_response(queries[j], customers[j], steps[combos[j][5]])
+
+    print(f"{len(combos)} segments, {args.responses:,} responses per measurement")
+    print(f"{'Path':<40}{'µs/response':>12}")
+    for label, fn in (
+        ("catalog.render, warm segment cache", warm),
+        ("catalog.render, cold (rebuild skeleton)", cold),
+        ("generate_enhanced_personalized_response", service_path),
+    ):
+        print(f"{label:<40}{per_call_us(fn, args.responses):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
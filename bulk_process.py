@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Bulk Ticket Processor
+Processes SupportQuery records from a JSONL file with bounded per-region parallelism,
+appending CollaborationLog results to an output JSONL and checkpointing progress so an
+interrupted run resumes without repeating finished tickets.
+
+Usage: uv run bulk_process.py tickets.jsonl results.jsonl [--workers-per-region 2] [--mode llm|simulation]
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from customer_support import CustomerService, GlobalCustomerSupportService, SupportQuery
+from warmup import warmup_enabled
+
+REGIONS = ["US", "EU"]
+
+
+class Checkpoint:
+    """
+    Progress of a bulk run: every input line below `next_line` is done, as are the lines in `done`.
+    Only lines finished ahead of an unfinished one are kept in `done`, so the checkpoint stays small.
+    Lines in `failed` were finished with an error, such as an endpoint outage, and run again on resume.
+    """
+
+    def __init__(self, path: str, next_line: int = 0, done: Optional[Set[int]] = None, output_bytes: int = 0, failed: Optional[Set[int]] = None):
+        self.path = path
+        self.next_line = next_line
+        self.done = done or set()
+        self.output_bytes = output_bytes
+        self.failed = failed or set()
+
+    @classmethod
+    def load(cls, path: str) -> "Checkpoint":
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path) as f:
+            state = json.load(f)
+        return cls(path, state["next_line"], set(state["done"]), state["output_bytes"], set(state.get("failed", [])))
+
+    @property
+    def finished(self) -> int:
+        return self.next_line + len(self.done) - len(self.failed)
+
+    def is_done(self, line: int) -> bool:
+        return (line < self.next_line or line in self.done) and line not in self.failed
+
+    def mark(self, line: int, output_bytes: int, failed: bool = False) -> None:
+        if failed:
+            self.failed.add(line)
+        else:
+            self.failed.discard(line)
+        if line >= self.next_line:  # a retried line was already passed over on its first run
+            self.done.add(line)
+        while self.next_line in self.done:
+            self.done.remove(self.next_line)
+            self.next_line += 1
+        self.output_bytes = output_bytes
+
+    def save(self) -> None:
+        # Write-then-rename, so a kill mid-save leaves the previous checkpoint intact
+        state = {"next_line": self.next_line, "done": sorted(self.done), "output_bytes": self.output_bytes, "failed": sorted(self.failed)}
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def read_queries(path: str, checkpoint: Checkpoint) -> Iterator[Tuple[int, Optional[SupportQuery], Optional[str]]]:
+    """(line number, query, parse error) for each unfinished line, read lazily; blank lines have neither."""
+    with open(path) as f:
+        for line_number, line in enumerate(f):
+            if checkpoint.is_done(line_number):
+                continue
+            if not line.strip():
+                yield line_number, None, None
+                continue
+            try:
+                record = json.loads(line)
+                yield line_number, SupportQuery(
+                    id=record.get("id") or f"bulk-{line_number}",
+                    customer_id=record["customer_id"],
+                    message=record["message"],
+                    timestamp=record.get("timestamp") or datetime.now().isoformat(),
+                    priority=record.get("priority", "medium"),
+                    category=record.get("category", "general")
+                ), None
+            except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+                yield line_number, None, f"invalid ticket record: {e!r}"
+
+
+def run(input_path: str, output_path: str, checkpoint_path: str, workers_per_region: int = 2, mode: str = "llm") -> Dict[str, int]:
+    service = GlobalCustomerSupportService()
+    process = service.process_query if mode == "llm" else service.process_query_with_demo_steps
+    if mode == "llm" and warmup_enabled():
+        service.warm_up().wait()
+    checkpoint = Checkpoint.load(checkpoint_path)
+    counts = {"processed": 0, "errors": 0, "skipped": checkpoint.finished}
+    started = time.perf_counter()
+
+    # Drop results written after the last checkpoint; those tickets are not marked done and run again
+    with open(output_path, "a") as output:
+        output.truncate(checkpoint.output_bytes)
+    output = open(output_path, "a")
+
+    executors = {region: ThreadPoolExecutor(workers_per_region, thread_name_prefix=f"bulk-{region}") for region in REGIONS}
+    window = 2 * workers_per_region * len(REGIONS)  # tickets read ahead; bounds memory
+    pending: Dict[Future, int] = {}
+
+    def finish(line_number: int, record: Dict, failed: bool = False) -> None:
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+        checkpoint.mark(line_number, output.tell(), failed)
+        checkpoint.save()
+        counts["processed"] += 1
+        if counts["processed"] % 10 == 0:
+            rate = counts["processed"] / (time.perf_counter() - started)
+            print(f"✅ {counts['processed']} tickets processed ({counts['errors']} errors), {rate:.1f} tickets/s")
+
+    def drain(return_when) -> None:
+        finished, _ = wait(list(pending), return_when=return_when)
+        for future in finished:
+            line_number = pending.pop(future)
+            try:
+                log = future.result()
+                record = asdict(log)
+                failed = log.id.startswith("error-")  # the pipeline failed or was cancelled
+            except Exception as e:
+                record = {"line": line_number, "error": str(e)}
+                failed = True
+            if failed:
+                counts["errors"] += 1
+            finish(line_number, record, failed)
+
+    try:
+        for line_number, query, error in read_queries(input_path, checkpoint):
+            if query is None and error is None:
+                checkpoint.mark(line_number, checkpoint.output_bytes)  # blank line; saved with the next result
+                continue
+            if query is None:
+                counts["errors"] += 1
+                finish(line_number, {"line": line_number, "error": error})
+                continue
+            customer = CustomerService.get_customer_by_id(query.customer_id)
+            region = customer.region if customer and customer.region in executors else "US"
+            pending[executors[region].submit(process, query)] = line_number
+            if len(pending) >= window:
+                drain(FIRST_COMPLETED)
+        while pending:
+            drain(FIRST_COMPLETED)
+        checkpoint.save()
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        output.close()
+
+    counts["seconds"] = round(time.perf_counter() - started, 1)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Process a JSONL file of support tickets with checkpointing.")
+    parser.add_argument("input", help="JSONL file with one SupportQuery per line (customer_id and message required)")
+    parser.add_argument("output", help="JSONL file CollaborationLog results are appended to")
+    parser.add_argument("--checkpoint", help="progress file (default: <output>.checkpoint)")
+    parser.add_argument("--workers-per-region", type=int, default=2, help="tickets processed concurrently per data region")
+    parser.add_argument("--mode", choices=["llm", "simulation"], default="llm", help="simulation runs without LLM calls")
+    args = parser.parse_args()
+
+    print(f"📦 Processing {args.input} → {args.output} ({args.workers_per_region} workers per region, {args.mode} mode)")
+    counts = run(args.input, args.output, args.checkpoint or f"{args.output}.checkpoint", args.workers_per_region, args.mode)
+    print(f"🏁 Done: {counts['processed']} processed, {counts['errors']} errors, {counts['skipped']} already done, {counts['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Query Cancellation
+Cooperative cancellation for pipeline runs that no client is waiting for: a token
+checked at every stage boundary that also aborts the stage's in-flight LLM request.
+"""
+
+import itertools
+import socket
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import openai
+from crewai import LLM
+
+from context_compression import estimate_tokens
+
+
+class QueryCancelled(Exception):
+    """Raised inside a pipeline run once its cancellation token has fired."""
+
+
+class CancellationToken:
+    """Cancellation state of one pipeline run, plus what its LLM calls cost before it was cancelled."""
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self.stage: Optional[str] = None  # stage running now, or when the run was cancelled
+        self.llm_calls = 0
+        self.aborted_calls = 0
+        self.generated_tokens = 0  # estimated completion tokens of finished calls
+        self._event = threading.Event()
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str) -> bool:
+        """Cancel the run and abort its in-flight requests; False if it was already cancelled."""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            callback()
+        return True
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call `callback` on cancellation (now, if already cancelled); returns a function that unregisters it."""
+        with self._lock:
+            if not self._event.is_set():
+                callback_id = next(self._ids)
+                self._callbacks[callback_id] = callback
+                return lambda: self._callbacks.pop(callback_id, None)
+        callback()
+        return lambda: None
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to `timeout` seconds, waking early on cancellation; True if cancelled."""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise QueryCancelled(self.reason)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "reason": self.reason,
+            "stage": self.stage,
+            "llm_calls": self.llm_calls,
+            "aborted_llm_calls": self.aborted_calls,
+            # Nobody receives a cancelled run's answer, so everything it generated was wasted
+            "wasted_tokens": self.generated_tokens
+        }
+
+
+_current_token: ContextVar[Optional[CancellationToken]] = ContextVar("cancellation_token", default=None)
+_call_client: ContextVar[Optional[openai.OpenAI]] = ContextVar("cancellable_llm_client", default=None)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """The token of the run whose stage is executing on this thread, if any."""
+    return _current_token.get()
+
+
+@contextmanager
+def cancellation_scope(token: CancellationToken, stage: str):
+    """Make `token` the one observed by LLM calls made on this thread while `stage` runs."""
+    token.raise_if_cancelled()
+    token.stage = stage
+    reset = _current_token.set(token)
+    try:
+        yield token
+    except Exception:
+        token.raise_if_cancelled()  # surface an aborted request as a cancellation, not an LLM error
+        raise
+    finally:
+        _current_token.reset(reset)
+    token.raise_if_cancelled()  # discard whatever the stage made of an aborted request
+
+
+class _AbortableConnection:
+    """HTTP client for one LLM call whose connection can be torn down from another thread."""
+
+    def __init__(self, timeout: float):
+        self._sockets: List[socket.socket] = []
+        self.aborted = False
+        self.client = httpx.Client(timeout=timeout, event_hooks={"request": [self._trace_request]})
+
+    def _trace_request(self, request: httpx.Request) -> None:
+        if self.aborted:
+            raise httpx.ConnectError("request aborted by cancellation", request=request)
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        # httpcore reports every new connection through the request's trace extension
+        if event_name == "connection.connect_tcp.complete":
+            self._sockets.append(info["return_value"].get_extra_info("socket"))
+
+    def abort(self) -> None:
+        self.aborted = True
+        # shutdown() (unlike close()) wakes the calling thread blocked on the response
+        for sock in self._sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class CancellableLLM(LLM):
+    """
+    LLM whose in-flight HTTP request is closed when the calling run is cancelled.
+
+    Each call inside a `cancellation_scope` gets a private connection, so closing it aborts
+    only that run's generation; llama.cpp stops decoding once the client disconnects.
+    """
+
+    def call(self, messages, *args, **kwargs):
+        token = _current_token.get()
+        if token is None:
+            return super().call(messages, *args, **kwargs)
+        token.raise_if_cancelled()
+
+        connection = _AbortableConnection(self.timeout or 600.0)
+        unregister = token.on_cancel(connection.abort)
+        client = openai.OpenAI(base_url=self.base_url, api_key=self.api_key, http_client=connection.client)
+        reset = _call_client.set(client)
+        try:
+            response = super().call(messages, *args, **kwargs)
+        except Exception:
+            if token.cancelled:
+                token.aborted_calls += 1
+                raise QueryCancelled(token.reason) from None
+            raise
+        finally:
+            _call_client.reset(reset)
+            unregister()
+            connection.client.close()
+        token.llm_calls += 1
+        token.generated_tokens += estimate_tokens(str(response))
+        return response
+
+    def _prepare_completion_params(self, messages, tools=None) -> Dict[str, Any]:
+        params = super()._prepare_completion_params(messages, tools)
+        client = _call_client.get()
+        if client is not None:
+            params["client"] = client
+            # No client-side retries: after an abort they would only back off and fail again
+            params["max_retries"] = 0
+        return params
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Adaptive Context Compression
+Distills upstream agent outputs into a compact, structured summary that fits a
+token budget before it is handed to the next pipeline stage.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+# Word-and-punctuation pieces approximate BPE tokens closely enough for budgeting
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_MARKDOWN = re.compile(r"[*_`#>]+")
+
+PRIORITY_RANK = {"low": 0, "medium": 1, "high": 2, "urgent": 3}
+
+URGENCY_PATTERNS = [
+    ("urgent", re.compile(r"\b(urgent|critical|immediately|asap|outage|breach|down)\b", re.IGNORECASE)),
+    ("high", re.compile(r"\b(high priority|escalat\w*|as soon as possible|blocking)\b", re.IGNORECASE)),
+]
+
+COMPLIANCE_FLAGS = {
+    "gdpr": re.compile(r"\b(gdpr|dsgvo|rgpd)\b", re.IGNORECASE),
+    "consent": re.compile(r"\bconsent\b", re.IGNORECASE),
+    "data_residency": re.compile(r"\b(data residency|sovereignty|cross-border|transfer)\b", re.IGNORECASE),
+    "personal_data": re.compile(r"\b(personal data|pii|data subject)\b", re.IGNORECASE),
+    "refund": re.compile(r"\brefund\w*\b", re.IGNORECASE),
+    "security": re.compile(r"\b(security|breach|vulnerab\w*|threat)\b", re.IGNORECASE),
+}
+
+# Explicit recommendations win over softer modal phrasing
+ACTION_PATTERNS = [
+    re.compile(r"\b(recommend\w*|next steps?|suggest\w*|propose\w*|escalat\w*)\b", re.IGNORECASE),
+    re.compile(r"\b(should|we will|must)\b", re.IGNORECASE),
+]
+INTENT_PATTERN = re.compile(r"\b(wants?|needs?|asking|requests?|intent|issue|problem|trouble|looking to)\b", re.IGNORECASE)
+FACT_PATTERN = re.compile(r"\d|\b(tier|module|suite|package|product|account|invoice|configuration)\b", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate prompt tokens for `text` without loading a tokenizer."""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def _sentences(text: str) -> List[str]:
+    """Split into sentences with markdown decoration removed, dropping duplicates."""
+    cleaned = (_MARKDOWN.sub("", s).strip(" -•:\t") for s in _SENTENCE_SPLIT.split(text))
+    return list(dict.fromkeys(s for s in cleaned if len(s) > 3))
+
+
+@dataclass(slots=True)
+class CompressedContext:
+    """Salient facts from upstream stages, rendered compactly for the next prompt."""
+    intent: str
+    urgency: str
+    compliance_flags: List[str]
+    recommended_action: Optional[str]
+    key_facts: List[str] = field(default_factory=list)
+    source_tokens: int = 0
+    compressed_tokens: int = 0
+    token_budget: int = 0
+
+    def to_prompt(self) -> str:
+        lines = [
+            "Previous Analysis Context:",
+            f"- Intent: {self.intent}",
+            f"- Urgency: {self.urgency}",
+            f"- Compliance flags: {', '.join(self.compliance_flags) or 'none'}",
+        ]
+        if self.recommended_action:
+            lines.append(f"- Recommended action: {self.recommended_action}")
+        lines.extend(f"- Fact: {fact}" for fact in self.key_facts)
+        return "\n".join(lines) + "\n"
+
+    def report(self) -> Dict[str, int]:
+        return {
+            "source_tokens": self.source_tokens,
+            "compressed_tokens": self.compressed_tokens,
+            "tokens_saved": max(self.source_tokens - self.compressed_tokens, 0),
+            "token_budget": self.token_budget
+        }
+
+
+class ContextCompressor:
+    """Extracts intent, urgency, compliance flags and the recommended action from stage outputs."""
+
+    def __init__(self, token_budget: int = 160, max_sentence_tokens: int = 40):
+        self.token_budget = token_budget
+        self.max_sentence_tokens = max_sentence_tokens
+
+    def _clip(self, sentence: str) -> str:
+        words = sentence.split()
+        limit = self.max_sentence_tokens * 3 // 4  # leave room for punctuation tokens
+        return sentence if len(words) <= limit else " ".join(words[:limit]) + " …"
+
+    def compress(self, outputs: Dict[str, str], query) -> CompressedContext:
+        """Compress stage outputs (keyed by stage name) for `query` into the token budget."""
+        text = "\n".join(outputs.values())
+        sentences = _sentences(text)
+
+        # Upgrade the ticket's own priority if the analysis found signs of more urgency
+        urgency = query.priority
+        detected = next((level for level, pattern in URGENCY_PATTERNS if pattern.search(text)), None)
+        if detected and PRIORITY_RANK[detected] > PRIORITY_RANK.get(query.priority, 0):
+            urgency = f"{detected} (ticket priority {query.priority})"
+
+        intent = next((s for s in sentences if INTENT_PATTERN.search(s)), None)
+        action = next((s for pattern in ACTION_PATTERNS for s in sentences if pattern.search(s) and s != intent), None)
+        context = CompressedContext(
+            intent=self._clip(intent) if intent else f"{query.category} inquiry",
+            urgency=urgency,
+            compliance_flags=[flag for flag, pattern in COMPLIANCE_FLAGS.items() if pattern.search(text)],
+            recommended_action=self._clip(action) if action else None,
+            source_tokens=sum(estimate_tokens(output) for output in outputs.values()),
+            token_budget=self.token_budget
+        )
+
+        # Fill the remaining budget with the most fact-dense sentences, in original order
+        candidates = [s for s in sentences if s not in (intent, action) and FACT_PATTERN.search(s)]
+        ranked = sorted(candidates, key=lambda s: -len(FACT_PATTERN.findall(s)))
+        return self._fit(context, candidates, ranked)
+
+    def compress_structured(self, outputs: Dict[str, str], analysis, data_access, query) -> CompressedContext:
+        """Build the context directly from schema-validated stage results; no extraction needed."""
+        urgency = query.priority
+        if PRIORITY_RANK.get(analysis.urgency, 0) > PRIORITY_RANK.get(query.priority, 0):
+            urgency = f"{analysis.urgency} (ticket priority {query.priority})"
+        flags = list(analysis.compliance_flags)
+        facts = [analysis.collaboration_reason] if analysis.collaboration_reason else []
+        if data_access is not None:
+            flags.append(f"eu_{data_access.compliance_status}")
+            facts = data_access.customer_insights + [f"Risk: {risk}" for risk in data_access.risks] + facts
+        context = CompressedContext(
+            intent=self._clip(analysis.intent),
+            urgency=urgency,
+            compliance_flags=list(dict.fromkeys(flags)),
+            recommended_action=self._clip(
+                data_access.recommended_action if data_access is not None and data_access.recommended_action
+                else analysis.recommended_action
+            ) or None,
+            source_tokens=sum(estimate_tokens(output) for output in outputs.values()),
+            token_budget=self.token_budget
+        )
+        # Facts are already in priority order
+        return self._fit(context, facts, facts)
+
+    def _fit(self, context: CompressedContext, candidates: List[str], ranked: List[str]) -> CompressedContext:
+        """Fill the remaining budget with facts taken in `ranked` order, kept in `candidates` order."""
+        used = estimate_tokens(context.to_prompt())
+        chosen = set()
+        for sentence in ranked:
+            cost = estimate_tokens(f"- Fact: {self._clip(sentence)}")
+            if used + cost > self.token_budget:
+                continue
+            chosen.add(sentence)
+            used += cost
+        context.key_facts = [self._clip(s) for s in candidates if s in chosen]
+
+        # Degrade gracefully if the fixed fields alone overflow a tight budget
+        if estimate_tokens(context.to_prompt()) > self.token_budget and context.recommended_action:
+            context.recommended_action = None
+        context.compressed_tokens = estimate_tokens(context.to_prompt())
+        return context
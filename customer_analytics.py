@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Vectorized Customer Analytics
+Computes purchase-derived customer metrics over a columnar NumPy purchase table.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from customer_support import Customer, Purchase
+
+
+STATUSES = ["completed", "pending", "refunded"]
+COMPLETED, PENDING, REFUNDED = range(len(STATUSES))
+UNKNOWN_DAY = -1
+
+
+@dataclass(slots=True)
+class CustomerMetrics:
+    customer_id: str
+    lifetime_value: float
+    purchase_count: int
+    refund_rate: float
+    days_since_last_purchase: Optional[int]
+    last_product: Optional[str]
+    product_mix: Dict[str, int] = field(default_factory=dict)
+
+
+def _row_key(customer: int, purchase_id: str) -> int:
+    return hash((customer, purchase_id))
+
+
+def _day_ordinal(value: str) -> int:
+    try:
+        return date.fromisoformat(value).toordinal()
+    except ValueError:
+        return UNKNOWN_DAY
+
+
+class PurchaseTable:
+    """Growable columnar purchase table; one NumPy array per column."""
+
+    # `key` identifies a row's (customer, purchase ID) so replaced purchases can be found again
+    COLUMNS = {"customer": np.int32, "product": np.int32, "amount": np.float64, "day": np.int32, "status": np.int8, "key": np.int64}
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self._columns = {name: np.empty(capacity, dtype) for name, dtype in self.COLUMNS.items()}
+        # Sorted keys of the first `_indexed` rows and their row numbers, built on demand by find()
+        self._indexed = 0
+        self._sorted_keys = np.zeros(0, np.int64)
+        self._sorted_rows = np.zeros(0, np.int64)
+
+    def append(self, customer: int, product: int, amount: float, day: int, status: int, key: int) -> None:
+        if self.size == len(self._columns["amount"]):
+            # Double the capacity so appends stay amortized O(1)
+            for name, column in self._columns.items():
+                grown = np.empty(2 * len(column), column.dtype)
+                grown[:self.size] = column
+                self._columns[name] = grown
+        self.size += 1
+        self.set(self.size - 1, customer, product, amount, day, status, key)
+
+    def set(self, row: int, customer: int, product: int, amount: float, day: int, status: int, key: int) -> None:
+        self._columns["customer"][row] = customer
+        self._columns["product"][row] = product
+        self._columns["amount"][row] = amount
+        self._columns["day"][row] = day
+        self._columns["status"][row] = status
+        self._columns["key"][row] = key
+
+    def keep(self, mask: np.ndarray) -> None:
+        """Drop the filled rows where `mask` is False, keeping the others in order."""
+        kept = int(mask.sum())
+        for column in self._columns.values():
+            column[:kept] = column[:self.size][mask]
+        self.size = kept
+        self._indexed = 0  # row numbers moved
+
+    def find(self, keys: np.ndarray) -> np.ndarray:
+        """Row of each key, all of which must be in the table."""
+        # Rows appended since the index was built are scanned; past a quarter of the table, re-sort
+        if self.size - self._indexed > self._indexed // 4 + 1024:
+            column = self.column("key")
+            self._sorted_rows = np.argsort(column, kind="stable")
+            self._sorted_keys = column[self._sorted_rows]
+            self._indexed = self.size
+        rows = np.full(len(keys), -1, np.int64)
+        if self._indexed:
+            positions = np.minimum(np.searchsorted(self._sorted_keys, keys), self._indexed - 1)
+            hit = self._sorted_keys[positions] == keys
+            rows[hit] = self._sorted_rows[positions[hit]]
+        missing = np.flatnonzero(rows < 0)
+        if len(missing):
+            tail = self._columns["key"][self._indexed:self.size]
+            tail_rows = dict(zip(tail.tolist(), range(self._indexed, self.size)))
+            rows[missing] = [tail_rows[key] for key in keys[missing].tolist()]
+        return rows
+
+    def column(self, name: str) -> np.ndarray:
+        """View of the filled part of a column."""
+        return self._columns[name][:self.size]
+
+
+class CustomerAnalytics:
+    """
+    Lifetime value, refund rate, recency and product mix for every customer.
+
+    `refresh()` recomputes all aggregates in one vectorized pass over the purchase
+    table; `add_purchase()` folds a single new purchase into them in O(1), and
+    `replace_purchases()`/`replace_customer_purchases()` swap recorded purchases out
+    with one pass over the table per call.
+    """
+
+    def __init__(self):
+        self.table = PurchaseTable()
+        self._customer_ids: List[str] = []
+        self._customer_index: Dict[str, int] = {}
+        self._products: List[str] = []
+        self._product_codes: Dict[str, int] = {}
+
+        self._lifetime_value = np.zeros(0, np.float64)
+        self._purchase_count = np.zeros(0, np.int64)
+        self._refund_count = np.zeros(0, np.int64)
+        self._last_day = np.full(0, UNKNOWN_DAY, np.int32)
+        self._last_product = np.full(0, -1, np.int32)
+
+        # Product mix as sorted (customer * stride + product) keys with counts,
+        # plus increments recorded since the last refresh
+        self._mix_stride = 1
+        self._mix_keys = np.zeros(0, np.int64)
+        self._mix_counts = np.zeros(0, np.int64)
+        self._mix_pending: Dict[Tuple[int, int], int] = {}
+
+    @classmethod
+    def from_customers(cls, customers: Iterable[Customer]) -> "CustomerAnalytics":
+        """Build the purchase table from customer records and compute all metrics."""
+        analytics = cls()
+        for customer in customers:
+            index = analytics._register_customer(customer.id)
+            for purchase in customer.purchases:
+                analytics._append_row(index, purchase)
+        analytics.refresh()
+        return analytics
+
+    def _register_customer(self, customer_id: str) -> int:
+        index = self._customer_index.get(customer_id)
+        if index is None:
+            index = self._customer_index[customer_id] = len(self._customer_ids)
+            self._customer_ids.append(customer_id)
+        return index
+
+    def _append_row(self, customer: int, purchase: Purchase) -> Tuple[int, int, int]:
+        product, day, status = self._encode(purchase)
+        self.table.append(customer, product, purchase.amount, day, status, _row_key(customer, purchase.id))
+        return product, day, status
+
+    def _encode(self, purchase: Purchase) -> Tuple[int, int, int]:
+        product = self._product_codes.get(purchase.product)
+        if product is None:
+            product = self._product_codes[purchase.product] = len(self._products)
+            self._products.append(purchase.product)
+        status = STATUSES.index(purchase.status) if purchase.status in STATUSES else PENDING
+        return product, _day_ordinal(purchase.date), status
+
+    def refresh(self) -> None:
+        """Recompute every customer's aggregates in a single vectorized pass."""
+        n = len(self._customer_ids)
+        customer = self.table.column("customer")
+        product = self.table.column("product")
+        amount = self.table.column("amount")
+        day = self.table.column("day")
+        status = self.table.column("status")
+
+        self._lifetime_value = np.bincount(customer, weights=np.where(status == COMPLETED, amount, 0.0), minlength=n)
+        self._purchase_count = np.bincount(customer, minlength=n).astype(np.int64)
+        self._refund_count = np.bincount(customer, weights=status == REFUNDED, minlength=n).astype(np.int64)
+
+        self._last_day = np.full(n, UNKNOWN_DAY, np.int32)
+        self._last_product = np.full(n, -1, np.int32)
+        self._update_latest(np.arange(self.table.size))
+
+        self._mix_stride = max(len(self._products), 1)
+        keys = customer.astype(np.int64) * self._mix_stride + product
+        self._mix_keys, self._mix_counts = np.unique(keys, return_counts=True)
+        self._mix_pending.clear()
+
+    def _update_latest(self, rows: np.ndarray) -> None:
+        """Latest purchase of every customer with a row in `rows`: sort by (customer, day), take each group's last row."""
+        if not len(rows):
+            return
+        customer = self.table.column("customer")[rows]
+        day = self.table.column("day")[rows]
+        order = np.lexsort((day, customer))
+        grouped = customer[order]
+        last_rows = order[np.append(grouped[1:] != grouped[:-1], True)]
+        self._last_day[customer[last_rows]] = day[last_rows]
+        self._last_product[customer[last_rows]] = self.table.column("product")[rows][last_rows]
+
+    def _recompute_latest(self, indices: Iterable[int]) -> None:
+        indices = np.fromiter(indices, np.int64)
+        self._last_day[indices] = UNKNOWN_DAY
+        self._last_product[indices] = -1
+        self._update_latest(np.flatnonzero(np.isin(self.table.column("customer"), indices)))
+
+    def _ensure_capacity(self, n: int) -> None:
+        if n <= len(self._lifetime_value):
+            return
+        extra = max(n, 2 * len(self._lifetime_value)) - len(self._lifetime_value)
+        self._lifetime_value = np.append(self._lifetime_value, np.zeros(extra, np.float64))
+        self._purchase_count = np.append(self._purchase_count, np.zeros(extra, np.int64))
+        self._refund_count = np.append(self._refund_count, np.zeros(extra, np.int64))
+        self._last_day = np.append(self._last_day, np.full(extra, UNKNOWN_DAY, np.int32))
+        self._last_product = np.append(self._last_product, np.full(extra, -1, np.int32))
+
+    def add_customer(self, customer_id: str) -> None:
+        """Register a new customer, so they count towards the totals before their first purchase."""
+        self._ensure_capacity(self._register_customer(customer_id) + 1)
+
+    def add_purchase(self, customer_id: str, purchase: Purchase) -> None:
+        """Fold one new purchase into the aggregates without a full recompute."""
+        index = self._register_customer(customer_id)
+        self._ensure_capacity(index + 1)
+        product, day, status = self._append_row(index, purchase)
+        if status == COMPLETED:
+            self._lifetime_value[index] += purchase.amount
+        self._purchase_count[index] += 1
+        self._refund_count[index] += status == REFUNDED
+        if day >= self._last_day[index]:
+            self._last_day[index] = day
+            self._last_product[index] = product
+        self._mix_pending[(index, product)] = self._mix_pending.get((index, product), 0) + 1
+
+    def replace_purchases(self, purchases: List[Tuple[str, Purchase]]) -> None:
+        """
+        Overwrite already-recorded purchases, matched by customer and purchase ID, folding the
+        difference into the aggregates. The rows are found through the table's key index.
+        """
+        # Only the last replacement of each purchase matters
+        final: Dict[int, Tuple[int, Purchase]] = {}
+        for customer_id, purchase in purchases:
+            index = self._customer_index[customer_id]
+            final[_row_key(index, purchase.id)] = (index, purchase)
+        if not final:
+            return
+        rows = self.table.find(np.fromiter(final, np.int64, len(final)))
+
+        indices = np.fromiter((index for index, _ in final.values()), np.int64, len(final))
+        encoded = [self._encode(purchase) for _, purchase in final.values()]
+        product = np.fromiter((code for code, _, _ in encoded), np.int32, len(final))
+        day = np.fromiter((day for _, day, _ in encoded), np.int32, len(final))
+        status = np.fromiter((status for _, _, status in encoded), np.int8, len(final))
+        amount = np.fromiter((purchase.amount for _, purchase in final.values()), np.float64, len(final))
+        old_product = self.table.column("product")[rows]
+        old_day = self.table.column("day")[rows]
+        old_status = self.table.column("status")[rows]
+        old_amount = self.table.column("amount")[rows]
+
+        np.add.at(self._lifetime_value, indices, np.where(status == COMPLETED, amount, 0.0) - np.where(old_status == COMPLETED, old_amount, 0.0))
+        np.add.at(self._refund_count, indices, (status == REFUNDED).astype(np.int64) - (old_status == REFUNDED))
+        moved = np.flatnonzero(product != old_product)
+        for index, old, new in zip(indices[moved].tolist(), old_product[moved].tolist(), product[moved].tolist()):
+            self._mix_pending[(index, old)] = self._mix_pending.get((index, old), 0) - 1
+            self._mix_pending[(index, new)] = self._mix_pending.get((index, new), 0) + 1
+
+        self.table.column("product")[rows] = product
+        self.table.column("day")[rows] = day
+        self.table.column("status")[rows] = status
+        self.table.column("amount")[rows] = amount
+        # A changed row that was, or may now be, a customer's latest purchase: recompute those customers
+        last_day = self._last_day[indices]
+        stale = ((day != old_day) | (product != old_product)) & ((day >= last_day) | (old_day == last_day))
+        if stale.any():
+            self._recompute_latest(np.unique(indices[stale]).tolist())
+
+    def replace_customer_purchases(self, purchases: Dict[str, List[Purchase]]) -> None:
+        """Replace every recorded purchase of the given customers, dropping their old rows in one pass."""
+        if not purchases:
+            return
+        indices = np.fromiter((self._register_customer(customer_id) for customer_id in purchases), np.int64)
+        self._ensure_capacity(len(self._customer_ids))
+        customer = self.table.column("customer")
+        removed = np.isin(customer, indices)
+        if removed.any():
+            stride = max(len(self._products), 1)
+            keys, counts = np.unique(customer[removed].astype(np.int64) * stride + self.table.column("product")[removed], return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                pair = divmod(key, stride)
+                self._mix_pending[pair] = self._mix_pending.get(pair, 0) - count
+            self.table.keep(~removed)
+        self._lifetime_value[indices] = 0.0
+        self._purchase_count[indices] = 0
+        self._refund_count[indices] = 0
+        self._last_day[indices] = UNKNOWN_DAY
+        self._last_product[indices] = -1
+        for customer_id, customer_purchases in purchases.items():
+            for purchase in customer_purchases:
+                self.add_purchase(customer_id, purchase)
+
+    def _product_mix(self, index: int) -> Dict[str, int]:
+        low, high = np.searchsorted(self._mix_keys, [index * self._mix_stride, (index + 1) * self._mix_stride])
+        mix = {
+            self._products[int(key) - index * self._mix_stride]: int(count)
+            for key, count in zip(self._mix_keys[low:high], self._mix_counts[low:high])
+        }
+        for (customer, product), count in self._mix_pending.items():
+            if customer == index:
+                mix[self._products[product]] = mix.get(self._products[product], 0) + count
+        return {product: count for product, count in mix.items() if count}
+
+    def metrics(self, customer_id: str, as_of: Optional[date] = None) -> CustomerMetrics:
+        """Metrics for one customer; customers with no recorded purchases get empty metrics."""
+        index = self._customer_index.get(customer_id)
+        if index is None:
+            return CustomerMetrics(customer_id, 0.0, 0, 0.0, None, None)
+        count = int(self._purchase_count[index])
+        last_day = int(self._last_day[index])
+        last_product = int(self._last_product[index])
+        return CustomerMetrics(
+            customer_id=customer_id,
+            lifetime_value=round(float(self._lifetime_value[index]), 2),
+            purchase_count=count,
+            refund_rate=round(int(self._refund_count[index]) / count, 4) if count else 0.0,
+            days_since_last_purchase=(as_of or date.today()).toordinal() - last_day if last_day != UNKNOWN_DAY else None,
+            last_product=self._products[last_product] if last_product >= 0 else None,
+            product_mix=self._product_mix(index)
+        )
+
+    def summary(self) -> Dict[str, object]:
+        """Fleet-wide totals across all customers."""
+        n = len(self._customer_ids)
+        purchases = int(self._purchase_count[:n].sum())
+        product_totals = np.bincount(self.table.column("product"), minlength=len(self._products))
+        return {
+            "customers": n,
+            "purchases": purchases,
+            "total_lifetime_value": round(float(self._lifetime_value[:n].sum()), 2),
+            "refund_rate": round(int(self._refund_count[:n].sum()) / purchases, 4) if purchases else 0.0,
+            "product_mix": {name: int(count) for name, count in zip(self._products, product_totals)}
+        }
+
+    def prompt_context(self, customer_id: str, as_of: Optional[date] = None) -> str:
+        """One-line summary of a customer's purchase history for LLM prompts, with recency counted to `as_of` (default today)."""
+        metrics = self.metrics(customer_id, as_of)
+        if not metrics.purchase_count:
+            return "No purchase history on record."
+        recency = (
+            f"last purchase {metrics.days_since_last_purchase} days ago ({metrics.last_product})"
+            if metrics.days_since_last_purchase is not None else f"last product {metrics.last_product}"
+        )
+        mix = ", ".join(f"{product} ×{count}" for product, count in metrics.product_mix.items())
+        return (
+            f"Lifetime value ${metrics.lifetime_value:,.2f} over {metrics.purchase_count} purchases; "
+            f"refund rate {metrics.refund_rate:.0%}; {recency}; product mix: {mix}"
+        )
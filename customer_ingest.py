@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Bulk Customer Ingestion
+Streams CSV or JSONL exports of customers and purchases into the customer store: rows
+are parsed lazily, validated into Customer/Purchase records and upserted in batches,
+with analytics and GDPR policies updated incrementally, so memory stays flat on any size.
+
+Usage: uv run customer_ingest.py --customers customers.csv --purchases purchases.jsonl [--server http://localhost:5001]
+"""
+
+import argparse
+import csv
+import gc
+import io
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from customer_analytics import STATUSES
+from customer_support import Customer, CustomerService, Purchase
+
+KINDS = ("customers", "purchases")
+FORMATS = ("csv", "jsonl")
+
+REGIONS = ("US", "EU")
+TIERS = ("Bronze", "Silver", "Gold", "Platinum")
+CHANNELS = ("email", "phone", "chat")
+
+CUSTOMER_FIELDS = ("id", "name", "email", "region", "tier", "language", "gdpr_consent", "last_contact", "preferred_channel")
+PURCHASE_FIELDS = ("id", "product", "amount", "date", "status")
+CUSTOMER_REQUIRED = tuple(name for name in CUSTOMER_FIELDS if name != "gdpr_consent")  # blank consent means none
+PURCHASE_ROW_REQUIRED = ("customer_id",) + PURCHASE_FIELDS
+
+_TRUE = {"true", "1", "yes", "y"}
+_FALSE = {"false", "0", "no", "n", ""}
+
+DEFAULT_BATCH_SIZE = 5000
+PROGRESS_EVERY = 100_000  # rows between progress lines
+MAX_ERROR_SAMPLES = 20
+
+
+class RowError(ValueError):
+    """A row that cannot become a valid Customer or Purchase."""
+
+
+def _required(record: Dict[str, Any], fields: Tuple[str, ...]) -> None:
+    missing = [name for name in fields if record.get(name) in (None, "")]
+    if missing:
+        raise RowError(f"missing {', '.join(missing)}")
+
+
+def _one_of(name: str, value: str, allowed: Tuple[str, ...]) -> str:
+    if value not in allowed:
+        raise RowError(f"{name} must be one of {', '.join(allowed)}, got {value!r}")
+    return value
+
+
+def _bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise RowError(f"gdpr_consent must be true or false, got {value!r}")
+
+
+def parse_purchase(record: Dict[str, Any], customer_id: Optional[str] = None) -> Tuple[str, Purchase]:
+    """(customer_id, purchase) from a purchase row; `customer_id` is given for purchases nested in a customer."""
+    _required(record, PURCHASE_FIELDS if customer_id else PURCHASE_ROW_REQUIRED)
+    try:
+        amount = float(record["amount"])
+    except (TypeError, ValueError):
+        raise RowError(f"amount must be a number, got {record['amount']!r}")
+    if not math.isfinite(amount):
+        raise RowError(f"amount must be finite, got {record['amount']!r}")
+    try:
+        date.fromisoformat(str(record["date"]))
+    except ValueError:
+        raise RowError(f"date must be YYYY-MM-DD, got {record['date']!r}")
+    return customer_id or str(record["customer_id"]), Purchase(
+        id=str(record["id"]),
+        product=str(record["product"]),
+        amount=amount,
+        date=str(record["date"]),
+        status=_one_of("status", record["status"], tuple(STATUSES))
+    )
+
+
+def parse_customer(record: Dict[str, Any]) -> Tuple[Customer, bool]:
+    """(customer, has_purchases) from a customer row; JSONL rows may nest a `purchases` list."""
+    _required(record, CUSTOMER_REQUIRED)
+    nested = record.get("purchases")
+    if nested is not None and not (isinstance(nested, list) and all(isinstance(purchase, dict) for purchase in nested)):
+        raise RowError("purchases must be a list of objects")
+    customer_id = str(record["id"])
+    return Customer(
+        id=customer_id,
+        name=str(record["name"]),
+        email=str(record["email"]),
+        region=_one_of("region", record["region"], REGIONS),
+        tier=_one_of("tier", record["tier"], TIERS),
+        language=str(record["language"]),
+        gdpr_consent=_bool(record.get("gdpr_consent", False)),
+        last_contact=str(record["last_contact"]),
+        preferred_channel=_one_of("preferred_channel", record["preferred_channel"], CHANNELS),
+        purchases=[parse_purchase(purchase, customer_id)[1] for purchase in nested or []]
+    ), nested is not None
+
+
+def detect_format(path: str) -> str:
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """(line number, record, parse error) for each data row, read lazily."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, None, f"invalid JSON: {e}"
+            continue
+        if isinstance(record, dict):
+            yield line_number, record, None
+        else:
+            yield line_number, None, "expected a JSON object"
+
+
+@dataclass(slots=True)
+class IngestReport:
+    """Row counts per kind, a sample of rejected rows, and throughput."""
+    counts: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+    rows: int = 0
+
+    def count(self, kind: str, **deltas: int) -> None:
+        counts = self.counts.setdefault(kind, {"rows": 0, "inserted": 0, "updated": 0, "rejected": 0})
+        for name, delta in deltas.items():
+            counts[name] += delta
+
+    def reject(self, kind: str, line: int, error: str, rejects: Optional[TextIO] = None) -> None:
+        self.count(kind, rejected=1)
+        entry = {"kind": kind, "line": line, "error": error}
+        if len(self.errors) < MAX_ERROR_SAMPLES:
+            self.errors.append(entry)
+        if rejects is not None:
+            rejects.write(json.dumps(entry) + "\n")
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> Dict[str, Any]:
+        seconds = self.seconds
+        return {
+            **self.counts,
+            "rows": self.rows,
+            "seconds": round(seconds, 2),
+            "rows_per_second": round(self.rows / seconds) if seconds else 0,
+            "errors": list(self.errors)
+        }
+
+
+def _batches(iterator: Iterator, size: int) -> Iterator[List]:
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ingest(
+    stream: TextIO,
+    kind: str,
+    fmt: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    report: Optional[IngestReport] = None,
+    rejects: Optional[TextIO] = None,
+) -> IngestReport:
+    """Stream `kind` rows from `stream` into the customer store in batches of `batch_size`."""
+    if kind not in KINDS:
+        raise ValueError(f"unknown ingestion kind {kind!r}; expected one of {', '.join(KINDS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown ingestion format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    report = report or IngestReport()
+    _ingest_batches(stream, kind, fmt, batch_size, report, rejects)
+    CustomerService.refresh_analytics()
+    return report
+
+
+def _ingest_batches(stream: TextIO, kind: str, fmt: str, batch_size: int, report: IngestReport, rejects: Optional[TextIO]) -> None:
+    parse = parse_customer if kind == "customers" else parse_purchase
+    for batch in _batches(read_records(stream, fmt), batch_size):
+        valid = []
+        for line, record, error in batch:
+            if error is None:
+                try:
+                    valid.append((line, parse(record)))
+                except (RowError, TypeError) as e:
+                    error = str(e)
+            if error is not None:
+                report.reject(kind, line, error, rejects)
+
+        if kind == "customers":
+            inserted, updated = CustomerService.upsert_customers([row for _, row in valid])
+        else:
+            # Purchases for customers that are not loaded are rejected with their line number
+            known = []
+            for line, (customer_id, purchase) in valid:
+                if CustomerService.STORE.position_of(customer_id) is None:
+                    report.reject(kind, line, f"unknown customer {customer_id!r}", rejects)
+                else:
+                    known.append((customer_id, purchase))
+            inserted, updated, unknown = CustomerService.upsert_purchases(known)
+            if unknown:
+                report.count(kind, rejected=unknown)
+
+        # Move the stored records out of the collector's reach: otherwise every collection of
+        # the oldest generation rescans the whole growing store, costing loads over a third of
+        # their time. Unlike pausing the collector, this leaves it running for the rest of the server.
+        gc.freeze()
+
+        previous = report.rows
+        report.rows += len(batch)
+        report.count(kind, rows=len(batch), inserted=inserted, updated=updated)
+        if report.rows // PROGRESS_EVERY != previous // PROGRESS_EVERY:
+            print(f"✅ {report.rows:,} rows ingested, {report.rows / report.seconds:,.0f} rows/s")
+
+
+def ingest_files(
+    customers: Optional[str] = None,
+    purchases: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    rejects_path: Optional[str] = None,
+) -> IngestReport:
+    """Ingest a customers file, then a purchases file, into this process's customer store."""
+    report = IngestReport()
+    rejects = open(rejects_path, "w") if rejects_path else None
+    try:
+        for kind, path in (("customers", customers), ("purchases", purchases)):
+            if path:
+                with open(path, newline="", encoding="utf-8") as stream:
+                    ingest(stream, kind, detect_format(path), batch_size, report, rejects)
+    finally:
+        if rejects is not None:
+            rejects.close()
+    return report
+
+
+def upload_file(server: str, path: str, kind: str, batch_size: int) -> Dict[str, Any]:
+    """Stream a file to a running API server's import endpoint without loading it into memory."""
+    import httpx
+    fmt = detect_format(path)
+    with open(path, "rb") as body:
+        response = httpx.post(
+            f"{server.rstrip('/')}/api/customers/import",
+            params={"kind": kind, "format": fmt, "batch_size": batch_size},
+            headers={"X-Admin-Token": os.environ.get("ADMIN_TOKEN", ""), "Content-Type": "text/csv" if fmt == "csv" else "application/x-ndjson"},
+            content=iter(lambda: body.read(1 << 20), b""),
+            timeout=None
+        )
+    response.raise_for_status()
+    return response.json()
+
+
+def text_stream(binary) -> TextIO:
+    """Text view of a binary stream (e.g. a request body), decoded incrementally."""
+    return io.TextIOWrapper(binary if isinstance(binary, io.BufferedIOBase) else io.BufferedReader(binary), encoding="utf-8", newline="")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stream customer and purchase exports into the customer store.")
+    parser.add_argument("--customers", help="CSV or JSONL file of customers (JSONL rows may nest purchases)")
+    parser.add_argument("--purchases", help="CSV or JSONL file of purchases with a customer_id column")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows upserted per write")
+    parser.add_argument("--rejects", help="JSONL file every rejected row is written to")
+    parser.add_argument("--server", help="API server to load into (e.g. http://localhost:5001); without it, rows are validated and loaded in this process only")
+    args = parser.parse_args()
+    if not args.customers and not args.purchases:
+        parser.error("give --customers, --purchases or both")
+
+    if args.server:
+        for kind, path in (("customers", args.customers), ("purchases", args.purchases)):
+            if path:
+                print(f"📤 Uploading {path} to {args.server}...")
+                print(json.dumps(upload_file(args.server, path, kind, args.batch_size)["report"], indent=2))
+        return
+
+    if os.environ.get("CUSTOMER_RECORD_MODE") == "compact":
+        CustomerService.use_compact_records()
+    report = ingest_files(args.customers, args.purchases, args.batch_size, args.rejects).as_dict()
+    print(f"🏁 Done: {report['rows']:,} rows in {report['seconds']}s ({report['rows_per_second']:,} rows/s)")
+    print(json.dumps({kind: report[kind] for kind in KINDS if kind in report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
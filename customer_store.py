@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Compact Columnar Customer Store
+Keeps customer and purchase records in parallel arrays instead of one object per record.
+"""
+
+import calendar
+import time
+from array import array
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from customer_support import Customer, Purchase
+
+
+CONTACT_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+class _Vocabulary:
+    """Interns a low-cardinality string column (region, tier, status...) as small integer codes."""
+
+    def __init__(self, typecode: str = "B"):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self.limit = 2 ** (8 * array(typecode).itemsize)
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            if len(self.values) == self.limit:
+                raise OverflowError(f"Too many distinct values for vocabulary (limit {self.limit})")
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> Optional[int]:
+        """Code for an existing value, or None if it was never interned."""
+        return self._codes.get(value)
+
+
+class _StringColumn:
+    """High-cardinality strings packed into one UTF-8 buffer addressed by (start, length)."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._starts = array("Q")
+        self._lengths = array("I")
+
+    def append(self, value: str) -> None:
+        encoded = value.encode("utf-8")
+        self._starts.append(len(self._buffer))
+        self._lengths.append(len(encoded))
+        self._buffer += encoded
+
+    def set(self, row: int, value: str) -> None:
+        """
+        Overwrite a row in place when the new value fits in the old bytes; a longer value is
+        appended and the old bytes are left behind until the store is rebuilt.
+        """
+        encoded = value.encode("utf-8")
+        start, length = self._starts[row], self._lengths[row]
+        if len(encoded) <= length:
+            self._buffer[start:start + len(encoded)] = encoded
+            self._lengths[row] = len(encoded)
+            return
+        self._starts[row] = len(self._buffer)
+        self._lengths[row] = len(encoded)
+        self._buffer += encoded
+
+    def __getitem__(self, row: int) -> str:
+        start = self._starts[row]
+        return self._buffer[start:start + self._lengths[row]].decode("utf-8")
+
+
+def _encode_contact(value: str) -> Optional[int]:
+    """Epoch seconds for a `...Z` timestamp, or None if it would not round-trip exactly."""
+    if not value.endswith("Z"):
+        return None
+    try:
+        epoch = calendar.timegm(datetime.fromisoformat(value[:-1]).timetuple())
+    except ValueError:
+        return None
+    return epoch if time.strftime(CONTACT_FORMAT, time.gmtime(epoch)) == value else None
+
+
+def _encode_date(value: str) -> Optional[int]:
+    """Proleptic ordinal for an ISO date, or None if it would not round-trip exactly."""
+    try:
+        ordinal = date.fromisoformat(value).toordinal()
+    except ValueError:
+        return None
+    return ordinal if date.fromordinal(ordinal).isoformat() == value else None
+
+
+class ColumnarCustomerStore:
+    """
+    Customer store backed by parallel arrays.
+
+    Enumerated columns (region, tier, language, channel, status, product) are interned
+    to integer codes, timestamps are stored as epoch integers and free-text columns are
+    packed into shared buffers. Records are materialized back into `Customer`/`Purchase`
+    on access, so `asdict()` produces exactly the JSON of the object-backed store.
+    Values that would not round-trip through the compact encoding are kept verbatim.
+    """
+
+    def __init__(self, customers: Optional[Iterable[Customer]] = None):
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._names = _StringColumn()
+        self._emails = _StringColumn()
+        self._regions = _Vocabulary()
+        self._tiers = _Vocabulary()
+        self._languages = _Vocabulary("H")
+        self._channels = _Vocabulary()
+        self._region_codes = array("B")
+        self._tier_codes = array("B")
+        self._language_codes = array("H")
+        self._channel_codes = array("B")
+        self._consent = bytearray()
+        self._last_contact = array("q")
+        self._purchase_head = array("q")
+        self._purchase_tail = array("q")
+        self._purchase_count = array("I")
+
+        # Purchase columns; a customer's purchases are a chain of rows linked through
+        # `_purchase_next` (-1 ends it), so purchases can be added without moving old rows
+        self._purchase_next = array("q")
+        self._purchase_ids = _StringColumn()
+        self._products = _Vocabulary("I")
+        self._statuses = _Vocabulary()
+        self._product_codes = array("I")
+        self._amounts = array("d")
+        self._dates = array("i")
+        self._status_codes = array("B")
+
+        # Verbatim values for rows whose timestamps are not in the canonical format
+        self._raw_contact: Dict[int, str] = {}
+        self._raw_dates: Dict[int, str] = {}
+
+        for customer in customers or []:
+            self.append(customer)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[Customer]:
+        return (self._materialize(position) for position in range(len(self._ids)))
+
+    def append(self, customer: Customer, keep_purchases: bool = False) -> None:
+        """
+        Add a customer, replacing any existing record with the same ID. With `keep_purchases`
+        a replaced record keeps its stored purchases instead of taking `customer.purchases`.
+        """
+        position = self._positions.get(customer.id)
+        if position is not None:
+            self._overwrite(position, customer, keep_purchases)
+            return
+
+        position = len(self._ids)
+        self._positions[customer.id] = position
+        self._ids.append(customer.id)
+        self._names.append(customer.name)
+        self._emails.append(customer.email)
+        self._region_codes.append(self._regions.code(customer.region))
+        self._tier_codes.append(self._tiers.code(customer.tier))
+        self._language_codes.append(self._languages.code(customer.language))
+        self._channel_codes.append(self._channels.code(customer.preferred_channel))
+        self._consent.append(customer.gdpr_consent)
+        self._last_contact.append(0)
+        self._purchase_head.append(-1)
+        self._purchase_tail.append(-1)
+        self._purchase_count.append(0)
+        self._set_last_contact(position, customer.last_contact)
+        self._set_purchases(position, customer.purchases)
+
+    def _overwrite(self, position: int, customer: Customer, keep_purchases: bool = False) -> None:
+        self._names.set(position, customer.name)
+        self._emails.set(position, customer.email)
+        self._region_codes[position] = self._regions.code(customer.region)
+        self._tier_codes[position] = self._tiers.code(customer.tier)
+        self._language_codes[position] = self._languages.code(customer.language)
+        self._channel_codes[position] = self._channels.code(customer.preferred_channel)
+        self._consent[position] = customer.gdpr_consent
+        self._set_last_contact(position, customer.last_contact)
+        if not keep_purchases:
+            self._set_purchases(position, customer.purchases)
+
+    def upsert_purchases(self, customer_id: str, purchases: List[Purchase]) -> Optional[Tuple[List[Purchase], List[Purchase]]]:
+        """
+        Add purchases to a customer, replacing (by purchase ID) any it already has. Existing
+        rows are overwritten in place and new ones linked onto the end of the customer's
+        chain. Returns (added, replacing) purchases, or None for an unknown customer.
+        """
+        position = self._positions.get(customer_id)
+        if position is None:
+            return None
+        rows = {self._purchase_ids[row]: row for row in self._purchase_rows(position)}
+        added: List[Purchase] = []
+        replacing: List[Purchase] = []
+        for purchase in purchases:
+            row = rows.get(purchase.id)
+            if row is None:
+                rows[purchase.id] = self._append_purchase(position, purchase)
+                added.append(purchase)
+            else:
+                self._write_purchase(row, purchase)
+                replacing.append(purchase)
+        return added, replacing
+
+    def _set_last_contact(self, position: int, value: str) -> None:
+        epoch = _encode_contact(value)
+        if epoch is None:
+            self._raw_contact[position] = value
+        else:
+            self._raw_contact.pop(position, None)
+            self._last_contact[position] = epoch
+
+    def _purchase_rows(self, position: int) -> Iterator[int]:
+        row = self._purchase_head[position]
+        while row != -1:
+            yield row
+            row = self._purchase_next[row]
+
+    def _set_purchases(self, position: int, purchases: List[Purchase]) -> None:
+        # Reuse the customer's rows in order; rows dropped off the end of a shorter
+        # list become unreferenced until the store is rebuilt
+        rows = list(self._purchase_rows(position))
+        for row, purchase in zip(rows, purchases):
+            self._write_purchase(row, purchase)
+        if len(purchases) < len(rows):
+            self._purchase_count[position] = len(purchases)
+            if purchases:
+                tail = rows[len(purchases) - 1]
+                self._purchase_next[tail] = -1
+                self._purchase_tail[position] = tail
+            else:
+                self._purchase_head[position] = self._purchase_tail[position] = -1
+        for purchase in purchases[len(rows):]:
+            self._append_purchase(position, purchase)
+
+    def _append_purchase(self, position: int, purchase: Purchase) -> int:
+        row = len(self._amounts)
+        self._purchase_next.append(-1)
+        self._purchase_ids.append(purchase.id)
+        self._product_codes.append(self._products.code(purchase.product))
+        self._amounts.append(purchase.amount)
+        self._status_codes.append(self._statuses.code(purchase.status))
+        ordinal = _encode_date(purchase.date)
+        self._dates.append(ordinal if ordinal is not None else 0)
+        if ordinal is None:
+            self._raw_dates[row] = purchase.date
+        tail = self._purchase_tail[position]
+        if tail == -1:
+            self._purchase_head[position] = row
+        else:
+            self._purchase_next[tail] = row
+        self._purchase_tail[position] = row
+        self._purchase_count[position] += 1
+        return row
+
+    def _write_purchase(self, row: int, purchase: Purchase) -> None:
+        if self._purchase_ids[row] != purchase.id:
+            self._purchase_ids.set(row, purchase.id)
+        self._product_codes[row] = self._products.code(purchase.product)
+        self._amounts[row] = purchase.amount
+        self._status_codes[row] = self._statuses.code(purchase.status)
+        ordinal = _encode_date(purchase.date)
+        if ordinal is None:
+            self._raw_dates[row] = purchase.date
+        else:
+            self._raw_dates.pop(row, None)
+            self._dates[row] = ordinal
+
+    def _materialize(self, position: int) -> Customer:
+        purchases = [
+            Purchase(
+                id=self._purchase_ids[row],
+                product=self._products.values[self._product_codes[row]],
+                amount=self._amounts[row],
+                date=self._raw_dates[row] if row in self._raw_dates
+                else date.fromordinal(self._dates[row]).isoformat(),
+                status=self._statuses.values[self._status_codes[row]],
+            )
+            for row in self._purchase_rows(position)
+        ]
+        return Customer(
+            id=self._ids[position],
+            name=self._names[position],
+            email=self._emails[position],
+            region=self._regions.values[self._region_codes[position]],
+            tier=self._tiers.values[self._tier_codes[position]],
+            language=self._languages.values[self._language_codes[position]],
+            gdpr_consent=bool(self._consent[position]),
+            last_contact=self._raw_contact[position] if position in self._raw_contact
+            else time.strftime(CONTACT_FORMAT, time.gmtime(self._last_contact[position])),
+            preferred_channel=self._channels.values[self._channel_codes[position]],
+            purchases=purchases,
+        )
+
+    def position_of(self, customer_id: str) -> Optional[int]:
+        return self._positions.get(customer_id)
+
+    def get(self, customer_id: str) -> Optional[Customer]:
+        position = self._positions.get(customer_id)
+        return self._materialize(position) if position is not None else None
+
+    def iter_matching(
+        self,
+        start: int = 0,
+        region: Optional[str] = None,
+        tier: Optional[str] = None,
+        language: Optional[str] = None,
+        gdpr_consent: Optional[bool] = None,
+    ) -> Iterator[Customer]:
+        """Lazily yield matching customers, filtering on the code arrays before materializing."""
+        checks = []
+        for value, vocabulary, codes in (
+            (region, self._regions, self._region_codes),
+            (tier, self._tiers, self._tier_codes),
+            (language, self._languages, self._language_codes),
+        ):
+            if value is None:
+                continue
+            code = vocabulary.lookup(value)
+            if code is None:
+                return
+            checks.append((codes, code))
+        if gdpr_consent is not None:
+            checks.append((self._consent, int(gdpr_consent)))
+
+        for position in range(start, len(self._ids)):
+            if all(codes[position] == code for codes, code in checks):
+                yield self._materialize(position)
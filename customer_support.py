@@ -6,13 +6,35 @@ Extends the original agentic framework for customer support scenarios.
 
 import os
 import json
+import base64
+import binascii
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+from dataclasses import dataclass, asdict, replace
+from urllib.parse import urlparse
 from crewai import Agent, Crew, Process, Task, LLM
+from crewai.utilities.prompts import Prompts
+from routing import DEFAULT_MODEL, EU_RELEVANCE, REGION_ENDPOINTS, SINGLE_CALL, LanguageRouter, ModelEndpoint, RoutingPolicy
+from context_compression import ContextCompressor
+from stage_outputs import STAGE_SCHEMAS, StageOutputError, parse_stage_output, response_format, schema_instructions
+from token_budgets import BudgetPolicy, StageBudget, usage_report
+from response_templates import default_catalog
+from language_detection import LanguageDetector
+from single_flight import Flight, SingleFlight
+from cancellation import CancellationToken, cancellation_scope
+from endpoint_slots import SlotPool, SlottedLLM
+from llm_cassette import install_from_env, pinned_date
+from model_cascade import CascadeOutcome, CascadePolicy
+from load_shedding import SKIP_EU_VALIDATION, TEMPLATES, OverloadController
+from warmup import Warmup, WarmupTarget, warmup_timeout
+from identifiers import new_ulid
 
+WITHHELD = "[withheld]"  # placeholder for fields masked by the GDPR data-access layer
 
-@dataclass
+
+@dataclass(slots=True)
 class Purchase:
     id: str
     product: str
@@ -21,7 +43,7 @@ class Purchase:
     status: str  # completed, pending, refunded
 
 
-@dataclass
+@dataclass(slots=True)
 class Customer:
     id: str
     name: str
@@ -35,7 +57,7 @@ class Customer:
     purchases: List[Purchase]
 
 
-@dataclass
+@dataclass(slots=True)
 class SupportQuery:
     id: str
     customer_id: str
@@ -45,7 +67,7 @@ class SupportQuery:
     category: str  # billing, technical, general, complaint
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentResponse:
     agent: str  # US, EU
     message: str
@@ -53,13 +75,96 @@ class AgentResponse:
     data: Optional[Dict[str, Any]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class CollaborationLog:
     id: str
     query_id: str
     steps: List[AgentResponse]
     final_response: str
     processing_time: int
+    routing: Optional[Dict[str, Any]] = None
+    instrumentation: Optional[Dict[str, Any]] = None
+    topology: Optional[str] = None  # pipeline topology chosen by the routing policy; None for simulations
+
+
+class CustomerStore:
+    """Object-backed customer store: a list of records plus an ID -> position index."""
+    
+    def __init__(self, customers: Optional[List[Customer]] = None):
+        self._customers: List[Customer] = []
+        self._positions: Dict[str, int] = {}
+        for customer in customers or []:
+            self.append(customer)
+    
+    def __len__(self) -> int:
+        return len(self._customers)
+    
+    def __iter__(self) -> Iterator[Customer]:
+        return iter(self._customers)
+    
+    def append(self, customer: Customer, keep_purchases: bool = False) -> None:
+        """
+        Add a customer, replacing any existing record with the same ID. With `keep_purchases`
+        a replaced record keeps its stored purchases instead of taking `customer.purchases`.
+        """
+        position = self._positions.get(customer.id)
+        if position is None:
+            self._positions[customer.id] = len(self._customers)
+            self._customers.append(customer)
+        else:
+            if keep_purchases:
+                customer.purchases = self._customers[position].purchases
+            self._customers[position] = customer
+    
+    def upsert_purchases(self, customer_id: str, purchases: List[Purchase]) -> Optional[Tuple[List[Purchase], List[Purchase]]]:
+        """
+        Add purchases to a customer, replacing (by purchase ID) any it already has.
+        Returns (added, replacing) purchases, or None for an unknown customer.
+        """
+        customer = self.get(customer_id)
+        if customer is None:
+            return None
+        rows = {purchase.id: row for row, purchase in enumerate(customer.purchases)}
+        added: List[Purchase] = []
+        replacing: List[Purchase] = []
+        for purchase in purchases:
+            row = rows.get(purchase.id)
+            if row is None:
+                rows[purchase.id] = len(customer.purchases)
+                customer.purchases.append(purchase)
+                added.append(purchase)
+            else:
+                customer.purchases[row] = purchase
+                replacing.append(purchase)
+        return added, replacing
+    
+    def position_of(self, customer_id: str) -> Optional[int]:
+        return self._positions.get(customer_id)
+    
+    def get(self, customer_id: str) -> Optional[Customer]:
+        position = self._positions.get(customer_id)
+        return self._customers[position] if position is not None else None
+    
+    def iter_matching(
+        self,
+        start: int = 0,
+        region: Optional[str] = None,
+        tier: Optional[str] = None,
+        language: Optional[str] = None,
+        gdpr_consent: Optional[bool] = None,
+    ) -> Iterator[Customer]:
+        """Lazily yield customers from `start` onwards that match every given filter."""
+        for position in range(start, len(self._customers)):
+            customer = self._customers[position]
+            if region is not None and customer.region != region:
+                continue
+            if tier is not None and customer.tier != tier:
+                continue
+            if language is not None and customer.language != language:
+                continue
+            if gdpr_consent is not None and customer.gdpr_consent != gdpr_consent:
+                continue
+            yield customer
 
 
 class CustomerService:
@@ -157,25 +262,192 @@ class CustomerService:
         )
     ]
     
+    # Backing store for lookups and listing; see use_compact_records()
+    STORE = CustomerStore(CUSTOMERS)
+    
+    # Purchase analytics over STORE, built on first use
+    _ANALYTICS = None
+    
+    # GDPR visibility policies over STORE, built on first use
+    _DATA_ACCESS = None
+    
+    # Serializes batched writes so each batch lands in the store and its indexes together
+    _WRITE_LOCK = threading.Lock()
+    
+    @classmethod
+    def use_compact_records(cls) -> None:
+        """Switch to the columnar store, which keeps records packed in parallel arrays."""
+        from customer_store import ColumnarCustomerStore
+        if not isinstance(cls.STORE, ColumnarCustomerStore):
+            cls.STORE = ColumnarCustomerStore(cls.STORE)
+    
     @classmethod
     def get_customer_by_id(cls, customer_id: str) -> Optional[Customer]:
         """Retrieve customer by ID."""
-        return next((c for c in cls.CUSTOMERS if c.id == customer_id), None)
+        return cls.STORE.get(customer_id)
     
     @classmethod
     def get_customers_by_region(cls, region: str) -> List[Customer]:
         """Get all customers in a specific region."""
-        return [c for c in cls.CUSTOMERS if c.region == region]
+        return list(cls.STORE.iter_matching(region=region))
+    
+    @staticmethod
+    def encode_cursor(customer_id: str) -> str:
+        """Encode the last customer ID of a page as an opaque cursor."""
+        return base64.urlsafe_b64encode(customer_id.encode("utf-8")).decode("ascii").rstrip("=")
+    
+    @classmethod
+    def decode_cursor(cls, cursor: str) -> int:
+        """Decode a cursor into the position to resume scanning from."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            customer_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        except (binascii.Error, UnicodeError, ValueError):
+            raise ValueError(f"Invalid cursor: {cursor}")
+        position = cls.STORE.position_of(customer_id)
+        if position is None:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return position + 1
+    
+    @classmethod
+    def iter_customers(
+        cls,
+        region: Optional[str] = None,
+        tier: Optional[str] = None,
+        language: Optional[str] = None,
+        gdpr_consent: Optional[bool] = None,
+        cursor: Optional[str] = None,
+    ) -> Iterator[Customer]:
+        """Lazily yield customers matching the filters, resuming after `cursor`."""
+        start = cls.decode_cursor(cursor) if cursor else 0
+        yield from cls.STORE.iter_matching(start, region, tier, language, gdpr_consent)
+    
+    @classmethod
+    def page_customers(cls, limit: int, cursor: Optional[str] = None, **filters) -> Tuple[List[Customer], Optional[str]]:
+        """Return one page of matching customers and the cursor for the next page."""
+        page = []
+        matches = cls.iter_customers(cursor=cursor, **filters)
+        for customer in matches:
+            if len(page) == limit:
+                # Only hand out a cursor when at least one more match exists
+                return page, cls.encode_cursor(page[-1].id)
+            page.append(customer)
+        return page, None
+    
+    @classmethod
+    def analytics(cls):
+        """Return the purchase analytics for the whole store, computing them on first use."""
+        analytics = cls._ANALYTICS
+        if analytics is None:
+            # Built under the write lock so concurrent first callers build it once and no write is missed
+            with cls._WRITE_LOCK:
+                if cls._ANALYTICS is None:
+                    from customer_analytics import CustomerAnalytics
+                    cls._ANALYTICS = CustomerAnalytics.from_customers(cls.STORE)
+                analytics = cls._ANALYTICS
+        return analytics
+    
+    @classmethod
+    def record_purchase(cls, customer_id: str, purchase: Purchase) -> Optional[bool]:
+        """
+        Record one purchase, replacing any with the same purchase ID. Returns True if it was
+        added, False if it replaced one, and None if the customer does not exist.
+        """
+        inserted, _, unknown = cls.upsert_purchases([(customer_id, purchase)])
+        if unknown:
+            return None
+        return bool(inserted)
+    
+    @classmethod
+    def upsert_customers(cls, customers: List[Tuple[Customer, bool]]) -> Tuple[int, int]:
+        """
+        Insert or replace a batch of (customer, has_purchases) records in one write, updating
+        the analytics and GDPR policies incrementally. A record without purchases keeps the
+        stored customer's purchases. Returns (inserted, updated).
+        """
+        inserted = updated = 0
+        with cls._WRITE_LOCK:
+            analytics = cls._ANALYTICS
+            replaced: Dict[str, List[Purchase]] = {}
+            for customer, has_purchases in customers:
+                if cls.STORE.position_of(customer.id) is None:
+                    inserted += 1
+                    if analytics is not None:
+                        analytics.add_customer(customer.id)
+                        for purchase in customer.purchases:
+                            analytics.add_purchase(customer.id, purchase)
+                else:
+                    updated += 1
+                    if has_purchases:
+                        replaced[customer.id] = customer.purchases
+                cls.STORE.append(customer, keep_purchases=not has_purchases)
+                if cls._DATA_ACCESS is not None:
+                    cls._DATA_ACCESS.refresh(customer)
+            if analytics is not None:
+                analytics.replace_customer_purchases(replaced)
+        return inserted, updated
+    
+    @classmethod
+    def upsert_purchases(cls, purchases: List[Tuple[str, Purchase]]) -> Tuple[int, int, int]:
+        """
+        Insert or replace (by purchase ID) a batch of (customer_id, purchase) records in one
+        write, touching each customer once. Returns (inserted, updated, unknown customer).
+        """
+        by_customer: Dict[str, List[Purchase]] = {}
+        for customer_id, purchase in purchases:
+            by_customer.setdefault(customer_id, []).append(purchase)
+        inserted = updated = unknown = 0
+        with cls._WRITE_LOCK:
+            analytics = cls._ANALYTICS
+            replaced: List[Tuple[str, Purchase]] = []
+            for customer_id, batch in by_customer.items():
+                result = cls.STORE.upsert_purchases(customer_id, batch)
+                if result is None:
+                    unknown += len(batch)
+                    continue
+                added, replacing = result
+                inserted += len(added)
+                updated += len(replacing)
+                replaced.extend((customer_id, purchase) for purchase in replacing)
+                if analytics is not None:
+                    for purchase in added:
+                        analytics.add_purchase(customer_id, purchase)
+            if analytics is not None:
+                # After the additions, so a purchase added and replaced in one batch is found
+                analytics.replace_purchases(replaced)
+        return inserted, updated, unknown
+    
+    @classmethod
+    def refresh_analytics(cls) -> None:
+        """Fold incrementally added purchases into the vectorized aggregates, if they are built."""
+        with cls._WRITE_LOCK:
+            if cls._ANALYTICS is not None:
+                cls._ANALYTICS.refresh()
+    
+    @classmethod
+    def data_access(cls):
+        """Return the GDPR data-access layer, precomputing visibility policies on first use."""
+        if cls._DATA_ACCESS is None:
+            from data_access import DataAccessLayer, default_audit_path
+            cls._DATA_ACCESS = DataAccessLayer(cls.STORE, audit_path=default_audit_path())
+        return cls._DATA_ACCESS
     
     @classmethod
     def get_gdpr_compliant_data(cls, customer_id: str) -> Optional[Customer]:
         """Get customer data with GDPR compliance check."""
         customer = cls.get_customer_by_id(customer_id)
-        if customer and customer.region == "EU" and customer.gdpr_consent:
-            return customer
-        elif customer and customer.region == "US":
+        if customer and cls.data_access().is_accessible(customer):
             return customer
         return None
+    
+    @classmethod
+    def customer_view(cls, customer: Customer, destination: str, stage: str, query_id: Optional[str] = None):
+        """Project a customer for an endpoint in `destination`, with purchase context if permitted."""
+        data_access = cls.data_access()
+        purchase_history = ""
+        if data_access.policy(customer).allows("purchases", destination):
+            purchase_history = cls.analytics().prompt_context(customer.id, pinned_date())
+        return data_access.project(customer, destination, stage, purchase_history, query_id)
 
 
 class GlobalCustomerSupportService:
@@ -184,14 +456,14 @@ class GlobalCustomerSupportService:
     def __init__(self):
         # Initialize LLM objects for our custom endpoints
         self.llm_eu = LLM(
-            model="openai/Qwen2.5-7B-Instruct-GGUF",
-            base_url="http://9.163.149.120:61102/v1",
+            model=DEFAULT_MODEL,
+            base_url=REGION_ENDPOINTS["EU"],
             api_key="local"
         )
         
         self.llm_usa = LLM(
-            model="openai/Qwen2.5-7B-Instruct-GGUF",
-            base_url="http://20.185.179.136:61100/v1",
+            model=DEFAULT_MODEL,
+            base_url=REGION_ENDPOINTS["US"],
             api_key="local"
         )
         
@@ -223,62 +495,149 @@ class GlobalCustomerSupportService:
             verbose=True,
             allow_delegation=False
         )
+        
+        # Support specialist hosted in the EU, so EU tickets never leave the region
+        self.eu_support_agent = Agent(
+            role="EU Customer Support Specialist",
+            goal="Provide excellent customer support to European customers without moving their data out of the EU",
+            backstory=(
+                "You are a skilled EU-based customer support specialist with expertise in "
+                "analyzing customer inquiries and determining appropriate response strategies. "
+                "You handle initial query processing and craft final personalized responses "
+                "for European customers, in their own language and within GDPR constraints."
+            ),
+            llm=self.llm_eu,
+            verbose=True,
+            allow_delegation=False
+        )
+        
+        self.support_agents = {"US": self.us_agent, "EU": self.eu_support_agent}
+        self.router = RoutingPolicy()
+        self.compressor = ContextCompressor()
+        self.templates = default_catalog()
+        self.language_detector = LanguageDetector.from_env()
+        self.language_router = LanguageRouter()
+        self.flights = SingleFlight()
+        self.overload = OverloadController.from_env()
+        self.budgets = BudgetPolicy(load_scale=self.overload.budget_scale)
+        self.endpoint_slots = SlotPool.from_env()
+        self.cassette = install_from_env()
+        self.cascade = CascadePolicy()
+        self._stage_llms: Dict[Tuple[str, str, str, StageBudget], SlottedLLM] = {}
     
-    def process_query(self, query: SupportQuery) -> CollaborationLog:
-        """Process a customer support query using REAL agent collaboration with LLM endpoints."""
-        start_time = datetime.now()
-        steps = []
+    @staticmethod
+    def _system_prompt(agent: Agent) -> str:
+        """The static system prompt CrewAI sends for `agent`'s tasks; identical across tickets."""
+        prompts = Prompts(agent=agent, has_tools=False, i18n=agent.i18n, use_system_prompt=agent.use_system_prompt).task_execution()
+        return prompts.get("system", prompts["prompt"])
+    
+    def warmup_targets(self) -> List[WarmupTarget]:
+        """Every endpoint a stage can be routed to, with the system prompts of the roles that run there."""
+        prompts: Dict[ModelEndpoint, Dict[str, None]] = {}
         
-        # Get customer information
-        customer = CustomerService.get_customer_by_id(query.customer_id)
-        if not customer:
-            return self._create_error_response(query, "Customer not found")
+        def add(endpoint: Optional[ModelEndpoint], agent: Agent) -> None:
+            if endpoint is not None:
+                prompts.setdefault(endpoint, {})[self._system_prompt(agent)] = None
         
-        # Step 1: US Agent analyzes the query (REAL LLM CALL)
-        steps.append(AgentResponse(
-            agent="US",
-            message=f"📥 Analyzing query from {customer.name} ({customer.region}). Calling US LLM endpoint...",
-            timestamp=datetime.now().isoformat(),
-            data={"query_analysis": {"category": query.category, "priority": query.priority, "customer_region": customer.region}}
-        ))
+        for region, agent in self.support_agents.items():
+            add(ModelEndpoint(REGION_ENDPOINTS[region]), agent)
+            add(self.cascade.first_endpoint("analysis", region), agent)
+            add(self.cascade.first_endpoint("response", region), agent)
+            for pool in self.language_router.pools.get(region, {}).values():
+                for endpoint in pool:
+                    add(endpoint, agent)
+        add(ModelEndpoint(REGION_ENDPOINTS["EU"]), self.eu_agent)
+        add(self.cascade.first_endpoint("data_access", "EU"), self.eu_agent)
+        return [WarmupTarget(endpoint, tuple(system_prompts)) for endpoint, system_prompts in prompts.items()]
+    
+    def warm_up(self, timeout_s: Optional[float] = None) -> Warmup:
+        """Start priming every endpoint in the background; readiness waits on the returned Warmup."""
+        targets = self.warmup_targets()
+        print(f"🔥 Warming up {len(targets)} LLM endpoints...")
+        return Warmup(targets, warmup_timeout() if timeout_s is None else timeout_s).start()
+    
+    @staticmethod
+    def _endpoint_host(region: str) -> str:
+        return urlparse(REGION_ENDPOINTS[region]).netloc
+    
+    def _stage_agent(self, agent: Agent, stage: str, budget: StageBudget, endpoint: Optional[ModelEndpoint] = None) -> Agent:
+        """
+        Copy of `agent` whose LLM enforces the stage's token budget and, if any, its JSON schema,
+        can be aborted mid-request, and holds one of its endpoint's concurrency slots while it runs.
+        A language-specific `endpoint` replaces the agent's own model and base URL.
         
-        analysis_task = Task(
+        The LLM is cached; the agent is built per run, since CrewAI agents keep per-run
+        executor state and cumulative token usage that concurrent tickets must not share.
+        """
+        model = endpoint.model if endpoint else agent.llm.model
+        base_url = endpoint.base_url if endpoint else agent.llm.base_url
+        key = (model, base_url, stage, budget)
+        if key not in self._stage_llms:
+            extra = {}
+            if stage in STAGE_SCHEMAS:
+                # Passed through as-is: CrewAI rejects response_format for unknown models
+                extra["extra_body"] = {"response_format": response_format(stage)}
+            self._stage_llms[key] = SlottedLLM(
+                model=model,
+                base_url=base_url,
+                api_key=agent.llm.api_key,
+                max_tokens=budget.max_tokens,
+                temperature=budget.temperature,
+                stop=list(budget.stop) or None,
+                slots=self.endpoint_slots.for_endpoint(base_url),
+                **extra
+            )
+        return Agent(
+            role=agent.role,
+            goal=agent.goal,
+            backstory=agent.backstory,
+            llm=self._stage_llms[key],
+            verbose=False,
+            allow_delegation=False
+        )
+    
+    @staticmethod
+    def _parse_stage(output, stage: str):
+        """Typed result of a structured stage, or None to fall back to treating it as prose."""
+        try:
+            return parse_stage_output(str(output), stage)
+        except StageOutputError as e:
+            print(f"⚠️ Unstructured {stage} output, falling back to text compression: {e}")
+            return None
+    
+    def _analysis_task(self, query: SupportQuery, view, budget: StageBudget, region: str = "US", endpoint: Optional[ModelEndpoint] = None) -> Task:
+        """Analysis stage: triage the query and recommend whether EU collaboration is needed."""
+        return Task(
             description=(
-                f"You are a US-based customer support specialist. Analyze this support query:\n\n"
-                f"Customer: {customer.name} ({customer.region})\n"
-                f"Tier: {customer.tier} | Language: {customer.language}\n"
+                f"You are a {region}-based customer support specialist. Analyze this support query:\n\n"
+                f"Customer: {view.name} ({view.region})\n"
+                f"Tier: {view.tier} | Language: {view.language}\n"
                 f"Query: {query.message}\n"
                 f"Category: {query.category} | Priority: {query.priority}\n\n"
                 f"Provide your initial analysis and determine if we need EU agent collaboration "
-                f"for this {'EU' if customer.region == 'EU' else 'US'} customer. "
-                f"Consider data sovereignty and GDPR requirements."
+                f"for this {'EU' if view.region == 'EU' else 'US'} customer. "
+                f"Consider data sovereignty and GDPR requirements. Set needs_eu_collaboration "
+                f"to false unless EU customer data or EU regulation is actually involved.\n\n"
+                f"{schema_instructions('analysis')}"
             ),
-            expected_output="Initial query analysis with collaboration recommendation",
-            agent=self.us_agent
+            expected_output="JSON object with the query analysis and collaboration recommendation",
+            agent=self._stage_agent(
+                self.support_agents[region], "analysis", budget,
+                endpoint or self.language_router.endpoint(region, view.language)
+            )
         )
-        
-        # FORCE EU collaboration for ALL queries (demo purposes)
-        steps.append(AgentResponse(
-            agent="US", 
-            message=f"🌍 Requesting EU agent collaboration for {'GDPR compliance' if customer.region == 'EU' else 'cross-regional validation'}. Establishing secure connection to EU endpoint...",
-            timestamp=datetime.now().isoformat()
-        ))
-        
-        # Step 2: EU Agent data access and validation (REAL LLM CALL)
-        steps.append(AgentResponse(
-            agent="EU",
-            message=f"🔒 EU Agent responding. Calling EU LLM endpoint for {'GDPR-compliant data access' if customer.region == 'EU' else 'security validation'}...",
-            timestamp=datetime.now().isoformat()
-        ))
-        
+    
+    def _data_access_task(self, query: SupportQuery, view, budget: StageBudget, endpoint: Optional[ModelEndpoint] = None) -> Task:
+        """EU stage: GDPR-compliant data access for EU customers, security validation for US ones."""
         eu_task_description = (
             f"You are an EU-based compliance and data specialist. "
-            f"Customer: {customer.name} ({customer.region}) - {customer.tier} tier\n"
-            f"Language: {customer.language} | GDPR Consent: {customer.gdpr_consent}\n"
+            f"Customer: {view.name} ({view.region}) - {view.tier} tier\n"
+            f"Language: {view.language} | GDPR Consent: {view.gdpr_consent}\n"
+            f"Purchase History: {view.purchase_history}\n"
             f"Query: {query.message}\n\n"
         )
         
-        if customer.region == "EU":
+        if view.region == "EU":
             eu_task_description += (
                 f"This EU customer requires GDPR-compliant data handling. "
                 f"Provide customer insights while ensuring data protection compliance. "
@@ -289,84 +648,178 @@ class GlobalCustomerSupportService:
                 f"This US customer query requires cross-regional security validation. "
                 f"Provide security assessment and any EU-relevant compliance insights."
             )
-            
-        data_access_task = Task(
-            description=eu_task_description,
-            expected_output="Customer data analysis with compliance confirmation",
-            agent=self.eu_agent
-        )
-        
-        # Step 3: Final response generation (REAL LLM CALL)
-        steps.append(AgentResponse(
-            agent="US",
-            message=f"✨ Generating personalized response using multi-agent intelligence. Calling US LLM endpoint for final response...",
-            timestamp=datetime.now().isoformat()
-        ))
         
-        response_task = Task(
-            description=(
-                f"Generate a personalized customer support response in {customer.language}:\n\n"
-                f"Customer Details:\n"
-                f"- Name: {customer.name}\n"
-                f"- Region: {customer.region}\n" 
-                f"- Tier: {customer.tier}\n"
-                f"- Language: {customer.language}\n"
-                f"- Preferred Contact: {customer.preferred_channel}\n"
-                f"- GDPR Consent: {customer.gdpr_consent}\n\n"
-                f"Query Information:\n"
-                f"- Message: {query.message}\n"
-                f"- Category: {query.category}\n"
-                f"- Priority: {query.priority}\n\n"
-                f"IMPORTANT RESPONSE REQUIREMENTS:\n"
-                f"1. Write the ENTIRE response in {customer.language} (not English)\n"
-                f"2. Use appropriate business greeting for {customer.language}\n"
-                f"3. Reference their {customer.tier} tier status appropriately\n"
-                f"4. Include next steps via their preferred {customer.preferred_channel} channel\n"
-                f"5. Add GDPR compliance note if EU customer\n"
-                f"6. Mention this response was created through US-EU collaboration\n\n"
-                f"Use context from previous agent analysis to inform your response."
-            ),
-            expected_output=f"Complete customer support response written in {customer.language}",
-            agent=self.us_agent,
-            context=[analysis_task, data_access_task]
+        return Task(
+            description=eu_task_description + f"\n\n{schema_instructions('data_access')}",
+            expected_output="JSON object with the customer data analysis and compliance confirmation",
+            agent=self._stage_agent(self.eu_agent, "data_access", budget, endpoint)
         )
-        
-        # Create and execute the crew (THIS MAKES REAL LLM CALLS)
+    
+    @staticmethod
+    def _kickoff(task: Task, token: CancellationToken, stage: str):
+        """Run a single-task crew for `stage`, abortable through `token`."""
         crew = Crew(
-            agents=[self.us_agent, self.eu_agent],
-            tasks=[analysis_task, data_access_task, response_task],
+            agents=[task.agent],
+            tasks=[task],
             process=Process.sequential,
-            verbose=True,
+            verbose=False,
             memory=False
         )
+        with cancellation_scope(token, stage):
+            return crew.kickoff()
+    
+    def _run_stage(self, stage: str, region: str, build_task, budget: StageBudget, token: CancellationToken):
+        """
+        Run `stage` on its cascade tier when it has one, escalating to the default model when
+        that output is not trusted. `build_task(endpoint)` builds the task with `budget`, None
+        meaning the stage's default model. Returns (task, crew output, parsed result, cascade outcome).
+        """
+        first = self.cascade.first_endpoint(stage, region)
+        started = time.perf_counter()
+        task = build_task(first)
+        output = self._kickoff(task, token, stage)
+        parsed = self._parse_stage(output, stage) if stage in STAGE_SCHEMAS else None
+        if first is None:
+            return task, output, parsed, None
         
-        # Execute the collaboration (REAL LLM PROCESSING - WILL BE SLOW)
-        print(f"🚀 Starting REAL LLM collaboration for {customer.name}...")
-        result = crew.kickoff()
-        print(f"✅ LLM collaboration completed!")
-        
-        # Add final completion step
-        steps.append(AgentResponse(
-            agent="US",
-            message=f"🎯 Multi-agent collaboration completed. Final response generated in {customer.language} with {customer.region} compliance.",
-            timestamp=datetime.now().isoformat(),
-            data={"customer_data": asdict(customer), "resolution_path": f"{query.category}_tier_{customer.tier.lower()}"}
-        ))
+        first_tier_ms = int((time.perf_counter() - started) * 1000)
+        reason = self.cascade.escalation_reason(stage, str(output), parsed, budget)
+        if reason:
+            print(f"⤴️ Escalating {stage} from {first.model} to the default model: {reason}")
+            task = build_task(None)
+            output = self._kickoff(task, token, stage)
+            parsed = self._parse_stage(output, stage) if stage in STAGE_SCHEMAS else None
+        outcome = CascadeOutcome(
+            tier="default" if reason else self.cascade.tier,
+            model=task.agent.llm.model,
+            escalated=reason is not None,
+            reason=reason,
+            first_tier_ms=first_tier_ms,
+            total_ms=int((time.perf_counter() - started) * 1000)
+        )
+        self.cascade.record(stage, outcome)
+        return task, output, parsed, outcome
+    
+    def _response_description(self, query: SupportQuery, view, analysis_context: str, closing: str, collaborative: bool = True) -> str:
+        """Prompt for the final, customer-facing response stage."""
+        requirements = [
+            f"Write the ENTIRE response in {view.language} (not English)",
+            f"Use appropriate business greeting for {view.language}",
+            f"Reference their {view.tier} tier status appropriately",
+            f"Include next steps via their preferred {view.preferred_channel} channel",
+            "Add GDPR compliance note if EU customer",
+        ]
+        if collaborative:
+            requirements.append("Mention this response was created through US-EU collaboration")
+        requirements.append(f"Never ask for or invent details marked {WITHHELD}")
+        return (
+            f"Generate a personalized customer support response in {view.language}:\n\n"
+            f"Customer Details:\n"
+            f"- Name: {view.name}\n"
+            f"- Region: {view.region}\n"
+            f"- Tier: {view.tier}\n"
+            f"- Language: {view.language}\n"
+            f"- Preferred Contact: {view.preferred_channel}\n"
+            f"- GDPR Consent: {view.gdpr_consent}\n"
+            f"- Purchase History: {view.purchase_history}\n\n"
+            f"Query Information:\n"
+            f"- Message: {query.message}\n"
+            f"- Category: {query.category}\n"
+            f"- Priority: {query.priority}\n\n"
+            f"{analysis_context}"
+            f"IMPORTANT RESPONSE REQUIREMENTS:\n"
+            + "".join(f"{i}. {requirement}\n" for i, requirement in enumerate(requirements, 1))
+            + f"\n{closing}"
+        )
+    
+    @staticmethod
+    def _compliance_rules(query: SupportQuery, view) -> str:
+        """Compliance rules the EU data-access stage would have checked, inlined into a single-call prompt."""
+        rules = []
+        if view.region == "EU":
+            rules.append("This is an EU customer: their data is handled under GDPR and must not be sent outside the EU")
+            if view.gdpr_consent:
+                rules.append("GDPR consent is on file: tier and purchase history may be used to personalize the answer")
+            else:
+                rules.append("No GDPR consent on file: do not use purchase history or profile data beyond the name")
+            rules.append("Do not request personal data the answer does not need")
+        elif EU_RELEVANCE.search(query.message):
+            rules.append("The query mentions EU data or regulation: describe only general GDPR obligations and make no commitments about EU data transfers")
+        rules.append(f"Treat details marked {WITHHELD} as unavailable")
+        return (
+            "Compliance Rules (no separate compliance review runs for this ticket, so apply them yourself):\n"
+            + "".join(f"- {rule}\n" for rule in rules)
+            + "\n"
+        )
+    
+    def process_query(self, query: SupportQuery) -> CollaborationLog:
+        """Process a customer support query using REAL agent collaboration with LLM endpoints."""
+        # Run the same stage-by-stage pipeline as the stream, collecting its steps
+        events, flight_info = self.coalesced_stream(query)
+        log = self._collect(query, events, "real-collab")
+        if log.instrumentation is not None:
+            # Copy: the instrumentation dict is shared by every subscriber of the flight
+            log.instrumentation = {**log.instrumentation, "single_flight": flight_info}
+        return log
+    
+    def query_flight(self, query: SupportQuery) -> Tuple[Flight, bool]:
+        """
+        The pipeline run for `query`, shared with any identical query already in flight.
         
-        processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        Queries are identical when customer, message (whitespace-normalized) and category
+        match; duplicates replay the running pipeline's events instead of calling the LLMs again.
+        The run is always progressive; subscribers that did not ask for it skip the provisional event.
+        """
+        key = (query.customer_id, " ".join(query.message.split()), query.category)
+        return self.flights.join(key, query.id, lambda token: self._admitted_stream(query, token))
+    
+    def _admitted_stream(self, query: SupportQuery, token: CancellationToken):
+        """A progressive pipeline run at the overload controller's current level, counted as in flight until it ends."""
+        level, probe = self.overload.admit()
+        started = time.perf_counter()
+        latency_ms = None
+        try:
+            yield from self.process_query_stream(query, progressive=True, token=token, degradation=level)
+            if level < TEMPLATES:
+                latency_ms = (time.perf_counter() - started) * 1000
+        finally:
+            self.overload.release(latency_ms, probe)
+    
+    def coalesced_stream(self, query: SupportQuery, progressive: bool = False) -> Tuple[Iterator[Dict[str, Any]], Dict[str, Any]]:
+        """`process_query_stream` events for `query` via its shared flight, plus coalescing info."""
+        flight, joined = self.query_flight(query)
+        events = (event for event in flight.subscribe() if progressive or event.get("type") != "provisional")
+        return events, {"coalesced": joined, "leader_query_id": flight.leader_id}
+    
+    def _collect(self, query: SupportQuery, events, id_prefix: str) -> CollaborationLog:
+        """Drain a collaboration event stream into a CollaborationLog."""
+        steps = []
+        collaboration = None
+        for event in events:
+            if "error" in event:
+                return self._create_error_response(query, event["error"])
+            if event["type"] == "step":
+                steps.append(AgentResponse(**event["step"]))
+            elif event["type"] == "complete":
+                collaboration = event["collaboration"]
+        if collaboration is None:
+            return self._create_error_response(query, "Processing was cancelled before completion")
         
         return CollaborationLog(
-            id=f"real-collab-{int(datetime.now().timestamp())}",
+            id=f"{id_prefix}-{new_ulid()}",
             query_id=query.id,
             steps=steps,
-            final_response=str(result),
-            processing_time=processing_time
+            final_response=collaboration["final_response"],
+            processing_time=collaboration["processing_time"],
+            routing=collaboration["routing"],
+            instrumentation=collaboration["instrumentation"],
+            topology=collaboration.get("topology")
         )
     
     def _create_error_response(self, query: SupportQuery, error_message: str) -> CollaborationLog:
         """Create an error response when query processing fails."""
         return CollaborationLog(
-            id=f"error-{int(datetime.now().timestamp())}",
+            id=f"error-{new_ulid()}",
             query_id=query.id,
             steps=[AgentResponse(
                 agent="US",
@@ -377,302 +830,456 @@ class GlobalCustomerSupportService:
             processing_time=0
         )
     
-    def process_query_with_demo_steps(self, query: SupportQuery) -> CollaborationLog:
+    def process_query_with_demo_steps(self, query: SupportQuery, pacing: float = 0.0) -> CollaborationLog:
         """
         Enhanced demo processing that forces multi-agent collaboration for ALL queries
         and shows detailed step-by-step interaction for demonstration purposes.
         """
-        import time
+        return self._collect(query, self.simulate_query_stream(query, pacing), "demo-collab")
+    
+    def simulate_query_stream(self, query: SupportQuery, pacing: float = 1.0, token: Optional[CancellationToken] = None):
+        """
+        Simulation backend: yields the demo collaboration as stream events without any LLM calls.
+        
+        `pacing` scales the simulated delay before each step (1.0 is demo speed); at 0 the
+        stream completes immediately, making it a zero-cost load-test target for the API layer.
+        """
+        token = token or CancellationToken()
         start_time = datetime.now()
         steps = []
         
+        def step(agent: str, message: str, data: Optional[Dict[str, Any]] = None, delay: float = 0.0):
+            if pacing > 0:
+                token.wait(delay * pacing)  # Simulate processing time
+            token.raise_if_cancelled()
+            event = {"agent": agent, "message": message, "timestamp": datetime.now().isoformat(), "data": data}
+            steps.append(AgentResponse(**event))
+            return {"type": "step", "step": event}
+        
         # Get customer information
         customer = CustomerService.get_customer_by_id(query.customer_id)
         if not customer:
-            return self._create_error_response(query, "Customer not found")
+            yield {"error": "Customer not found", "timestamp": datetime.now().isoformat()}
+            return
+        eu_view = CustomerService.customer_view(customer, "EU", "demo_data_access", query.id)
+        # Purchase metrics are derived from purchases, so they are shown only where purchases are
+        metrics = CustomerService.analytics().metrics(customer.id) if "purchases" not in eu_view.withheld else None
         
         # Step 1: US Agent receives and analyzes query
-        time.sleep(0.5)  # Simulate processing time
-        steps.append(AgentResponse(
-            agent="US",
-            message=f"📥 Query received from {customer.name} ({customer.region}). Initial analysis: {query.category} issue with {query.priority} priority. Starting multi-region collaboration protocol...",
-            timestamp=datetime.now().isoformat(),
-            data={"query_analysis": {"category": query.category, "priority": query.priority, "customer_region": customer.region}}
-        ))
+        yield step(
+            "US",
+            f"📥 Query received from {eu_view.name} ({customer.region}). Initial analysis: {query.category} issue with {query.priority} priority. Starting multi-region collaboration protocol...",
+            {"query_analysis": {"category": query.category, "priority": query.priority, "customer_region": customer.region}},
+            delay=0.5
+        )
         
         # Step 2: US Agent initiates database lookup
-        time.sleep(0.7)
-        steps.append(AgentResponse(
-            agent="US",
-            message=f"🔍 Initiating customer database lookup for {customer.id}. Checking regional data access requirements and compliance protocols...",
-            timestamp=datetime.now().isoformat(),
-            data={"database_query": "customer_profile", "status": "initiated"}
-        ))
+        yield step(
+            "US",
+            f"🔍 Initiating customer database lookup for {customer.id}. Checking regional data access requirements and compliance protocols...",
+            {"database_query": "customer_profile", "status": "initiated"},
+            delay=0.7
+        )
         
         # Step 3: ALWAYS involve EU Agent for enhanced collaboration demo
-        time.sleep(0.6)
         eu_reason = "GDPR compliance verification" if customer.region == "EU" else "cross-regional data validation and security consultation"
-        steps.append(AgentResponse(
-            agent="US",
-            message=f"🌍 Requesting EU agent collaboration for {eu_reason}. Establishing secure cross-region communication channel...",
-            timestamp=datetime.now().isoformat()
-        ))
+        yield step(
+            "US",
+            f"🌍 Requesting EU agent collaboration for {eu_reason}. Establishing secure cross-region communication channel...",
+            delay=0.6
+        )
         
         # Step 4: EU Agent responds and processes
-        time.sleep(0.8)
         eu_message = f"🔒 EU Agent online. Processing {eu_reason} for customer {customer.id}." 
         if customer.region == "EU":
             eu_message += f" GDPR consent status: {'✅ Verified' if customer.gdpr_consent else '⚠️ Limited access'}. Accessing EU customer database..."
         else:
             eu_message += f" Cross-validating US customer data against EU security protocols. Checking for any EU-related transaction history..."
         
-        steps.append(AgentResponse(
-            agent="EU",
-            message=eu_message,
-            timestamp=datetime.now().isoformat(),
-            data={"gdpr_check": customer.gdpr_consent, "data_access": "compliant", "customer_data": asdict(customer)}
-        ))
+        yield step(
+            "EU",
+            eu_message,
+            {"gdpr_check": customer.gdpr_consent, "data_access": "compliant", "customer_data": eu_view.as_dict()},
+            delay=0.8
+        )
         
         # Step 5: EU Agent provides additional insights
-        time.sleep(0.5)
         if customer.tier in ["Platinum", "Gold"]:
             tier_insight = "Premium customer - escalating to specialized support team"
         else:
             tier_insight = "Standard support workflow initiated"
             
-        steps.append(AgentResponse(
-            agent="EU",
-            message=f"📊 Customer analysis complete. Tier status: {customer.tier} ({tier_insight}). Purchase history: {len(customer.purchases)} products. Last contact: {customer.last_contact}. Sharing insights with US agent...",
-            timestamp=datetime.now().isoformat(),
-            data={"tier_analysis": customer.tier, "purchase_count": len(customer.purchases)}
-        ))
+        yield step(
+            "EU",
+            f"📊 Customer analysis complete. Tier status: {customer.tier} ({tier_insight}). Purchase history: {f'{metrics.purchase_count} products' if metrics else WITHHELD}. Last contact: {eu_view.last_contact}. Sharing insights with US agent...",
+            {"tier_analysis": customer.tier, "purchase_count": metrics.purchase_count if metrics else WITHHELD, "lifetime_value": metrics.lifetime_value if metrics else WITHHELD},
+            delay=0.5
+        )
         
         # Step 6: Cross-agent data correlation  
-        time.sleep(0.4)
-        steps.append(AgentResponse(
-            agent="US",
-            message=f"🔄 Received EU agent insights. Correlating customer data with query context. Analyzing {query.category} issue against customer's {customer.purchases[-1].product if customer.purchases else 'no recent purchases'} configuration...",
-            timestamp=datetime.now().isoformat()
-        ))
+        yield step(
+            "US",
+            f"🔄 Received EU agent insights. Correlating customer data with query context. Analyzing {query.category} issue against customer's {(metrics.last_product or 'no recent purchases') if metrics else 'current'} configuration...",
+            delay=0.4
+        )
         
         # Step 7: Joint solution analysis
-        time.sleep(0.9)
-        steps.append(AgentResponse(
-            agent="EU" if customer.region == "EU" else "US",
-            message=f"⚡ Joint analysis complete. Issue classification: {query.category}. Recommended resolution path determined based on customer tier ({customer.tier}) and regional requirements. Preparing personalized response...",
-            timestamp=datetime.now().isoformat(),
-            data={"resolution_path": f"{query.category}_tier_{customer.tier.lower()}", "estimated_resolution_time": "2-4 hours"}
-        ))
+        yield step(
+            "EU" if customer.region == "EU" else "US",
+            f"⚡ Joint analysis complete. Issue classification: {query.category}. Recommended resolution path determined based on customer tier ({customer.tier}) and regional requirements. Preparing personalized response...",
+            {"resolution_path": f"{query.category}_tier_{customer.tier.lower()}", "estimated_resolution_time": "2-4 hours"},
+            delay=0.9
+        )
         
         # Step 8: Final response generation
-        time.sleep(0.6)
-        steps.append(AgentResponse(
-            agent="US",
-            message=f"✨ Generating personalized response using multi-agent intelligence. Incorporating regional preferences, tier-specific service levels, and cross-validated customer insights...",
-            timestamp=datetime.now().isoformat()
-        ))
+        yield step(
+            "US",
+            f"✨ Generating personalized response using multi-agent intelligence. Incorporating regional preferences, tier-specific service levels, and cross-validated customer insights...",
+            delay=0.6
+        )
         
         # Generate final response using existing logic
         final_response = self.generate_enhanced_personalized_response(query, customer, steps)
         
         processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
         
-        return CollaborationLog(
-            id=f"demo-collab-{int(datetime.now().timestamp())}",
-            query_id=query.id,
-            steps=steps,
-            final_response=final_response,
-            processing_time=processing_time
-        )
+        yield {
+            "type": "complete",
+            "collaboration": {
+                "id": f"demo-collab-{new_ulid()}",
+                "query_id": query.id,
+                "final_response": final_response,
+                "processing_time": processing_time,
+                "routing": None,
+                "instrumentation": {"simulation": {"pacing": pacing}}
+            }
+        }
     
-    def process_query_stream(self, query: SupportQuery):
-        """Generator that yields REAL-TIME collaboration steps during actual LLM processing."""
-        start_time = datetime.now()
-        customer = CustomerService.get_customer_by_id(query.customer_id)
-        
-        if not customer:
-            yield {"error": "Customer not found", "timestamp": datetime.now().isoformat()}
-            return
-        
-        # Step 1: Initial query processing
+    def _provisional_response(self, query: SupportQuery, customer: Customer, plan) -> str:
+        """Template answer for the planned collaboration, available before any LLM call."""
+        planned_steps = [
+            AgentResponse(agent=region, message="", timestamp=query.timestamp)
+            for region in plan.regions
+        ]
+        return self.generate_enhanced_personalized_response(query, customer, planned_steps)
+    
+    def _template_stream(self, query: SupportQuery, customer: Customer, plan, language: str, language_report: Dict[str, Any], start_time: datetime, degradation: int):
+        """Overload fallback: answer from the response templates without any LLM call."""
+        plan.reasons.append("LLM stages replaced by a template response: service is overloaded")
         yield {
             "type": "step",
             "step": {
-                "agent": "US",
-                "message": f"📥 Starting analysis of query from {customer.name} ({customer.region}). Initializing US LLM endpoint connection...",
+                "agent": plan.data_region,
+                "message": f"🚦 Service under heavy load. Answering from {language} response templates instead of the LLM pipeline...",
                 "timestamp": datetime.now().isoformat(),
-                "data": {"query_analysis": {"category": query.category, "priority": query.priority, "customer_region": customer.region}}
+                "data": {"degradation": self.overload.report(degradation)}
             }
         }
-        
-        # Step 2: Create and execute US Agent analysis task  
         yield {
-            "type": "step", 
+            "type": "complete",
+            "collaboration": {
+                "id": f"stream-collab-{new_ulid()}",
+                "query_id": query.id,
+                "final_response": self._provisional_response(query, replace(customer, language=language), plan),
+                "processing_time": int((datetime.now() - start_time).total_seconds() * 1000),
+                "routing": plan.summary(),
+                "topology": plan.topology,
+                "instrumentation": {
+                    "language": language_report,
+                    "degradation": self.overload.report(degradation)
+                }
+            }
+        }
+    
+    def _single_call_stream(self, query: SupportQuery, customer: Customer, plan, language: str, language_report: Dict[str, Any], start_time: datetime, token: CancellationToken, degradation: int):
+        """
+        Single-call topology: one prompt in the customer's data region triages and answers the
+        ticket, with the compliance rules the EU stage would have checked inlined.
+        """
+        home = plan.data_region
+        yield {
+            "type": "step",
             "step": {
-                "agent": "US",
-                "message": f"🧠 Calling US LLM (20.185.179.136:61100) for query analysis. Processing customer tier: {customer.tier}, Language: {customer.language}...",
+                "agent": home,
+                "message": f"⚡ Single-call pipeline for this {query.priority}-priority {query.category} ticket. Calling {home} LLM ({self._endpoint_host(home)}) to analyze and answer in one pass, in {language}...",
                 "timestamp": datetime.now().isoformat()
             }
         }
         
-        analysis_task = Task(
-            description=(
-                f"You are a US-based customer support specialist. Analyze this support query:\n\n"
-                f"Customer: {customer.name} ({customer.region})\n"
-                f"Tier: {customer.tier} | Language: {customer.language}\n"
-                f"Query: {query.message}\n"
-                f"Category: {query.category} | Priority: {query.priority}\n\n"
-                f"Provide your initial analysis and determine if we need EU agent collaboration "
-                f"for this {'EU' if customer.region == 'EU' else 'US'} customer. "
-                f"Consider data sovereignty and GDPR requirements."
-            ),
-            expected_output="Initial query analysis with collaboration recommendation",
-            agent=self.us_agent
+        view = replace(CustomerService.customer_view(customer, home, "single_call", query.id), language=language)
+        budget = self.budgets.budget_for("response", query)
+        description = self._response_description(
+            query, view, self._compliance_rules(query, view),
+            "First work out the customer's intent and urgency, then write ONE cohesive response. Output only the response.",
+            collaborative=False
         )
         
-        # Execute US analysis task individually
-        crew_analysis = Crew(
-            agents=[self.us_agent],
-            tasks=[analysis_task], 
-            process=Process.sequential,
-            verbose=False,
-            memory=False
-        )
+        def single_call_task(endpoint: Optional[ModelEndpoint]) -> Task:
+            return Task(
+                description=description,
+                expected_output=f"Single, complete customer support response written in {language}",
+                agent=self._stage_agent(
+                    self.support_agents[home], "response", budget,
+                    endpoint or self.language_router.endpoint(home, language)
+                )
+            )
         
-        print(f"🚀 Executing US Agent analysis task...")
-        us_analysis = crew_analysis.kickoff()
-        print(f"✅ US Agent analysis completed!")
+        print(f"🚀 Executing single-call {home} response...")
+        task, final_response, _, outcome = self._run_stage("response", home, single_call_task, budget, token)
+        print(f"✅ Single-call response completed!")
+        language_report["endpoints"] = {"response": f"{task.agent.llm.model} @ {task.agent.llm.base_url}"}
         
-        # Step 3: US Agent completed analysis
         yield {
             "type": "step",
             "step": {
-                "agent": "US", 
-                "message": f"✅ US LLM analysis completed. Initiating EU agent collaboration for {'GDPR compliance' if customer.region == 'EU' else 'cross-regional validation'}...",
-                "timestamp": datetime.now().isoformat()
+                "agent": home,
+                "message": f"🎯 Single-call response generated in {language} with {customer.region} compliance rules applied inline.",
+                "timestamp": datetime.now().isoformat(),
+                "data": {"customer_data": view.as_dict(), "resolution_path": f"{query.category}_tier_{customer.tier.lower()}"}
             }
         }
         
-        # Step 4: EU Agent data access
         yield {
-            "type": "step",
-            "step": {
-                "agent": "EU",
-                "message": f"🔒 EU Agent connecting. Calling EU LLM (9.163.149.120:61102) for {'GDPR-compliant data access' if customer.region == 'EU' else 'security validation'}...",
-                "timestamp": datetime.now().isoformat()
+            "type": "complete",
+            "collaboration": {
+                "id": f"stream-collab-{new_ulid()}",
+                "query_id": query.id,
+                "final_response": str(final_response),
+                "processing_time": int((datetime.now() - start_time).total_seconds() * 1000),
+                "routing": plan.summary(),
+                "topology": plan.topology,
+                "instrumentation": {
+                    "structured_outputs": {},
+                    "token_budgets": {"response": usage_report(budget, final_response)},
+                    "language": language_report,
+                    "cascade": {"response": outcome.report()} if outcome else {},
+                    "degradation": self.overload.report(degradation)
+                }
             }
         }
+    
+    def process_query_stream(
+        self,
+        query: SupportQuery,
+        progressive: bool = False,
+        token: Optional[CancellationToken] = None,
+        degradation: Optional[int] = None
+    ):
+        """
+        Generator that yields REAL-TIME collaboration steps during actual LLM processing.
         
-        eu_task_description = (
-            f"You are an EU-based compliance and data specialist. "
-            f"Customer: {customer.name} ({customer.region}) - {customer.tier} tier\n"
-            f"Language: {customer.language} | GDPR Consent: {customer.gdpr_consent}\n"
-            f"Query: {query.message}\n\n"
-        )
+        With `progressive`, a template-based `provisional` response is yielded first so
+        clients can show an answer immediately; the `complete` event supersedes it.
+        Cancelling `token` raises QueryCancelled at the next stage boundary and aborts
+        the LLM request in flight. `degradation` is the overload level to run at
+        (default: the current one).
+        """
+        token = token or CancellationToken()
+        if degradation is None:
+            degradation = self.overload.level
+        start_time = datetime.now()
+        customer = CustomerService.get_customer_by_id(query.customer_id)
         
-        if customer.region == "EU":
-            eu_task_description += (
-                f"This EU customer requires GDPR-compliant data handling. "
-                f"Provide customer insights while ensuring data protection compliance. "
-                f"Include tier analysis, purchase history context, and regional considerations."
-            )
-        else:
-            eu_task_description += (
-                f"This US customer query requires cross-regional security validation. "
-                f"Provide security assessment and any EU-relevant compliance insights."
-            )
-            
-        data_access_task = Task(
-            description=eu_task_description,
-            expected_output="Customer data analysis with compliance confirmation",
-            agent=self.eu_agent
-        )
+        if not customer:
+            yield {"error": "Customer not found", "timestamp": datetime.now().isoformat()}
+            return
         
-        # Execute EU data access task individually
-        crew_eu = Crew(
-            agents=[self.eu_agent],
-            tasks=[data_access_task],
-            process=Process.sequential,
-            verbose=False,
-            memory=False
-        )
+        # Route every stage to the endpoint in the customer's data region
+        plan = self.router.plan(customer, query)
+        home = plan.data_region
+        if degradation >= SKIP_EU_VALIDATION and customer.region != "EU" and plan.runs("data_access"):
+            plan.skip("data_access", "EU validation skipped for a US customer: service is overloaded")
         
-        print(f"🚀 Executing EU Agent data access task...")
-        eu_analysis = crew_eu.kickoff()
-        print(f"✅ EU Agent analysis completed!")
+        # Answer in the language the customer actually wrote in
+        detection = self.language_detector.detect(customer, query.message)
+        language = detection.language
+        language_report = {
+            "detected": language,
+            "confidence": detection.confidence,
+            "source": detection.source,
+            "profile_language": customer.language
+        }
+        analysis_view = replace(CustomerService.customer_view(customer, home, "analysis", query.id), language=language)
         
-        # Step 5: EU Agent completed analysis
+        # Step 1: Initial query processing
         yield {
             "type": "step",
             "step": {
-                "agent": "EU",
-                "message": f"✅ EU LLM analysis completed. Customer data processed with compliance verification. Sharing insights with US agent...",
+                "agent": home,
+                "message": f"📥 Starting analysis of query from {analysis_view.name} ({customer.region}). Initializing {home} LLM endpoint connection...",
                 "timestamp": datetime.now().isoformat(),
-                "data": {"gdpr_check": customer.gdpr_consent, "data_access": "compliant", "customer_data": asdict(customer)}
+                "data": {
+                    "query_analysis": {"category": query.category, "priority": query.priority, "customer_region": customer.region},
+                    "routing": plan.summary(),
+                    "language": language_report
+                }
             }
         }
         
+        if progressive:
+            yield {
+                "type": "provisional",
+                "final_response": self._provisional_response(query, replace(customer, language=language), plan),
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        if degradation >= TEMPLATES:
+            yield from self._template_stream(query, customer, plan, language, language_report, start_time, degradation)
+            return
+        if plan.topology == SINGLE_CALL:
+            yield from self._single_call_stream(query, customer, plan, language, language_report, start_time, token, degradation)
+            return
+        
+        # Step 2: Create and execute the analysis task in the customer's region
+        yield {
+            "type": "step", 
+            "step": {
+                "agent": home,
+                "message": f"🧠 Calling {home} LLM ({self._endpoint_host(home)}) for query analysis. Processing customer tier: {customer.tier}, Language: {language}...",
+                "timestamp": datetime.now().isoformat()
+            }
+        }
+        
+        # Execute analysis task individually, on the cheaper model tier first if one is configured
+        print(f"🚀 Executing {home} Agent analysis task...")
+        # Resolved once, so the report shows the budget the stage ran with even if the overload level moves
+        analysis_budget = self.budgets.budget_for("analysis", query)
+        analysis_task, us_analysis, analysis, outcome = self._run_stage(
+            "analysis", home, lambda endpoint: self._analysis_task(query, analysis_view, analysis_budget, home, endpoint), analysis_budget, token
+        )
+        print(f"✅ {home} Agent analysis completed!")
+        cascade = {"analysis": outcome.report()} if outcome else {}
+        structured = {"analysis": "parsed" if analysis is not None else "fallback"}
+        token_usage = {"analysis": usage_report(analysis_budget, us_analysis)}
+        
+        # Early exit: the analysis may drop an EU stage that only a keyword match scheduled
+        if (analysis is not None and not analysis.needs_eu_collaboration
+                and plan.runs("data_access") and "data_access" in plan.optional):
+            plan.skip("data_access", f"EU data-access stage skipped after analysis: {analysis.collaboration_reason}")
+        analysis_data = {"analysis": asdict(analysis)} if analysis is not None else None
+        
+        eu_analysis = None
+        data_access = None
+        if plan.runs("data_access"):
+            # Step 3: Analysis completed, EU collaboration required
+            yield {
+                "type": "step",
+                "step": {
+                    "agent": home, 
+                    "message": f"✅ {home} LLM analysis completed. Initiating EU agent collaboration for {'GDPR compliance' if customer.region == 'EU' else 'cross-regional validation'}...",
+                    "timestamp": datetime.now().isoformat(),
+                    "data": analysis_data
+                }
+            }
+            
+            # Step 4: EU Agent data access
+            yield {
+                "type": "step",
+                "step": {
+                    "agent": "EU",
+                    "message": f"🔒 EU Agent connecting. Calling EU LLM ({self._endpoint_host('EU')}) for {'GDPR-compliant data access' if customer.region == 'EU' else 'security validation'}...",
+                    "timestamp": datetime.now().isoformat()
+                }
+            }
+            
+            eu_view = CustomerService.customer_view(customer, "EU", "data_access", query.id)
+            
+            # Execute EU data access task individually
+            print(f"🚀 Executing EU Agent data access task...")
+            data_access_budget = self.budgets.budget_for("data_access", query)
+            _, eu_analysis, data_access, outcome = self._run_stage(
+                "data_access", "EU", lambda endpoint: self._data_access_task(query, eu_view, data_access_budget, endpoint), data_access_budget, token
+            )
+            print(f"✅ EU Agent analysis completed!")
+            if outcome:
+                cascade["data_access"] = outcome.report()
+            structured["data_access"] = "parsed" if data_access is not None else "fallback"
+            token_usage["data_access"] = usage_report(data_access_budget, eu_analysis)
+            
+            # Step 5: EU Agent completed analysis
+            yield {
+                "type": "step",
+                "step": {
+                    "agent": "EU",
+                    "message": f"✅ EU LLM analysis completed. Customer data processed with compliance verification. Sharing insights with {plan.region('response')} agent...",
+                    "timestamp": datetime.now().isoformat(),
+                    "data": {
+                        "gdpr_check": customer.gdpr_consent,
+                        "data_access": data_access.compliance_status if data_access is not None else "compliant",
+                        "customer_data": eu_view.as_dict()
+                    }
+                }
+            }
+        else:
+            yield {
+                "type": "step",
+                "step": {
+                    "agent": home,
+                    "message": f"✅ {home} LLM analysis completed. EU collaboration not required for this {customer.region} ticket; skipping the cross-region hop...",
+                    "timestamp": datetime.now().isoformat(),
+                    "data": analysis_data
+                }
+            }
+        
         # Step 6: Final response generation
+        response_region = plan.region("response")
         yield {
             "type": "step",
             "step": {
-                "agent": "US",
-                "message": f"✨ Generating personalized response in {customer.language}. Combining US analysis + EU compliance data. Calling US LLM for final response...",
+                "agent": response_region,
+                "message": f"✨ Generating personalized response in {language}. Combining {' + '.join(plan.regions)} analysis. Calling {response_region} LLM for final response...",
                 "timestamp": datetime.now().isoformat()
             }
         }
         
-        response_task = Task(
-            description=(
-                f"Generate a personalized customer support response in {customer.language}:\n\n"
-                f"Customer Details:\n"
-                f"- Name: {customer.name}\n"
-                f"- Region: {customer.region}\n" 
-                f"- Tier: {customer.tier}\n"
-                f"- Language: {customer.language}\n"
-                f"- Preferred Contact: {customer.preferred_channel}\n"
-                f"- GDPR Consent: {customer.gdpr_consent}\n\n"
-                f"Query Information:\n"
-                f"- Message: {query.message}\n"
-                f"- Category: {query.category}\n"
-                f"- Priority: {query.priority}\n\n"
-                f"Previous Analysis Context:\n"
-                f"- US Agent Analysis: {str(us_analysis)[:200]}...\n"
-                f"- EU Agent Analysis: {str(eu_analysis)[:200]}...\n\n"
-                f"IMPORTANT RESPONSE REQUIREMENTS:\n"
-                f"1. Write the ENTIRE response in {customer.language} (not English)\n"
-                f"2. Use appropriate business greeting for {customer.language}\n"
-                f"3. Reference their {customer.tier} tier status appropriately\n"
-                f"4. Include next steps via their preferred {customer.preferred_channel} channel\n"
-                f"5. Add GDPR compliance note if EU customer\n"
-                f"6. Mention this response was created through US-EU collaboration\n\n"
-                f"Create ONE cohesive response (not duplicate content)."
-            ),
-            expected_output=f"Single, complete customer support response written in {customer.language}",
-            agent=self.us_agent
-        )
+        # Hand the response stage a budgeted summary of upstream outputs instead of raw text
+        stage_outputs = {"analysis": str(us_analysis)}
+        if eu_analysis is not None:
+            stage_outputs["data_access"] = str(eu_analysis)
+        if analysis is not None and (eu_analysis is None or data_access is not None):
+            compressed = self.compressor.compress_structured(stage_outputs, analysis, data_access, query)
+        else:
+            compressed = self.compressor.compress(stage_outputs, query)
+        analysis_context = compressed.to_prompt()
         
-        # Execute final response task individually
-        crew_response = Crew(
-            agents=[self.us_agent],
-            tasks=[response_task],
-            process=Process.sequential, 
-            verbose=False,
-            memory=False
+        response_view = CustomerService.customer_view(customer, response_region, "response", query.id)
+        response_budget = self.budgets.budget_for("response", query)
+        response_description = self._response_description(
+            query, replace(response_view, language=language), analysis_context + "\n",
+            "Create ONE cohesive response (not duplicate content).",
+            collaborative=len(plan.regions) > 1
         )
         
+        def response_task(endpoint: Optional[ModelEndpoint]) -> Task:
+            return Task(
+                description=response_description,
+                expected_output=f"Single, complete customer support response written in {language}",
+                agent=self._stage_agent(
+                    self.support_agents[response_region], "response", response_budget,
+                    endpoint or self.language_router.endpoint(response_region, language)
+                )
+            )
+        
+        # Execute final response task individually
         print(f"🚀 Executing final response generation...")
-        final_response = crew_response.kickoff()
+        final_task, final_response, _, outcome = self._run_stage("response", response_region, response_task, response_budget, token)
         print(f"✅ Final response completed!")
+        if outcome:
+            cascade["response"] = outcome.report()
+        language_report["endpoints"] = {
+            "analysis": f"{analysis_task.agent.llm.model} @ {analysis_task.agent.llm.base_url}",
+            "response": f"{final_task.agent.llm.model} @ {final_task.agent.llm.base_url}"
+        }
+        token_usage["response"] = usage_report(response_budget, final_response)
         
         # Step 7: Completion
         yield {
             "type": "step",
             "step": {
-                "agent": "US",
-                "message": f"🎯 Multi-agent collaboration completed. Final response generated in {customer.language} with {customer.region} compliance.",
+                "agent": response_region,
+                "message": f"🎯 Multi-agent collaboration completed. Final response generated in {language} with {customer.region} compliance.",
                 "timestamp": datetime.now().isoformat(),
-                "data": {"customer_data": asdict(customer), "resolution_path": f"{query.category}_tier_{customer.tier.lower()}"}
+                "data": {"customer_data": response_view.as_dict(), "resolution_path": f"{query.category}_tier_{customer.tier.lower()}"}
             }
         }
         
@@ -682,118 +1289,35 @@ class GlobalCustomerSupportService:
         yield {
             "type": "complete",
             "collaboration": {
-                "id": f"stream-collab-{int(datetime.now().timestamp())}",
+                "id": f"stream-collab-{new_ulid()}",
                 "query_id": query.id,
                 "final_response": str(final_response),
-                "processing_time": processing_time
+                "processing_time": processing_time,
+                "routing": plan.summary(),
+                "topology": plan.topology,
+                "instrumentation": {
+                    "context_compression": compressed.report(),
+                    "structured_outputs": structured,
+                    "token_budgets": token_usage,
+                    "language": language_report,
+                    "cascade": cascade,
+                    "degradation": self.overload.report(degradation)
+                }
             }
         }
     
     def generate_enhanced_personalized_response(self, query: SupportQuery, customer: Customer, collaboration_steps: List[AgentResponse]) -> str:
         """Generate enhanced personalized response with multi-agent context and full multi-language support."""
-        # Multi-language templates
-        lang_templates = {
-            "German": {
-                "greeting": "Guten Tag",
-                "thank_you": "Vielen Dank für Ihre Kontaktaufnahme mit unserem Global Customer Support Team.",
-                "processed_through": "Ihre Anfrage wurde durch unser fortschrittliches Multi-Region-Kollaborationssystem bearbeitet",
-                "including_specialists": ", einschließlich unserer EU-Compliance-Spezialisten",
-                "technical_analysis": "Unsere technische Analyse zeigt, dass Sie Probleme mit Ihrem {product} haben. Als geschätzter {tier}-Tier-Kunde wurde dies an unser Spezialistenteam eskaliert, das Sie innerhalb von 2 Stunden über {channel} kontaktieren wird.",
-                "billing_inquiry": "Bezüglich Ihrer Rechnungsanfrage für {product} werden unsere Rechnungsspezialisten (koordiniert zwischen unseren US- und EU-Teams) Ihr Konto überprüfen und Sie über {channel} kontaktieren.",
-                "general_inquiry": "Ihre allgemeine Anfrage wurde von unserem Multi-Regional-Support-Team gründlich überprüft. Basierend auf Ihrem {tier}-Tier-Status und Ihrer Service-Historie werden wir umfassende Unterstützung bieten.",
-                "gdpr_notice": "🔒 Datenschutzhinweis: Diese Antwort wurde in vollständiger Übereinstimmung mit der DSGVO verarbeitet. Ihre Daten wurden ausschließlich von unseren EU-basierten Systemen und Agenten behandelt.",
-                "security_notice": "🔐 Sicherheitshinweis: Ihre Anfrage wurde durch unsere sichere Multi-Regional-Infrastruktur mit angemessenen Datenschutzmaßnahmen verarbeitet.",
-                "collaboration_footer": "Diese Antwort wurde durch die Zusammenarbeit zwischen unseren US- und EU-Support-Teams erstellt, um sicherzustellen, dass Sie die höchste Servicequalität in allen Regionen erhalten.",
-                "best_regards": "Mit freundlichen Grüßen,\nGlobal Customer Support Team",
-                "footer": "🇺🇸 US-Betrieb • 🇪🇺 EU-Compliance • 🌍 Multi-Regionale Exzellenz"
-            },
-            "Italian": {
-                "greeting": "Buongiorno",
-                "thank_you": "Grazie per aver contattato il nostro team di Global Customer Support.",
-                "processed_through": "La vostra richiesta è stata elaborata attraverso il nostro avanzato sistema di collaborazione multi-regionale",
-                "including_specialists": ", inclusi i nostri specialisti di conformità UE",
-                "technical_analysis": "La nostra analisi tecnica indica che state riscontrando problemi con il vostro {product}. Come stimato cliente tier {tier}, questo è stato escalato al nostro team specialistico che vi contatterà tramite {channel} entro 2 ore.",
-                "billing_inquiry": "Riguardo alla vostra richiesta di fatturazione per {product}, i nostri specialisti di fatturazione (coordinandosi tra i team US e UE) esamineranno il vostro account e vi contatteranno tramite {channel}.",
-                "general_inquiry": "La vostra richiesta generale è stata accuratamente esaminata dal nostro team di supporto multi-regionale. Basandoci sul vostro status tier {tier} e sulla cronologia dei servizi, forniremo assistenza completa.",
-                "gdpr_notice": "🔒 Avviso Protezione Dati: Questa risposta è stata elaborata in piena conformità con il regolamento GDPR. I vostri dati sono stati gestiti esclusivamente dai nostri sistemi e agenti basati nell'UE.",
-                "security_notice": "🔐 Avviso Sicurezza: La vostra richiesta è stata elaborata attraverso la nostra infrastruttura multi-regionale sicura con appropriate misure di protezione dati.",
-                "collaboration_footer": "Questa risposta è stata generata attraverso la collaborazione tra i nostri team di supporto US e UE, assicurando che riceviate la massima qualità del servizio in tutte le regioni.",
-                "best_regards": "Cordiali saluti,\nTeam Global Customer Support",
-                "footer": "🇺🇸 Operazioni US • 🇪🇺 Conformità UE • 🌍 Eccellenza Multi-Regionale"
-            },
-            "French": {
-                "greeting": "Bonjour",
-                "thank_you": "Merci d'avoir contacté notre équipe de Global Customer Support.",
-                "processed_through": "Votre demande a été traitée par notre système avancé de collaboration multi-régionale",
-                "including_specialists": ", incluant nos spécialistes de conformité UE",
-                "technical_analysis": "Notre analyse technique indique que vous rencontrez des problèmes avec votre {product}. En tant que client estimé de niveau {tier}, ceci a été escaladé à notre équipe spécialisée qui vous contactera via {channel} dans les 2 heures.",
-                "billing_inquiry": "Concernant votre demande de facturation pour {product}, nos spécialistes de facturation (coordonnant entre nos équipes US et UE) examineront votre compte et vous contacteront via {channel}.",
-                "general_inquiry": "Votre demande générale a été soigneusement examinée par notre équipe de support multi-régionale. Basé sur votre statut niveau {tier} et l'historique de service, nous fournirons une assistance complète.",
-                "gdpr_notice": "🔒 Avis Protection des Données: Cette réponse a été traitée en pleine conformité avec le règlement RGPD. Vos données ont été gérées exclusivement par nos systèmes et agents basés dans l'UE.",
-                "security_notice": "🔐 Avis Sécurité: Votre demande a été traitée par notre infrastructure multi-régionale sécurisée avec des mesures appropriées de protection des données.",
-                "collaboration_footer": "Cette réponse a été générée par la collaboration entre nos équipes de support US et UE, garantissant que vous recevez la plus haute qualité de service dans toutes les régions.",
-                "best_regards": "Cordialement,\nÉquipe Global Customer Support",
-                "footer": "🇺🇸 Opérations US • 🇪🇺 Conformité UE • 🌍 Excellence Multi-Régionale"
-            },
-            "English": {
-                "greeting": "Hello",
-                "thank_you": "Thank you for contacting our Global Customer Support team.",
-                "processed_through": "Your inquiry has been processed through our advanced multi-region collaboration system",
-                "including_specialists": ", including our EU compliance specialists",
-                "technical_analysis": "Our technical analysis indicates you're experiencing issues with your {product}. As a valued {tier} tier customer, this has been escalated to our specialist team who will contact you via {channel} within 2 hours.",
-                "billing_inquiry": "Regarding your billing inquiry for {product}, our billing specialists (coordinating between our US and EU teams) will review your account and contact you via {channel}.",
-                "general_inquiry": "Your general inquiry has been thoroughly reviewed by our multi-regional support team. Based on your {tier} tier status and service history, we'll provide comprehensive assistance.",
-                "gdpr_notice": "🔒 Data Protection Notice: This response was processed in full compliance with GDPR regulations. Your data was handled exclusively by our EU-based systems and agents.",
-                "security_notice": "🔐 Security Notice: Your inquiry was processed through our secure multi-regional infrastructure with appropriate data protection measures.",
-                "collaboration_footer": "This response was generated through collaboration between our US and EU support teams, ensuring you receive the highest quality of service across all regions.",
-                "best_regards": "Best regards,\nGlobal Customer Support Team",
-                "footer": "🇺🇸 US Operations • 🇪🇺 EU Compliance • 🌍 Multi-Regional Excellence"
-            }
-        }
-        
-        # Get language template (fallback to English)
-        lang = lang_templates.get(customer.language, lang_templates["English"])
-        greeting = lang["greeting"]
-        
-        response = f"{greeting} {customer.name},\n\n"
-        
-        # Add collaboration context with language support
-        response += lang["thank_you"] + " " + lang["processed_through"]
-        if any(step.agent == "EU" for step in collaboration_steps):
-            response += lang["including_specialists"]
-        response += ".\n\n"
-        
-        # Category-specific response with multi-language support
-        product = customer.purchases[-1].product if customer.purchases else 'current setup'
-        
-        if query.category == "technical":
-            response += lang["technical_analysis"].format(
-                product=product,
-                tier=customer.tier,
-                channel=customer.preferred_channel
-            ) + "\n\n"
-        
-        elif query.category == "billing":
-            response += lang["billing_inquiry"].format(
-                product=product,
-                channel=customer.preferred_channel
-            ) + "\n\n"
-            
-        elif query.category == "general":
-            response += lang["general_inquiry"].format(tier=customer.tier) + "\n\n"
-        
-        # Regional compliance note with language support
-        if customer.region == "EU":
-            response += lang["gdpr_notice"] + "\n\n"
-        else:
-            response += lang["security_notice"] + "\n\n"
-        
-        # Multi-language collaboration footer
-        response += lang["collaboration_footer"] + "\n\n"
-        response += lang["best_regards"] + "\n"
-        response += lang["footer"]
-        
-        return response
+        return self.templates.render(
+            language=customer.language,
+            category=query.category,
+            tier=customer.tier,
+            channel=customer.preferred_channel,
+            region=customer.region,
+            eu_collaboration=any(step.agent == "EU" for step in collaboration_steps),
+            name=customer.name,
+            product=CustomerService.analytics().metrics(customer.id).last_product or 'current setup'
+        )
 
 
 def demo_customer_support():
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+GDPR-Aware Data Access Layer
+Precomputes which customer fields may be sent to each region's endpoints and
+projects customer records accordingly before they reach a prompt or payload.
+"""
+
+import json
+import os
+import queue
+import threading
+from functools import lru_cache
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from customer_support import WITHHELD, Customer, Purchase
+
+
+REGIONS = ("US", "EU")
+
+CUSTOMER_FIELDS = tuple(f.name for f in fields(Customer))
+FIELD_BITS = {name: 1 << i for i, name in enumerate(CUSTOMER_FIELDS)}
+ALL_FIELDS = (1 << len(CUSTOMER_FIELDS)) - 1
+
+# Fields that identify a service level but not a person
+PSEUDONYMOUS = sum(FIELD_BITS[name] for name in ("id", "region", "tier", "language", "gdpr_consent", "preferred_channel"))
+
+
+@dataclass(frozen=True)
+class VisibilityPolicy:
+    """Field masks per destination region for one class of customer."""
+    name: str
+    masks: Dict[str, int]
+    accessible: bool  # whether the customer's data may be used at all
+
+    def allows(self, field_name: str, destination: str) -> bool:
+        return bool(self.masks[destination] & FIELD_BITS[field_name])
+
+
+# US customers are unrestricted; EU data stays in the EU unless the customer consented
+# to cross-border processing, and then only what is needed to address them leaves.
+US_CUSTOMER = VisibilityPolicy("us-customer", {"US": ALL_FIELDS, "EU": ALL_FIELDS}, True)
+EU_CONSENTED = VisibilityPolicy("eu-consented", {"US": PSEUDONYMOUS | FIELD_BITS["name"], "EU": ALL_FIELDS}, True)
+EU_NO_CONSENT = VisibilityPolicy("eu-no-consent", {"US": PSEUDONYMOUS, "EU": PSEUDONYMOUS}, False)
+
+
+@lru_cache(maxsize=None)
+def _withheld_fields(mask: int) -> Tuple[str, ...]:
+    return tuple(name for name in CUSTOMER_FIELDS if not mask & FIELD_BITS[name])
+
+
+def policy_for(customer: Customer) -> VisibilityPolicy:
+    if customer.region != "EU":
+        return US_CUSTOMER
+    return EU_CONSENTED if customer.gdpr_consent else EU_NO_CONSENT
+
+
+@dataclass(slots=True)
+class CustomerView:
+    """A customer record as visible to one destination region; withheld fields are masked."""
+    id: str
+    name: str
+    email: str
+    region: str
+    tier: str
+    language: str
+    gdpr_consent: bool
+    last_contact: str
+    preferred_channel: str
+    purchases: List[Purchase]
+    purchase_history: str
+    destination: str
+    withheld: Tuple[str, ...] = field(default_factory=tuple)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Projected customer fields for JSON payloads."""
+        projected = {name: getattr(self, name) for name in CUSTOMER_FIELDS if name not in self.withheld}
+        if "purchases" in projected:
+            projected["purchases"] = [asdict(p) for p in self.purchases]
+        return projected
+
+
+class AuditTrail:
+    """Append-only JSONL audit log written by a background thread, off the request path."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._writer = None
+        if path:
+            self._writer = threading.Thread(target=self._drain, name="gdpr-audit-writer", daemon=True)
+            self._writer.start()
+
+    def record(self, event: Dict[str, Any]) -> None:
+        if self._writer is not None:
+            self._queue.put_nowait(event)
+
+    def _drain(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as log:
+            while True:
+                event = self._queue.get()
+                if event is None:
+                    return
+                log.write(json.dumps(event) + "\n")
+                # Batch whatever else is already queued before flushing
+                while not self._queue.empty():
+                    event = self._queue.get_nowait()
+                    if event is None:
+                        log.flush()
+                        return
+                    log.write(json.dumps(event) + "\n")
+                log.flush()
+
+    def close(self) -> None:
+        """Flush pending events and stop the writer."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+
+class DataAccessLayer:
+    """Per-customer visibility policies with O(1) checks and cheap projection."""
+
+    def __init__(self, customers: Iterable[Customer], audit_path: Optional[str] = None):
+        self._policies: Dict[str, VisibilityPolicy] = {c.id: policy_for(c) for c in customers}
+        self.audit = AuditTrail(audit_path)
+
+    def refresh(self, customer: Customer) -> None:
+        """Recompute a customer's policy after their region or consent changed."""
+        self._policies[customer.id] = policy_for(customer)
+
+    def policy(self, customer: Customer) -> VisibilityPolicy:
+        policy = self._policies.get(customer.id)
+        if policy is None:
+            policy = self._policies[customer.id] = policy_for(customer)
+        return policy
+
+    def is_accessible(self, customer: Customer) -> bool:
+        return self.policy(customer).accessible
+
+    def project(
+        self,
+        customer: Customer,
+        destination: str,
+        stage: str,
+        purchase_history: str = "",
+        query_id: Optional[str] = None,
+    ) -> CustomerView:
+        """Mask the fields `destination` may not see and record the disclosure."""
+        policy = self.policy(customer)
+        withheld = _withheld_fields(policy.masks[destination])
+        values = {name: WITHHELD for name in withheld}
+        purchases_visible = "purchases" not in values
+        view = CustomerView(
+            id=values.get("id", customer.id),
+            name=values.get("name", customer.name),
+            email=values.get("email", customer.email),
+            region=values.get("region", customer.region),
+            tier=values.get("tier", customer.tier),
+            language=values.get("language", customer.language),
+            gdpr_consent=values.get("gdpr_consent", customer.gdpr_consent),
+            last_contact=values.get("last_contact", customer.last_contact),
+            preferred_channel=values.get("preferred_channel", customer.preferred_channel),
+            purchases=customer.purchases if purchases_visible else [],
+            purchase_history=purchase_history if purchases_visible else WITHHELD,
+            destination=destination,
+            withheld=withheld
+        )
+        self.audit.record({
+            "timestamp": datetime.now().isoformat(),
+            "query_id": query_id,
+            "customer_id": customer.id,
+            "stage": stage,
+            "destination": destination,
+            "policy": policy.name,
+            "withheld": list(withheld)
+        })
+        return view
+
+
+def default_audit_path() -> Optional[str]:
+    """Audit log location; set GDPR_AUDIT_LOG to an empty string to disable."""
+    return os.getenv("GDPR_AUDIT_LOG", "gdpr_audit.jsonl") or None
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Per-Endpoint Concurrency Slots
+Caps how many stage LLM calls from concurrent tickets are in flight on each endpoint,
+matching llama.cpp's parallel slots, which it already decodes together through
+continuous batching. Calls waiting for a slot give it up as soon as their run is cancelled.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from cancellation import CancellableLLM, current_token
+
+DEFAULT_SLOTS = 4
+CANCEL_POLL_S = 0.1  # how often a queued call checks its run's cancellation token
+
+
+class EndpointSlots:
+    """
+    Admits at most `slots` calls to one endpoint at a time (llama.cpp's `--parallel`).
+    Each call runs on its caller's thread, so each pipeline gets its own response back
+    directly; calls beyond the limit wait for a slot to free up.
+    """
+
+    def __init__(self, endpoint: str, slots: int = DEFAULT_SLOTS):
+        self.endpoint = endpoint
+        self.slots = slots
+        self._slots = threading.BoundedSemaphore(slots)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+        self.calls = 0
+        self.cancelled_while_queued = 0
+        self.total_wait_ms = 0.0
+        self.max_waited_ms = 0.0
+
+    def _acquire(self) -> None:
+        token = current_token()
+        if token is None:
+            self._slots.acquire()
+            return
+        while not self._slots.acquire(timeout=CANCEL_POLL_S):
+            token.raise_if_cancelled()
+
+    @contextmanager
+    def hold(self):
+        """Hold one of the endpoint's slots while the call runs; raises QueryCancelled if the run is cancelled while queued."""
+        arrived = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+        try:
+            self._acquire()
+        except BaseException:
+            with self._lock:
+                self.queued -= 1
+                self.cancelled_while_queued += 1
+            raise
+
+        waited = (time.perf_counter() - arrived) * 1000
+        with self._lock:
+            self.queued -= 1
+            self.calls += 1
+            self.total_wait_ms += waited
+            self.max_waited_ms = max(self.max_waited_ms, waited)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "calls": self.calls,
+                "cancelled_while_queued": self.cancelled_while_queued,
+                "mean_wait_ms": round(self.total_wait_ms / self.calls, 2) if self.calls else 0.0,
+                "max_waited_ms": round(self.max_waited_ms, 2)
+            }
+
+
+class SlotPool:
+    """One EndpointSlots per endpoint base URL, with the same slot count."""
+
+    def __init__(self, slots: int = DEFAULT_SLOTS):
+        self.slots = slots
+        self._endpoints: Dict[str, EndpointSlots] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SlotPool":
+        """Slot count from LLM_PARALLEL_SLOTS; set it to the servers' `--parallel`."""
+        slots = int(os.environ.get("LLM_PARALLEL_SLOTS", DEFAULT_SLOTS))
+        if slots < 1:
+            raise ValueError("LLM_PARALLEL_SLOTS must be at least 1")
+        return cls(slots)
+
+    def for_endpoint(self, base_url: str) -> EndpointSlots:
+        with self._lock:
+            if base_url not in self._endpoints:
+                self._endpoints[base_url] = EndpointSlots(base_url, self.slots)
+            return self._endpoints[base_url]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            endpoints = list(self._endpoints.values())
+        return {slots.endpoint: slots.stats() for slots in endpoints}
+
+
+class SlottedLLM(CancellableLLM):
+    """Stage LLM whose calls each hold a slot of their endpoint while they run."""
+
+    def __init__(self, *args, slots: Optional[EndpointSlots] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slots = slots
+
+    def call(self, messages, *args, **kwargs):
+        if self.slots is None:
+            return super().call(messages, *args, **kwargs)
+        with self.slots.hold():
+            return super().call(messages, *args, **kwargs)
@@ -38,7 +38,8 @@ function App() {
               query_id: query.id,
               steps: [...steps, step],
               final_response: prev?.final_response || '',
-              processing_time: prev?.processing_time || 0
+              processing_time: prev?.processing_time || 0,
+              provisional: prev?.provisional
             };
           });
         },
@@ -60,6 +61,17 @@ function App() {
           console.error('Streaming query failed:', errorMessage);
           setError(errorMessage);
           setIsProcessing(false);
+        },
+        // onProvisional callback - instant template answer, replaced by onComplete
+        (finalResponse) => {
+          setCurrentCollaboration(prev => ({
+            id: prev?.id || `temp-${Date.now()}`,
+            query_id: query.id,
+            steps: prev?.steps || [],
+            final_response: finalResponse,
+            processing_time: 0,
+            provisional: true
+          }));
         }
       );
     } catch (error) {
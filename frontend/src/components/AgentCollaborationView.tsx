@@ -167,7 +167,7 @@ export const AgentCollaborationView: React.FC<AgentCollaborationViewProps> = ({
                             <div className="p-3 bg-green-50 rounded-lg border border-green-200">
                               <div className="font-semibold text-green-800 text-sm mb-1">👤 Customer Profile</div>
                               <div className="text-xs text-green-700">
-                                {step.data.customer_data.name} • {step.data.customer_data.tier} Tier<br/>
+                                {step.data.customer_data.name ?? 'Name withheld (GDPR)'} • {step.data.customer_data.tier} Tier<br/>
                                 Region: {step.data.customer_data.region} | GDPR: {step.data.customer_data.gdpr_consent ? '✅' : '❌'}
                               </div>
                             </div>
@@ -1,5 +1,5 @@
 import React from 'react';
-import { MessageSquare, Copy, CheckCircle, Globe } from 'lucide-react';
+import { MessageSquare, Copy, CheckCircle, Globe, Loader2 } from 'lucide-react';
 import { CollaborationLog } from '../types';
 
 interface ResponseDisplayProps {
@@ -48,6 +48,12 @@ export const ResponseDisplay: React.FC<ResponseDisplayProps> = ({ collaboration
 
       {/* Response Quality Indicators */}
       <div className="mb-4 flex flex-wrap gap-2">
+        {collaboration.provisional && (
+          <div className="flex items-center gap-1 px-2 py-1 bg-yellow-100 text-yellow-800 rounded-full text-xs">
+            <Loader2 className="w-3 h-3 animate-spin" />
+            Provisional - refining with AI agents
+          </div>
+        )}
         <div className="flex items-center gap-1 px-2 py-1 bg-blue-100 text-blue-800 rounded-full text-xs">
           <Globe className="w-3 h-3" />
           Multi-Region
@@ -64,8 +70,8 @@ export const ResponseDisplay: React.FC<ResponseDisplayProps> = ({ collaboration
         </div>
       </div>
 
-      <div className="bg-gray-50 border border-gray-200 rounded-lg p-4">
-        <div className="whitespace-pre-wrap text-gray-700 leading-relaxed">
+      <div className={`bg-gray-50 border rounded-lg p-4 ${collaboration.provisional ? 'border-dashed border-yellow-300' : 'border-gray-200'}`}>
+        <div className={`whitespace-pre-wrap leading-relaxed ${collaboration.provisional ? 'text-gray-500' : 'text-gray-700'}`}>
           {collaboration.final_response}
         </div>
       </div>
@@ -75,7 +81,7 @@ export const ResponseDisplay: React.FC<ResponseDisplayProps> = ({ collaboration
           Response generated through {hadEuCollaboration ? 'US-EU' : 'US'} agent collaboration
         </span>
         <span>
-          Processing time: {collaboration.processing_time}ms
+          {collaboration.provisional ? 'Awaiting LLM response...' : `Processing time: ${collaboration.processing_time}ms`}
         </span>
       </div>
 
@@ -1,6 +1,10 @@
-import { Customer, SupportQuery, CollaborationLog, QuerySubmitResponse } from '../types';
+import { Customer, CustomerPage, SupportQuery, CollaborationLog, QuerySubmitResponse } from '../types';
 
 const API_BASE_URL = process.env.NODE_ENV === 'production' ? '/api' : 'http://localhost:5001/api';
+const MAX_STREAM_RESUMES = 3;
+
+// Failure reported by the server inside the stream; not retried by resuming
+class StreamError extends Error {}
 
 class ApiService {
   private async request<T>(endpoint: string, options: RequestInit = {}): Promise<T> {
@@ -29,12 +33,12 @@ class ApiService {
     }
   }
 
-  async getCustomers(): Promise<{ customers: Customer[]; count: number }> {
-    return this.request<{ customers: Customer[]; count: number }>('/customers');
+  async getCustomers(cursor?: string): Promise<CustomerPage> {
+    return this.request<CustomerPage>(cursor ? `/customers?cursor=${encodeURIComponent(cursor)}` : '/customers');
   }
 
-  async getCustomersByRegion(region: string): Promise<{ customers: Customer[]; count: number }> {
-    return this.request<{ customers: Customer[]; count: number }>(`/customers?region=${region}`);
+  async getCustomersByRegion(region: string): Promise<CustomerPage> {
+    return this.request<CustomerPage>(`/customers?region=${region}`);
   }
 
   async getCustomer(customerId: string): Promise<{ customer: Customer }> {
@@ -62,24 +66,15 @@ class ApiService {
     },
     onStep: (step: any) => void,
     onComplete: (result: any) => void,
-    onError: (error: string) => void
+    onError: (error: string) => void,
+    onProvisional?: (finalResponse: string) => void
   ): Promise<void> {
     const url = `${API_BASE_URL}/support/query-stream`;
+    let streamId: string | null = null;
+    let lastEventId: string | null = null;
     
-    try {
-      const response = await fetch(url, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(queryData),
-      });
-
-      if (!response.ok) {
-        const errorData = await response.json().catch(() => ({}));
-        throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
-      }
-
+    // Reads SSE events until the collaboration completes; returns false if the connection dropped first
+    const readEvents = async (response: Response): Promise<boolean> => {
       const reader = response.body?.getReader();
       if (!reader) {
         throw new Error('No response body');
@@ -91,31 +86,80 @@ class ApiService {
       while (true) {
         const { done, value } = await reader.read();
         
-        if (done) break;
+        if (done) return false;
         
         buffer += decoder.decode(value, { stream: true });
         
-        // Process complete lines
-        const lines = buffer.split('\n');
-        buffer = lines.pop() || ''; // Keep the last incomplete line in buffer
+        // Process complete events (separated by a blank line)
+        const events = buffer.split('\n\n');
+        buffer = events.pop() || ''; // Keep the last incomplete event in buffer
         
-        for (const line of lines) {
-          if (line.trim().startsWith('data: ')) {
-            try {
-              const data = JSON.parse(line.replace('data: ', ''));
-              
-              if (data.type === 'step') {
-                onStep(data.step);
-              } else if (data.type === 'complete') {
-                onComplete(data.collaboration);
-                return;
-              }
-            } catch (parseError) {
-              console.warn('Failed to parse SSE data:', line, parseError);
+        for (const event of events) {
+          let payload = '';
+          for (const line of event.split('\n')) {
+            if (line.startsWith('id: ')) {
+              lastEventId = line.slice(4);
+            } else if (line.startsWith('data: ')) {
+              payload += line.slice(6);
             }
           }
+          if (!payload) continue; // retry hints and keepalive comments
+          
+          try {
+            const data = JSON.parse(payload);
+            
+            if (data.type === 'step') {
+              onStep(data.step);
+            } else if (data.type === 'provisional') {
+              onProvisional?.(data.final_response);
+            } else if (data.type === 'complete') {
+              onComplete(data.collaboration);
+              return true;
+            } else if (data.type === 'cancelled' || data.error) {
+              throw new StreamError(data.reason || data.error);
+            }
+          } catch (parseError) {
+            if (!(parseError instanceof SyntaxError)) throw parseError;
+            console.warn('Failed to parse SSE data:', payload, parseError);
+          }
         }
       }
+    };
+    const readOrDrop = (response: Response) => readEvents(response).catch((error) => {
+      if (error instanceof StreamError) throw error;
+      return false; // network drop: resume below
+    });
+    
+    try {
+      const response = await fetch(url, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ ...queryData, progressive: Boolean(onProvisional) }),
+      });
+
+      if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
+      }
+      streamId = response.headers.get('X-Stream-Id');
+
+      let completed = await readOrDrop(response);
+      
+      // Reattach after a dropped connection; the server replays what we missed without re-running the LLMs
+      for (let attempt = 1; !completed && streamId && attempt <= MAX_STREAM_RESUMES; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+        const resumed = await fetch(`${url}/${streamId}`, {
+          headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {},
+        });
+        if (!resumed.ok) break;
+        completed = await readOrDrop(resumed);
+      }
+      
+      if (!completed) {
+        throw new Error('Stream ended before the collaboration completed');
+      }
     } catch (error) {
       console.error('Streaming request failed:', error);
       onError(error instanceof Error ? error.message : 'Unknown error');
@@ -130,6 +174,7 @@ class ApiService {
     agents: {
       us_agent: { role: string; endpoint: string; status: string; region: string };
       eu_agent: { role: string; endpoint: string; status: string; region: string };
+      eu_support_agent: { role: string; endpoint: string; status: string; region: string };
     };
     collaboration_flow: string[];
   }> {
@@ -11,6 +11,12 @@ export interface Customer {
   purchases: Purchase[];
 }
 
+export interface CustomerPage {
+  customers: Customer[];
+  count: number;
+  next_cursor: string | null;
+}
+
 export interface Purchase {
   id: string;
   product: string;
@@ -41,6 +47,69 @@ export interface CollaborationLog {
   steps: AgentResponse[];
   final_response: string;
   processing_time: number;
+  routing?: RoutePlan;
+  topology?: PipelineTopology | null;
+  instrumentation?: Instrumentation;
+  provisional?: boolean; // template answer shown until the LLM response arrives
+}
+
+export type PipelineTopology = 'full' | 'single_call';
+
+export interface RoutePlan {
+  data_region: 'US' | 'EU';
+  topology: PipelineTopology;
+  stages: Record<string, 'US' | 'EU' | null>;
+  endpoints: Record<string, string>;
+  cross_region_hops: number;
+  hops_saved: number;
+  reasons: string[];
+}
+
+export interface ContextCompressionReport {
+  source_tokens: number;
+  compressed_tokens: number;
+  tokens_saved: number;
+  token_budget: number;
+}
+
+export interface Instrumentation {
+  context_compression?: ContextCompressionReport;
+  structured_outputs?: Record<string, 'parsed' | 'fallback'>;
+  token_budgets?: Record<string, StageTokenUsage>;
+  language?: LanguageReport;
+  single_flight?: { coalesced: boolean; leader_query_id: string };
+  cascade?: Record<string, CascadeOutcome>;
+  degradation?: Degradation;
+}
+
+export interface Degradation {
+  level: 0 | 1 | 2 | 3 | 4;
+  mode: 'normal' | 'reduced_budgets' | 'skip_eu_validation' | 'templates' | 'reject';
+}
+
+export interface CascadeOutcome {
+  tier: string;
+  model: string;
+  escalated: boolean;
+  reason: string | null;
+  first_tier_ms: number;
+  total_ms: number;
+}
+
+export interface LanguageReport {
+  detected: string;
+  confidence: number;
+  source: 'message' | 'customer_cache' | 'customer_profile';
+  profile_language: string;
+  endpoints?: Record<string, string>;
+}
+
+export interface StageTokenUsage {
+  generated_tokens: number;
+  max_tokens: number;
+  llm_calls: number;
+  utilization: number;
+  temperature: number;
 }
 
 export interface ApiResponse<T> {
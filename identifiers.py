@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Collision-Free Identifiers
+ULIDs: 48-bit millisecond timestamp plus 80 random bits, Crockford base32 encoded,
+so ids sort by creation time and never collide within the same second.
+"""
+
+import os
+import threading
+import time
+
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+
+def new_ulid() -> str:
+    """26-character ULID; monotonic within a millisecond in this process."""
+    global _last_ms, _last_random
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms == _last_ms:
+            # Same millisecond: increment the random part so ids stay strictly ordered
+            _last_random = (_last_random + 1) & ((1 << 80) - 1)
+        else:
+            _last_ms = now_ms
+            _last_random = int.from_bytes(os.urandom(10), "big")
+        value = (now_ms << 80) | _last_random
+    return "".join(_CROCKFORD[(value >> shift) & 31] for shift in range(125, -1, -5))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Language Detection
+Fast, dependency-free detection of a support message's language from function
+words and characteristic letters, with per-customer caching.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional
+
+
+# Frequent function words that rarely appear in the other supported languages
+STOPWORDS = {
+    "English": frozenset(
+        "the and is are was were have has you your our we it this that with for not can how what "
+        "my me of to in on do does i'm it's don't doesn't need want would could should please".split()
+    ),
+    "German": frozenset(
+        "der die das und ist sind nicht ich sie wir ihr mit für auf ein eine einen dem den des "
+        "zu von bei können kann habe haben wird werden wie was mir mich uns unsere meine bitte".split()
+    ),
+    "French": frozenset(
+        "le la les et est sont pas je vous nous avec pour sur un une des du au aux ce cette "
+        "que qui comment mon ma mes votre notre peux pouvez ai avons fait bonjour merci".split()
+    ),
+    "Italian": frozenset(
+        "il lo gli e è sono non io voi noi con per su un una degli della del dei nel che chi "
+        "come mio mia nostro nostra vostro posso può ho abbiamo vorrei buongiorno grazie".split()
+    ),
+}
+
+# Letters that are strong evidence for one language
+LETTER_HINTS = {
+    "German": re.compile(r"[äöüß]"),
+    "French": re.compile(r"[çêâîôûœ]"),
+    "Italian": re.compile(r"\b\w+[àìòù]\b"),
+}
+
+_WORDS = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+DEFAULT_CACHED_CUSTOMERS = 100_000
+
+
+@dataclass(frozen=True)
+class Detection:
+    language: str
+    confidence: float  # share of the evidence pointing at `language`, 0-1
+    source: str  # "message", "customer_cache" or "customer_profile"
+
+
+@lru_cache(maxsize=4096)
+def detect_language(text: str, min_evidence: int = 2) -> Optional[Detection]:
+    """Most likely language of `text`, or None when there is too little evidence."""
+    words = _WORDS.findall(text.lower())
+    scores: Dict[str, float] = {language: 0.0 for language in STOPWORDS}
+    for word in words:
+        for language, stopwords in STOPWORDS.items():
+            if word in stopwords:
+                scores[language] += 1
+    for language, pattern in LETTER_HINTS.items():
+        scores[language] += 0.5 * len(pattern.findall(text.lower()))
+
+    best = max(scores, key=scores.get)
+    total = sum(scores.values())
+    if scores[best] < min_evidence:
+        return None
+    return Detection(best, round(scores[best] / total, 3), "message")
+
+
+class LanguageDetector:
+    """
+    Detects each message's language, remembering the last confident result of up to
+    `max_customers` recently seen customers (least recently used are evicted first).
+    """
+
+    def __init__(self, min_confidence: float = 0.6, max_customers: int = DEFAULT_CACHED_CUSTOMERS):
+        self.min_confidence = min_confidence
+        self.max_customers = max_customers
+        self._by_customer: "OrderedDict[str, Detection]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LanguageDetector":
+        """Cache size from LANGUAGE_CACHE_CUSTOMERS."""
+        max_customers = int(os.environ.get("LANGUAGE_CACHE_CUSTOMERS", DEFAULT_CACHED_CUSTOMERS))
+        if max_customers < 1:
+            raise ValueError("LANGUAGE_CACHE_CUSTOMERS must be at least 1")
+        return cls(max_customers=max_customers)
+
+    def detect(self, customer, message: str) -> Detection:
+        """Language to answer `message` in: the message's own if clear, else what we know of the customer."""
+        detection = detect_language(message)
+        with self._lock:
+            if detection is not None and detection.confidence >= self.min_confidence:
+                self._by_customer[customer.id] = Detection(detection.language, detection.confidence, "customer_cache")
+                self._by_customer.move_to_end(customer.id)
+                if len(self._by_customer) > self.max_customers:
+                    self._by_customer.popitem(last=False)
+                return detection
+            cached = self._by_customer.get(customer.id)
+            if cached is not None:
+                self._by_customer.move_to_end(customer.id)
+                return cached
+        return Detection(customer.language, 1.0, "customer_profile")
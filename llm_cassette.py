@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+LLM Record/Replay Cassettes
+Records LLM completions to a content-addressed store on disk and serves them back
+without touching the endpoints, for offline development and fast regression runs.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date
+from typing import Any, Callable, Dict, Optional
+
+import litellm
+
+MODES = ("off", "record", "replay", "auto")
+
+# Completion parameters that change what the model generates; transport settings are ignored
+FINGERPRINT_PARAMS = (
+    "temperature", "top_p", "n", "stop", "max_tokens", "max_completion_tokens", "presence_penalty",
+    "frequency_penalty", "logit_bias", "seed", "response_format", "tools", "tool_choice", "extra_body",
+)
+# Parameters whose value is a set: CrewAI builds its stop list with list(set(...)), so the
+# order of the sequences depends on PYTHONHASHSEED and must not reach the key
+UNORDERED_PARAMS = ("stop",)
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+def _normalize(content: Any) -> Any:
+    if isinstance(content, str):
+        return "\n".join(" ".join(line.split()) for line in content.strip().splitlines())
+    if isinstance(content, list):
+        return [_normalize(part) for part in content]
+    if isinstance(content, dict):
+        return {key: _normalize(value) for key, value in content.items()}
+    return content
+
+
+def _canonical(name: str, value: Any) -> Any:
+    if name in UNORDERED_PARAMS and isinstance(value, (list, tuple, set)):
+        return sorted(set(value))
+    return value
+
+
+def fingerprint(params: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of a completion request that determine its response, in canonical form."""
+    return {
+        "endpoint": (params.get("api_base") or params.get("base_url") or "").rstrip("/"),
+        "model": params.get("model"),
+        "messages": [
+            {"role": message.get("role"), "content": _normalize(message.get("content"))}
+            for message in params.get("messages") or []
+        ],
+        "params": {name: _canonical(name, params[name]) for name in FINGERPRINT_PARAMS if params.get(name) is not None},
+    }
+
+
+class Cassette:
+    """
+    On-disk store of completions keyed by the SHA-256 of their request fingerprint.
+
+    `record` always calls the endpoint and stores the result, `replay` only serves stored
+    results (a miss raises CassetteMiss), and `auto` replays what it has and records the rest.
+    """
+
+    def __init__(self, directory: str, mode: str = "auto", replay_latency: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"unknown cassette mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.directory = directory
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    @staticmethod
+    def key(request: Dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False, default=str).encode()).hexdigest()
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def store(self, key: str, request: Dict[str, Any], response: Dict[str, Any], latency_ms: float) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename, so concurrent recorders never leave a torn entry
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"request": request, "response": response, "latency_ms": round(latency_ms, 1)}, f, ensure_ascii=False, default=str)
+        os.replace(temporary, path)
+
+    def complete(self, completion: Callable[..., Any], **params) -> Any:
+        """Serve `completion(**params)` from the cassette, or call it and record the response."""
+        if self.mode == "off" or params.get("stream"):
+            return completion(**params)
+        request = fingerprint(params)
+        key = self.key(request)
+
+        entry = self.load(key) if self.mode != "record" else None
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            if self.replay_latency:
+                time.sleep(entry["latency_ms"] / 1000)
+            return litellm.ModelResponse(**entry["response"])
+        with self._lock:
+            self.misses += 1
+        if self.mode == "replay":
+            raise CassetteMiss(f"no recorded completion for {request['model']} @ {request['endpoint']} (key {key[:12]})")
+
+        started = time.perf_counter()
+        response = completion(**params)
+        self.store(key, request, response.model_dump(), (time.perf_counter() - started) * 1000)
+        with self._lock:
+            self.recorded += 1
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "directory": self.directory, "hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+_installed: Optional[Cassette] = None
+_live_completion = litellm.completion
+
+
+def install(cassette: Cassette) -> Cassette:
+    """Route every `litellm.completion` call, including CrewAI's, through `cassette`."""
+    global _installed
+
+    def completion(*args, **params):
+        params.update(zip(("model", "messages"), args))
+        return cassette.complete(_live_completion, **params)
+
+    _installed = cassette
+    litellm.completion = completion
+    return cassette
+
+
+def uninstall() -> None:
+    global _installed
+    _installed = None
+    litellm.completion = _live_completion
+
+
+def installed() -> Optional[Cassette]:
+    return _installed
+
+
+def pinned_date() -> Optional[date]:
+    """
+    The date prompts treat as today while a cassette is installed (LLM_CASSETTE_DATE, YYYY-MM-DD),
+    so relative spans such as "last purchase N days ago" fingerprint the same on every day.
+    """
+    value = os.environ.get("LLM_CASSETTE_DATE")
+    return date.fromisoformat(value) if value and _installed is not None else None
+
+
+def install_from_env() -> Optional[Cassette]:
+    """Install the cassette configured by LLM_CASSETTE (mode), LLM_CASSETTE_DIR, LLM_CASSETTE_LATENCY and LLM_CASSETTE_DATE."""
+    mode = os.environ.get("LLM_CASSETTE", "off")
+    if mode == "off":
+        return None
+    if os.environ.get("LLM_CASSETTE_DATE"):
+        date.fromisoformat(os.environ["LLM_CASSETTE_DATE"])  # fail at startup, not on the first prompt
+    if _installed is not None:
+        return _installed
+    return install(Cassette(
+        os.environ.get("LLM_CASSETTE_DIR", "cassettes"),
+        mode,
+        replay_latency=os.environ.get("LLM_CASSETTE_LATENCY", "0").lower() in ("1", "true", "yes")
+    ))
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Overload Control
+Watches pipeline queue depth and recent end-to-end latency and degrades service in
+steps as the regional endpoints saturate, recovering one step at a time as load drops.
+"""
+
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional, Sequence, Tuple
+
+# Degradation levels, in the order they are entered
+NORMAL = 0
+REDUCED_BUDGETS = 1     # shorter max_tokens for the free-text response stage
+SKIP_EU_VALIDATION = 2  # US tickets no longer visit the EU stage
+TEMPLATES = 3           # template responses instead of LLM stages
+REJECT = 4              # new tickets are turned away with 503
+
+LEVEL_NAMES = ("normal", "reduced_budgets", "skip_eu_validation", "templates", "reject")
+
+DEGRADED_BUDGET_SCALE = 0.5
+
+# Thresholds that enter levels 1-4: pipeline runs in flight, and mean latency of recent runs.
+# CPU inference takes minutes per ticket, so the latency thresholds are generous by default.
+DEFAULT_QUEUE_DEPTHS = (6, 10, 16, 24)
+DEFAULT_LATENCY_MS = (360_000, 480_000, 600_000, 900_000)
+
+
+def _thresholds(name: str, default: Tuple[float, ...]) -> Tuple[float, ...]:
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    values = tuple(float(value) for value in raw.split(","))
+    if len(values) != len(default):
+        raise ValueError(f"{name} needs {len(default)} comma-separated thresholds, one per degradation level")
+    return values
+
+
+class OverloadController:
+    """
+    Degradation level from two load signals: pipeline runs in flight, and the mean latency
+    of runs that finished within the last `window_s` seconds.
+
+    The level rises as soon as either signal crosses a threshold, and falls one level at a
+    time once the signals allow it and `cooldown_s` has passed since the last change, so a
+    brief lull does not bounce the service back to full load.
+
+    From `templates` up no run reaches the LLMs, so the latency signal would only decay as
+    old runs age out of the window. Instead, one run per `cooldown_s` is admitted as a probe
+    at `skip_eu_validation`, the highest level that still calls the LLMs (even while
+    rejecting), and its latency supersedes every sample that finished before it started.
+    """
+
+    def __init__(
+        self,
+        queue_depths: Sequence[float] = DEFAULT_QUEUE_DEPTHS,
+        latency_ms: Sequence[float] = DEFAULT_LATENCY_MS,
+        window_s: float = 600.0,
+        cooldown_s: float = 30.0,
+    ):
+        self.queue_depths = tuple(queue_depths)
+        self.latency_ms = tuple(latency_ms)
+        self.window_s = window_s
+        self.cooldown_s = cooldown_s
+        self.in_flight = 0
+        self.rejected = 0
+        self.transitions = 0
+        self.admitted: Counter = Counter()
+        self.probes = 0
+        self._probing = False
+        self._probe_started = 0.0
+        self._level = NORMAL
+        self._changed_at = time.monotonic()
+        self._latencies: Deque[Tuple[float, float]] = deque()  # (finished at, latency ms)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "OverloadController":
+        """Thresholds from OVERLOAD_QUEUE_DEPTHS and OVERLOAD_LATENCY_MS (four each), plus OVERLOAD_COOLDOWN_S."""
+        return cls(
+            queue_depths=_thresholds("OVERLOAD_QUEUE_DEPTHS", DEFAULT_QUEUE_DEPTHS),
+            latency_ms=_thresholds("OVERLOAD_LATENCY_MS", DEFAULT_LATENCY_MS),
+            cooldown_s=float(os.environ.get("OVERLOAD_COOLDOWN_S", 30.0))
+        )
+
+    def _mean_latency(self, now: float) -> float:
+        # Caller holds self._lock
+        while self._latencies and self._latencies[0][0] < now - self.window_s:
+            self._latencies.popleft()
+        if not self._latencies:
+            return 0.0
+        return sum(latency for _, latency in self._latencies) / len(self._latencies)
+
+    def _update(self) -> int:
+        # Caller holds self._lock
+        now = time.monotonic()
+        latency = self._mean_latency(now)
+        target = max(
+            sum(1 for depth in self.queue_depths if self.in_flight >= depth),
+            sum(1 for threshold in self.latency_ms if latency >= threshold)
+        )
+        if target > self._level:
+            self._level = target
+        elif target < self._level and now - self._changed_at >= self.cooldown_s:
+            self._level -= 1
+        else:
+            return self._level
+        self._changed_at = now
+        self.transitions += 1
+        print(f"🚦 Overload level {self._level} ({LEVEL_NAMES[self._level]}): {self.in_flight} runs in flight, {latency / 1000:.0f}s mean latency")
+        return self._level
+
+    def _probe_due(self, level: int, now: float) -> bool:
+        # Caller holds self._lock
+        return level >= TEMPLATES and not self._probing and now - self._probe_started >= self.cooldown_s
+
+    @property
+    def level(self) -> int:
+        with self._lock:
+            return self._update()
+
+    def admit(self) -> Tuple[int, bool]:
+        """Start a pipeline run; returns the degradation level it runs at and whether it is a latency probe."""
+        with self._lock:
+            level = self._update()
+            now = time.monotonic()
+            probe = self._probe_due(level, now)
+            if probe:
+                level = SKIP_EU_VALIDATION
+                self._probing = True
+                self._probe_started = now
+                self.probes += 1
+            self.in_flight += 1
+            self.admitted[level] += 1
+            return level, probe
+
+    def release(self, latency_ms: Optional[float] = None, probe: bool = False) -> None:
+        """End a pipeline run; `latency_ms` feeds the latency signal and is left out for runs that made no LLM calls."""
+        with self._lock:
+            self.in_flight -= 1
+            if probe:
+                self._probing = False
+                if latency_ms is not None:
+                    # The probe measures the endpoints as they are now; earlier samples are stale
+                    while self._latencies and self._latencies[0][0] < self._probe_started:
+                        self._latencies.popleft()
+            if latency_ms is not None:
+                self._latencies.append((time.monotonic(), latency_ms))
+            self._update()
+
+    def rejecting(self) -> bool:
+        """True (and counted as a rejection) when new tickets should be turned away; a due probe is let through."""
+        with self._lock:
+            level = self._update()
+            if level < REJECT or self._probe_due(level, time.monotonic()):
+                return False
+            self.rejected += 1
+            return True
+
+    def retry_after(self) -> int:
+        """Seconds until the level can next step down, as a Retry-After hint."""
+        with self._lock:
+            return max(1, round(self.cooldown_s - (time.monotonic() - self._changed_at)))
+
+    def budget_scale(self) -> float:
+        return DEGRADED_BUDGET_SCALE if self.level >= REDUCED_BUDGETS else 1.0
+
+    @staticmethod
+    def report(level: int) -> Dict[str, Any]:
+        return {"level": level, "mode": LEVEL_NAMES[level]}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            level = self._update()
+            return {
+                **self.report(level),
+                "in_flight": self.in_flight,
+                "mean_latency_ms": round(self._mean_latency(time.monotonic())),
+                "transitions": self.transitions,
+                "rejected": self.rejected,
+                "probes": self.probes,
+                "admitted_by_level": {LEVEL_NAMES[entered]: count for entered, count in sorted(self.admitted.items())}
+            }
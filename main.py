@@ -7,9 +7,13 @@ Converts EU agent topic generation to USA agent story writing across different s
 import os
 from crewai import Agent, Crew, Process, Task, LLM
 from crewai.project import CrewBase, agent, crew, task
+from llm_cassette import install_from_env
 
 
 def main():
+    # Record or replay LLM calls when LLM_CASSETTE is set
+    install_from_env()
+
     # Initialize LLM objects for our custom endpoints
     llm_eu = LLM(
         model="openai/Qwen2.5-7B-Instruct-GGUF",
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Model Cascade
+Runs a stage on a cheaper model tier first and escalates to the stage's default model
+only when the cheap output cannot be trusted, tracking escalation rates and latency.
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+from context_compression import estimate_tokens
+from routing import ModelEndpoint
+from token_budgets import StageBudget
+
+
+# Intermediate stages only feed the pipeline; the customer-facing response stays on the default model
+DEFAULT_CASCADE_STAGES = ("analysis", "data_access")
+
+MIN_RESPONSE_TOKENS = 40
+TRUNCATION_SHARE = 0.95  # output this close to max_tokens was probably cut off
+
+
+def model_tiers_from_env() -> Dict[str, Dict[str, ModelEndpoint]]:
+    """
+    Per-region cheaper model tiers from MODEL_TIERS (JSON), e.g.
+    {"US": {"small": {"base_url": "http://...:61101/v1", "model": "openai/Qwen2.5-1.5B-Instruct-GGUF"}}}.
+    """
+    raw = os.getenv("MODEL_TIERS")
+    if not raw:
+        return {}
+    return {
+        region: {tier: ModelEndpoint(**endpoint) for tier, endpoint in tiers.items()}
+        for region, tiers in json.loads(raw).items()
+    }
+
+
+@dataclass(slots=True)
+class CascadeOutcome:
+    """How one stage of one ticket went through the cascade."""
+    tier: str
+    model: str
+    escalated: bool
+    reason: Optional[str]
+    first_tier_ms: int
+    total_ms: int
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "tier": self.tier,
+            "model": self.model,
+            "escalated": self.escalated,
+            "reason": self.reason,
+            "first_tier_ms": self.first_tier_ms,
+            "total_ms": self.total_ms
+        }
+
+
+class CascadePolicy:
+    """
+    Chooses each stage's first model tier and decides when to escalate to the default model.
+
+    A stage cascades when it is listed in `stages` and the region has a `tier` endpoint;
+    otherwise it runs on the default model as before.
+    """
+
+    def __init__(
+        self,
+        tiers: Optional[Dict[str, Dict[str, ModelEndpoint]]] = None,
+        stages: Iterable[str] = DEFAULT_CASCADE_STAGES,
+        tier: str = "small",
+        min_response_tokens: int = MIN_RESPONSE_TOKENS,
+    ):
+        self.tiers = model_tiers_from_env() if tiers is None else tiers
+        self.stages = set(stages)
+        self.tier = tier
+        self.min_response_tokens = min_response_tokens
+        self._lock = threading.Lock()
+        self._runs: Counter = Counter()
+        self._escalations: Counter = Counter()
+        self._reasons: Dict[str, Counter] = {}
+        self._first_tier_ms: Counter = Counter()
+        self._total_ms: Counter = Counter()
+
+    def first_endpoint(self, stage: str, region: str) -> Optional[ModelEndpoint]:
+        """The cheaper endpoint to try first for `stage`, or None to go straight to the default model."""
+        if stage not in self.stages:
+            return None
+        return self.tiers.get(region, {}).get(self.tier)
+
+    def escalation_reason(self, stage: str, output: str, parsed, budget: StageBudget) -> Optional[str]:
+        """Why the first tier's output should not be trusted, or None to accept it."""
+        if parsed is None and stage != "response":
+            return "output failed schema validation"
+        if getattr(parsed, "confidence", None) == "low":
+            return "model reported low confidence"
+        tokens = estimate_tokens(output)
+        if tokens >= budget.max_tokens * TRUNCATION_SHARE:
+            return "output reached the token budget and is likely truncated"
+        if stage == "response" and tokens < self.min_response_tokens:
+            return f"response shorter than {self.min_response_tokens} tokens"
+        return None
+
+    def record(self, stage: str, outcome: CascadeOutcome) -> None:
+        with self._lock:
+            self._runs[stage] += 1
+            self._first_tier_ms[stage] += outcome.first_tier_ms
+            self._total_ms[stage] += outcome.total_ms
+            if outcome.escalated:
+                self._escalations[stage] += 1
+                self._reasons.setdefault(stage, Counter())[outcome.reason] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                stage: {
+                    "runs": runs,
+                    "escalations": self._escalations[stage],
+                    "escalation_rate": round(self._escalations[stage] / runs, 3),
+                    "mean_first_tier_ms": round(self._first_tier_ms[stage] / runs),
+                    "mean_total_ms": round(self._total_ms[stage] / runs),
+                    "reasons": dict(self._reasons.get(stage, {}))
+                }
+                for stage, runs in self._runs.items()
+            }
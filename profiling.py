@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+On-Demand Sampling Profiler
+Samples every thread's Python stack on a timer for the next N requests or a fixed
+window, and returns collapsed stacks ready for flamegraph.pl or speedscope. Nothing
+runs between sessions, so it can stay enabled in production.
+"""
+
+import math
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+MODES = ("wall", "cpu")
+MAX_SESSION_SECONDS = 300.0
+MIN_INTERVAL_MS = 1.0  # below this the sampler would spin, holding the GIL
+
+_THREAD_NUMBER = re.compile(r"[-_]\d+")
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profiling session is requested while another one is running."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = code.co_filename.rsplit("/", 1)[-1]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _collapse(thread_name: str, frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    # "Thread-1 (process_request_thread)" and "Thread-2 (...)" share one root in the flamegraph
+    labels.append(_THREAD_NUMBER.sub("", thread_name))
+    return ";".join(reversed(labels)).replace(" ", "_")
+
+
+class SamplingProfiler:
+    """
+    Samples all threads every `interval_ms`. Each stack is weighted in microseconds: of wall
+    time in `wall` mode, and of the thread's own CPU time since the previous sample in `cpu`
+    mode, so threads blocked on I/O or locks drop out of CPU profiles.
+    """
+
+    def __init__(self, mode: str = "wall", interval_ms: float = 10.0):
+        if mode not in MODES:
+            raise ValueError(f"unknown profiling mode {mode!r}; expected one of {', '.join(MODES)}")
+        if not interval_ms >= MIN_INTERVAL_MS:
+            raise ValueError(f"interval_ms must be at least {MIN_INTERVAL_MS:g}, got {interval_ms!r}")
+        if mode == "cpu" and not hasattr(time, "pthread_getcpuclockid"):
+            raise ValueError("cpu mode needs per-thread CPU clocks, which this platform does not provide")
+        self.mode = mode
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.exclude = set()  # thread idents left out, such as the one waiting for the profile
+        self._cpu_seen: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _thread_cpu(self, ident: int) -> Optional[float]:
+        try:
+            return time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (OSError, OverflowError):
+            return None  # thread exited between listing and sampling
+
+    def _sample(self, elapsed: float) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own or ident in self.exclude:
+                continue
+            if self.mode == "cpu":
+                now = self._thread_cpu(ident)
+                if now is None:
+                    continue
+                weight = now - self._cpu_seen.get(ident, now)
+                self._cpu_seen[ident] = now
+            else:
+                weight = elapsed
+            weight_us = int(weight * 1_000_000)
+            if weight_us > 0:
+                self.stacks[_collapse(names.get(ident, "unknown"), frame)] += weight_us
+        self.samples += 1
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        if self.mode == "cpu":
+            self._sample(0.0)  # baseline CPU clocks; nothing is counted yet
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(now - last)
+            last = now
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format: `frame;frame;frame weight` per line."""
+        return "".join(f"{stack} {weight}\n" for stack, weight in self.stacks.most_common())
+
+
+class ProfileSession:
+    """A profiler that runs until `requests` more requests have finished, or for `seconds`."""
+
+    def __init__(self, mode: str = "wall", requests: Optional[int] = None, seconds: Optional[float] = None, interval_ms: float = 10.0):
+        if requests is not None and requests < 1:
+            raise ValueError(f"requests must be at least 1, got {requests}")
+        if seconds is not None and not (math.isfinite(seconds) and seconds > 0):
+            raise ValueError(f"seconds must be a positive number, got {seconds!r}")
+        self.requests = requests
+        self.seconds = min(seconds, MAX_SESSION_SECONDS) if seconds is not None else MAX_SESSION_SECONDS
+        self.finished_requests = 0
+        self.profiler = SamplingProfiler(mode, interval_ms)
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def request_finished(self) -> None:
+        with self._lock:
+            self.finished_requests += 1
+            if self.requests is not None and self.finished_requests >= self.requests:
+                self._done.set()
+
+    def run(self) -> str:
+        """Profile until the request count or the time window is reached; returns the collapsed stacks."""
+        self.started_at = time.perf_counter()
+        self.profiler.exclude.add(threading.get_ident())
+        self.profiler.start()
+        try:
+            self._done.wait(self.seconds)
+        finally:
+            self.profiler.stop()
+            self.duration = time.perf_counter() - self.started_at
+        return self.profiler.collapsed()
+
+
+_active: Optional[ProfileSession] = None
+_active_lock = threading.Lock()
+
+
+def active() -> Optional[ProfileSession]:
+    return _active
+
+
+def profile(session: ProfileSession) -> str:
+    """Run `session` as the process's only profiling session; raises ProfilerBusy if one is running."""
+    global _active
+    with _active_lock:
+        if _active is not None:
+            raise ProfilerBusy("a profiling session is already running")
+        _active = session
+    try:
+        return session.run()
+    finally:
+        _active = None
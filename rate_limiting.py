@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Token-Bucket Rate Limiting
+Limits ticket submissions per customer (with tier-based quotas), per API key and per
+data region. Buckets live in process memory, or in a SQLite file shared by every
+server worker on the host; buckets that have refilled are dropped, since a fresh one
+is identical.
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class Quota:
+    """Sustained rate plus burst allowance of one bucket."""
+    per_minute: float
+    burst: int
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60.0
+
+
+# Each ticket costs up to three LLM generations, so customer quotas are tight and grow with tier
+TIER_QUOTAS = {
+    "Platinum": Quota(per_minute=30, burst=10),
+    "Gold": Quota(per_minute=20, burst=6),
+    "Silver": Quota(per_minute=10, burst=4),
+    "Bronze": Quota(per_minute=5, burst=2),
+}
+DEFAULT_TIER = "Bronze"  # unknown customers and tiers
+API_KEY_QUOTA = Quota(per_minute=120, burst=30)
+REGION_QUOTA = Quota(per_minute=600, burst=100)
+SWEEP_INTERVAL_S = 60.0  # how often refilled buckets are dropped
+
+
+@dataclass(slots=True)
+class Decision:
+    allowed: bool
+    retry_after: float = 0.0  # seconds until every exhausted bucket has a token again
+    limited_by: Tuple[str, ...] = ()
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def _take(buckets: Sequence[Tuple[str, Quota]], state: Dict[str, Tuple[float, float]], now: float) -> Tuple[Decision, Dict[str, Tuple[float, float]]]:
+    """
+    Refill `buckets` from `state` (key -> (tokens, updated)) and take one token from each,
+    all or nothing. Returns the decision and the new state to store.
+    """
+    refilled = {}
+    waits: List[Tuple[str, float]] = []
+    for key, quota in buckets:
+        tokens, updated = state.get(key, (quota.burst, now))
+        tokens = min(quota.burst, tokens + (now - updated) * quota.rate)
+        refilled[key] = tokens
+        if tokens < 1.0:
+            waits.append((key, (1.0 - tokens) / quota.rate))
+    if waits:
+        decision = Decision(False, max(wait for _, wait in waits), tuple(key for key, _ in waits))
+        return decision, {key: (tokens, now) for key, tokens in refilled.items()}
+    return Decision(True), {key: (tokens - 1.0, now) for key, tokens in refilled.items()}
+
+
+def _full_at(tokens: float, updated: float, quota: Quota) -> float:
+    """When a bucket is back to `burst`, and so indistinguishable from a new one."""
+    return updated + (quota.burst - tokens) / quota.rate
+
+
+class MemoryBackend:
+    """Buckets in this process; limits hold per server worker."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._state: Dict[str, Tuple[float, float]] = {}
+        self._full_at: Dict[str, float] = {}
+        self._swept = time.time()
+        self._lock = threading.Lock()
+
+    def _sweep(self, now: float) -> None:
+        # Caller holds self._lock
+        for key in [key for key, full_at in self._full_at.items() if full_at <= now]:
+            del self._state[key], self._full_at[key]
+        self._swept = now
+
+    def take(self, buckets: Sequence[Tuple[str, Quota]]) -> Decision:
+        now = time.time()
+        with self._lock:
+            decision, updates = _take(buckets, self._state, now)
+            self._state.update(updates)
+            for key, quota in buckets:
+                self._full_at[key] = _full_at(*updates[key], quota)
+            if now - self._swept >= SWEEP_INTERVAL_S:
+                self._sweep(now)
+        return decision
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._state)
+
+
+class SQLiteBackend:
+    """
+    Buckets in a SQLite file, so every server worker on the host draws from the same buckets.
+    Each check is one short write transaction; WAL mode without fsync keeps it in the tens of
+    microseconds, and losing bucket state in a crash only resets limits.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._swept = time.time()
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL DEFAULT 0)"
+        )
+        if "full_at" not in {row[1] for row in connection.execute("PRAGMA table_info(buckets)")}:
+            connection.execute("ALTER TABLE buckets ADD COLUMN full_at REAL NOT NULL DEFAULT 0")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+        return connection
+
+    def take(self, buckets: Sequence[Tuple[str, Quota]]) -> Decision:
+        connection = self._connection()
+        keys = [key for key, _ in buckets]
+        # IMMEDIATE takes the write lock up front, so concurrent workers cannot both spend the last token
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                f"SELECT key, tokens, updated FROM buckets WHERE key IN ({','.join('?' * len(keys))})", keys
+            ).fetchall()
+            now = time.time()
+            decision, updates = _take(buckets, {key: (tokens, updated) for key, tokens, updated in rows}, now)
+            connection.executemany(
+                "INSERT INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated, full_at = excluded.full_at",
+                [(key, *updates[key], _full_at(*updates[key], quota)) for key, quota in buckets]
+            )
+            if now - self._swept >= SWEEP_INTERVAL_S:
+                # Every worker sweeps on its own schedule; deleting a refilled bucket twice is harmless
+                self._swept = now
+                connection.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return decision
+
+    def size(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+
+def _quota(spec: Dict[str, Any]) -> Quota:
+    return Quota(per_minute=float(spec["per_minute"]), burst=int(spec["burst"]))
+
+
+class RateLimiter:
+    """
+    Checks one submission against its customer, API key and region buckets at once;
+    it is admitted only if all three have a token, and then spends one from each.
+
+    Only keys in `api_keys` get their own bucket. Any other key is client-chosen, so a client
+    could rotate it to escape its quota; those requests share their client address's bucket.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        tier_quotas: Optional[Dict[str, Quota]] = None,
+        api_key_quota: Quota = API_KEY_QUOTA,
+        region_quota: Quota = REGION_QUOTA,
+        api_keys: FrozenSet[str] = frozenset(),
+    ):
+        self.backend = backend or MemoryBackend()
+        self.tier_quotas = tier_quotas or TIER_QUOTAS
+        self.api_key_quota = api_key_quota
+        self.region_quota = region_quota
+        self.api_keys = api_keys
+        self.allowed = 0
+        self.limited: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """
+        Backend from RATE_LIMIT_DB (a SQLite path shared by all workers; in-memory if unset),
+        quotas from RATE_LIMITS (JSON), e.g.
+        {"tiers": {"Gold": {"per_minute": 40, "burst": 8}}, "api_key": {"per_minute": 300, "burst": 60}},
+        and the issued API keys from API_KEYS (comma-separated).
+        """
+        path = os.environ.get("RATE_LIMIT_DB")
+        limits = json.loads(os.environ.get("RATE_LIMITS") or "{}")
+        return cls(
+            backend=SQLiteBackend(path) if path else MemoryBackend(),
+            tier_quotas={**TIER_QUOTAS, **{tier: _quota(spec) for tier, spec in limits.get("tiers", {}).items()}},
+            api_key_quota=_quota(limits["api_key"]) if "api_key" in limits else API_KEY_QUOTA,
+            region_quota=_quota(limits["region"]) if "region" in limits else REGION_QUOTA,
+            api_keys=frozenset(key.strip() for key in os.environ.get("API_KEYS", "").split(",") if key.strip())
+        )
+
+    def client_key(self, api_key: Optional[str], address: Optional[str]) -> str:
+        """The API-key bucket's identity: the key if it was issued, otherwise the client address."""
+        if api_key and api_key in self.api_keys:
+            return f"key:{api_key}"
+        return f"addr:{address or 'anonymous'}"
+
+    def check(self, customer_id: str, tier: Optional[str], api_key: str, region: str) -> Decision:
+        customer_quota = self.tier_quotas.get(tier) or self.tier_quotas[DEFAULT_TIER]
+        decision = self.backend.take((
+            (f"customer:{customer_id}", customer_quota),
+            (f"api_key:{api_key}", self.api_key_quota),
+            (f"region:{region}", self.region_quota),
+        ))
+        with self._lock:
+            if decision.allowed:
+                self.allowed += 1
+            else:
+                for key in decision.limited_by:
+                    self.limited[key.partition(":")[0]] += 1
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {"backend": self.backend.name, "allowed": self.allowed, "limited": dict(self.limited)}
+        stats["buckets"] = self.backend.size()
+        return stats
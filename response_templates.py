@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Multilingual Response Template Catalog
+Precompiled customer-response templates, extensible with JSON files for more
+languages, with rendered skeletons cached per customer segment.
+"""
+
+import json
+import os
+from pathlib import Path
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+
+# Fields each template may reference; anything else is rejected when the catalog loads
+TEMPLATE_FIELDS = {
+    "greeting": (),
+    "thank_you": (),
+    "processed_through": (),
+    "including_specialists": (),
+    "technical_analysis": ("product", "tier", "channel"),
+    "billing_inquiry": ("product", "channel"),
+    "general_inquiry": ("tier",),
+    "gdpr_notice": (),
+    "security_notice": (),
+    "collaboration_footer": (),
+    "best_regards": (),
+    "footer": (),
+}
+
+CATEGORY_TEMPLATES = {"technical": "technical_analysis", "billing": "billing_inquiry", "general": "general_inquiry"}
+
+# Per-response values; everything else is fixed by the segment and baked into the skeleton
+SLOTS = ("name", "product")
+
+# Built-in languages; add more with TemplateCatalog.load_directory()
+BUILTIN_TEMPLATES = {
+    "German": {
+        "greeting": "Guten Tag",
+        "thank_you": "Vielen Dank für Ihre Kontaktaufnahme mit unserem Global Customer Support Team.",
+        "processed_through": "Ihre Anfrage wurde durch unser fortschrittliches Multi-Region-Kollaborationssystem bearbeitet",
+        "including_specialists": ", einschließlich unserer EU-Compliance-Spezialisten",
+        "technical_analysis": "Unsere technische Analyse zeigt, dass Sie Probleme mit Ihrem {product} haben. Als geschätzter {tier}-Tier-Kunde wurde dies an unser Spezialistenteam eskaliert, das Sie innerhalb von 2 Stunden über {channel} kontaktieren wird.",
+        "billing_inquiry": "Bezüglich Ihrer Rechnungsanfrage für {product} werden unsere Rechnungsspezialisten (koordiniert zwischen unseren US- und EU-Teams) Ihr Konto überprüfen und Sie über {channel} kontaktieren.",
+        "general_inquiry": "Ihre allgemeine Anfrage wurde von unserem Multi-Regional-Support-Team gründlich überprüft. Basierend auf Ihrem {tier}-Tier-Status und Ihrer Service-Historie werden wir umfassende Unterstützung bieten.",
+        "gdpr_notice": "🔒 Datenschutzhinweis: Diese Antwort wurde in vollständiger Übereinstimmung mit der DSGVO verarbeitet. Ihre Daten wurden ausschließlich von unseren EU-basierten Systemen und Agenten behandelt.",
+        "security_notice": "🔐 Sicherheitshinweis: Ihre Anfrage wurde durch unsere sichere Multi-Regional-Infrastruktur mit angemessenen Datenschutzmaßnahmen verarbeitet.",
+        "collaboration_footer": "Diese Antwort wurde durch die Zusammenarbeit zwischen unseren US- und EU-Support-Teams erstellt, um sicherzustellen, dass Sie die höchste Servicequalität in allen Regionen erhalten.",
+        "best_regards": "Mit freundlichen Grüßen,\nGlobal Customer Support Team",
+        "footer": "🇺🇸 US-Betrieb • 🇪🇺 EU-Compliance • 🌍 Multi-Regionale Exzellenz"
+    },
+    "Italian": {
+        "greeting": "Buongiorno",
+        "thank_you": "Grazie per aver contattato il nostro team di Global Customer Support.",
+        "processed_through": "La vostra richiesta è stata elaborata attraverso il nostro avanzato sistema di collaborazione multi-regionale",
+        "including_specialists": ", inclusi i nostri specialisti di conformità UE",
+        "technical_analysis": "La nostra analisi tecnica indica che state riscontrando problemi con il vostro {product}. Come stimato cliente tier {tier}, questo è stato escalato al nostro team specialistico che vi contatterà tramite {channel} entro 2 ore.",
+        "billing_inquiry": "Riguardo alla vostra richiesta di fatturazione per {product}, i nostri specialisti di fatturazione (coordinandosi tra i team US e UE) esamineranno il vostro account e vi contatteranno tramite {channel}.",
+        "general_inquiry": "La vostra richiesta generale è stata accuratamente esaminata dal nostro team di supporto multi-regionale. Basandoci sul vostro status tier {tier} e sulla cronologia dei servizi, forniremo assistenza completa.",
+        "gdpr_notice": "🔒 Avviso Protezione Dati: Questa risposta è stata elaborata in piena conformità con il regolamento GDPR. I vostri dati sono stati gestiti esclusivamente dai nostri sistemi e agenti basati nell'UE.",
+        "security_notice": "🔐 Avviso Sicurezza: La vostra richiesta è stata elaborata attraverso la nostra infrastruttura multi-regionale sicura con appropriate misure di protezione dati.",
+        "collaboration_footer": "Questa risposta è stata generata attraverso la collaborazione tra i nostri team di supporto US e UE, assicurando che riceviate la massima qualità del servizio in tutte le regioni.",
+        "best_regards": "Cordiali saluti,\nTeam Global Customer Support",
+        "footer": "🇺🇸 Operazioni US • 🇪🇺 Conformità UE • 🌍 Eccellenza Multi-Regionale"
+    },
+    "French": {
+        "greeting": "Bonjour",
+        "thank_you": "Merci d'avoir contacté notre équipe de Global Customer Support.",
+        "processed_through": "Votre demande a été traitée par notre système avancé de collaboration multi-régionale",
+        "including_specialists": ", incluant nos spécialistes de conformité UE",
+        "technical_analysis": "Notre analyse technique indique que vous rencontrez des problèmes avec votre {product}. En tant que client estimé de niveau {tier}, ceci a été escaladé à notre équipe spécialisée qui vous contactera via {channel} dans les 2 heures.",
+        "billing_inquiry": "Concernant votre demande de facturation pour {product}, nos spécialistes de facturation (coordonnant entre nos équipes US et UE) examineront votre compte et vous contacteront via {channel}.",
+        "general_inquiry": "Votre demande générale a été soigneusement examinée par notre équipe de support multi-régionale. Basé sur votre statut niveau {tier} et l'historique de service, nous fournirons une assistance complète.",
+        "gdpr_notice": "🔒 Avis Protection des Données: Cette réponse a été traitée en pleine conformité avec le règlement RGPD. Vos données ont été gérées exclusivement par nos systèmes et agents basés dans l'UE.",
+        "security_notice": "🔐 Avis Sécurité: Votre demande a été traitée par notre infrastructure multi-régionale sécurisée avec des mesures appropriées de protection des données.",
+        "collaboration_footer": "Cette réponse a été générée par la collaboration entre nos équipes de support US et UE, garantissant que vous recevez la plus haute qualité de service dans toutes les régions.",
+        "best_regards": "Cordialement,\nÉquipe Global Customer Support",
+        "footer": "🇺🇸 Opérations US • 🇪🇺 Conformité UE • 🌍 Excellence Multi-Régionale"
+    },
+    "English": {
+        "greeting": "Hello",
+        "thank_you": "Thank you for contacting our Global Customer Support team.",
+        "processed_through": "Your inquiry has been processed through our advanced multi-region collaboration system",
+        "including_specialists": ", including our EU compliance specialists",
+        "technical_analysis": "Our technical analysis indicates you're experiencing issues with your {product}. As a valued {tier} tier customer, this has been escalated to our specialist team who will contact you via {channel} within 2 hours.",
+        "billing_inquiry": "Regarding your billing inquiry for {product}, our billing specialists (coordinating between our US and EU teams) will review your account and contact you via {channel}.",
+        "general_inquiry": "Your general inquiry has been thoroughly reviewed by our multi-regional support team. Based on your {tier} tier status and service history, we'll provide comprehensive assistance.",
+        "gdpr_notice": "🔒 Data Protection Notice: This response was processed in full compliance with GDPR regulations. Your data was handled exclusively by our EU-based systems and agents.",
+        "security_notice": "🔐 Security Notice: Your inquiry was processed through our secure multi-regional infrastructure with appropriate data protection measures.",
+        "collaboration_footer": "This response was generated through collaboration between our US and EU support teams, ensuring you receive the highest quality of service across all regions.",
+        "best_regards": "Best regards,\nGlobal Customer Support Team",
+        "footer": "🇺🇸 US Operations • 🇪🇺 EU Compliance • 🌍 Multi-Regional Excellence"
+    }
+}
+
+
+# (literal, field) pairs as produced by string.Formatter().parse
+CompiledTemplate = Tuple[Tuple[str, Optional[str]], ...]
+# Literal runs with per-response slots between them: literals[0] slot[0] literals[1] ...
+Skeleton = Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+
+def _compile(language: str, key: str, text: str) -> CompiledTemplate:
+    parts = []
+    for literal, field, spec, conversion in Formatter().parse(text):
+        if field is not None and (field not in TEMPLATE_FIELDS[key] or spec or conversion):
+            raise ValueError(f"Template {language}/{key} uses unsupported field {{{field}}}")
+        parts.append((literal, field))
+    return tuple(parts)
+
+
+class TemplateCatalog:
+    """
+    Response templates per language, parsed once when loaded.
+
+    A rendered response is fixed by its segment (language, category, tier, channel,
+    region, EU involvement) apart from the customer name and product, so each
+    segment's response is built once as a skeleton of literal runs and slots and
+    every later render is a single join.
+    """
+
+    def __init__(self, templates: Optional[Dict[str, Dict[str, str]]] = None, fallback: str = "English"):
+        self.fallback = fallback
+        self._templates: Dict[str, Dict[str, CompiledTemplate]] = {}
+        self._skeletons: Dict[Tuple[str, str, str, str, str, bool], Skeleton] = {}
+        for language, language_templates in (templates or BUILTIN_TEMPLATES).items():
+            self.add_language(language, language_templates)
+
+    @property
+    def languages(self) -> List[str]:
+        return list(self._templates)
+
+    def add_language(self, language: str, templates: Dict[str, str]) -> None:
+        """Add or replace a language; every template key must be present."""
+        missing = [key for key in TEMPLATE_FIELDS if key not in templates]
+        if missing:
+            raise ValueError(f"Templates for {language} are missing: {', '.join(missing)}")
+        self._templates[language] = {key: _compile(language, key, templates[key]) for key in TEMPLATE_FIELDS}
+        self._skeletons.clear()
+
+    def load_directory(self, path: str) -> List[str]:
+        """Load every `<Language>.json` file in `path`; returns the languages loaded."""
+        loaded = []
+        for file in sorted(Path(path).glob("*.json")):
+            with open(file, encoding="utf-8") as f:
+                data = json.load(f)
+            language = data.get("language", file.stem)
+            self.add_language(language, data["templates"] if "templates" in data else data)
+            loaded.append(language)
+        return loaded
+
+    def _skeleton(self, language: str, category: str, tier: str, channel: str, region: str, eu_collaboration: bool) -> Skeleton:
+        key = (language, category, tier, channel, region, eu_collaboration)
+        skeleton = self._skeletons.get(key)
+        if skeleton is not None:
+            return skeleton
+
+        lang = self._templates.get(language) or self._templates[self.fallback]
+        fixed = {"tier": tier, "channel": channel}
+        # Template keys, slots and literal separators in response order
+        sequence = ["greeting", " ", "name", ",\n\n", "thank_you", " ", "processed_through"]
+        if eu_collaboration:
+            sequence.append("including_specialists")
+        sequence.append(".\n\n")
+        if category in CATEGORY_TEMPLATES:
+            sequence += [CATEGORY_TEMPLATES[category], "\n\n"]
+        sequence += [
+            "gdpr_notice" if region == "EU" else "security_notice", "\n\n",
+            "collaboration_footer", "\n\n",
+            "best_regards", "\n",
+            "footer",
+        ]
+
+        # Flatten into literal runs, substituting segment fields and leaving slots open
+        literals, slots, run = [], [], []
+        for item in sequence:
+            if item in SLOTS:
+                parts = (("", item),)
+            elif item in TEMPLATE_FIELDS:
+                parts = lang[item]
+            else:
+                run.append(item)
+                continue
+            for literal, field in parts:
+                run.append(literal)
+                if field in fixed:
+                    run.append(fixed[field])
+                elif field is not None:
+                    literals.append("".join(run))
+                    slots.append(field)
+                    run = []
+        literals.append("".join(run))
+        skeleton = self._skeletons[key] = (tuple(literals), tuple(slots))
+        return skeleton
+
+    def render(
+        self,
+        language: str,
+        category: str,
+        tier: str,
+        channel: str,
+        region: str,
+        eu_collaboration: bool,
+        name: str,
+        product: str,
+    ) -> str:
+        """Customer response for one segment, with the per-response values filled in."""
+        literals, slots = self._skeleton(language, category, tier, channel, region, eu_collaboration)
+        values = {"name": name, "product": product}
+        pieces = [literals[0]]
+        for slot, literal in zip(slots, literals[1:]):
+            pieces.append(values[slot])
+            pieces.append(literal)
+        return "".join(pieces)
+
+    def cache_info(self) -> Dict[str, int]:
+        return {"languages": len(self._templates), "cached_segments": len(self._skeletons)}
+
+
+def default_catalog() -> TemplateCatalog:
+    """Built-in languages plus any JSON files in RESPONSE_TEMPLATES_DIR."""
+    catalog = TemplateCatalog()
+    directory = os.getenv("RESPONSE_TEMPLATES_DIR")
+    if directory:
+        catalog.load_directory(directory)
+    return catalog
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Region-Local Routing Policy
+Decides, per pipeline stage, which regional endpoint runs it, keeping customer
+data in its home region and skipping the EU stage when a ticket does not need it.
+Also chooses the pipeline topology: the full stage-by-stage pipeline, or a single
+call that answers the ticket directly.
+"""
+
+import itertools
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+REGION_ENDPOINTS = {
+    "US": "http://20.185.179.136:61100/v1",
+    "EU": "http://9.163.149.120:61102/v1",
+}
+
+DEFAULT_MODEL = "openai/Qwen2.5-7B-Instruct-GGUF"
+
+STAGES = ("analysis", "data_access", "response")
+
+# "full": analysis, optional EU data access, response; "single_call": one prompt that
+# triages and answers the ticket with the compliance rules inlined
+FULL = "full"
+SINGLE_CALL = "single_call"
+TOPOLOGIES = (FULL, SINGLE_CALL)
+
+# The original fixed topology: US analysis, EU data access, US response for every ticket
+BASELINE_PLAN = {"analysis": "US", "data_access": "EU", "response": "US"}
+
+# Signals that a US customer's ticket touches EU data or regulation
+EU_RELEVANCE = re.compile(
+    r"\b(gdpr|dsgvo|rgpd|eu|europe|european|data protection|data residency|sovereignty|schrems|dpa)\b",
+    re.IGNORECASE
+)
+
+
+@dataclass(slots=True)
+class RoutePlan:
+    """Per-stage region assignment for one ticket; None means the stage is skipped."""
+    data_region: str
+    stages: Dict[str, Optional[str]]
+    reasons: List[str] = field(default_factory=list)
+    optional: List[str] = field(default_factory=list)  # stages an upstream result may still skip
+    topology: str = FULL
+
+    def region(self, stage: str) -> Optional[str]:
+        return self.stages.get(stage)
+
+    def runs(self, stage: str) -> bool:
+        return self.stages.get(stage) is not None
+
+    def skip(self, stage: str, reason: str) -> None:
+        """Early exit: drop a planned stage after an upstream stage showed it is not needed."""
+        self.stages[stage] = None
+        self.reasons.append(reason)
+
+    def collapse(self, reason: str) -> None:
+        """Single-call topology: the response stage also does the analysis, in the customer's data region."""
+        self.topology = SINGLE_CALL
+        self.stages = {"analysis": None, "data_access": None, "response": self.data_region}
+        self.optional.clear()
+        self.reasons.append(reason)
+
+    @property
+    def regions(self) -> List[str]:
+        """Distinct regions used by the plan, in stage order."""
+        return list(dict.fromkeys(r for r in self.stages.values() if r is not None))
+
+    @property
+    def cross_region_hops(self) -> int:
+        """Stages that send customer context outside the customer's data region."""
+        return sum(1 for r in self.stages.values() if r is not None and r != self.data_region)
+
+    @property
+    def baseline_hops(self) -> int:
+        return sum(1 for r in BASELINE_PLAN.values() if r != self.data_region)
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "data_region": self.data_region,
+            "topology": self.topology,
+            "stages": dict(self.stages),
+            "endpoints": {stage: REGION_ENDPOINTS[r] for stage, r in self.stages.items() if r is not None},
+            "cross_region_hops": self.cross_region_hops,
+            "hops_saved": self.baseline_hops - self.cross_region_hops,
+            "reasons": list(self.reasons)
+        }
+
+
+@dataclass(frozen=True)
+class TopologyRule:
+    """Topology for tickets matching every non-empty filter; an empty filter matches anything."""
+    topology: str
+    categories: Tuple[str, ...] = ()
+    priorities: Tuple[str, ...] = ()
+    regions: Tuple[str, ...] = ()
+
+    def matches(self, region: str, query) -> bool:
+        return (
+            (not self.categories or query.category in self.categories)
+            and (not self.priorities or query.priority in self.priorities)
+            and (not self.regions or region in self.regions)
+        )
+
+    def describe(self) -> str:
+        filters = [
+            f"{name} in {'/'.join(values)}"
+            for name, values in (("category", self.categories), ("priority", self.priorities), ("region", self.regions))
+            if values
+        ]
+        return " and ".join(filters) or "all tickets"
+
+
+# Low-priority routine tickets are answered in one call; complaints always get the full pipeline
+DEFAULT_TOPOLOGY_RULES = (
+    TopologyRule(SINGLE_CALL, categories=("billing", "general", "technical"), priorities=("low",)),
+)
+
+
+def topology_rules_from_env() -> Optional[List[TopologyRule]]:
+    """
+    Topology rules from PIPELINE_TOPOLOGIES (JSON), first match wins, e.g.
+    [{"topology": "single_call", "category": ["billing", "general"], "priority": ["low", "medium"], "region": ["US"]}].
+    """
+    raw = os.getenv("PIPELINE_TOPOLOGIES")
+    if not raw:
+        return None
+    rules = []
+    for rule in json.loads(raw):
+        if rule["topology"] not in TOPOLOGIES:
+            raise ValueError(f"unknown pipeline topology {rule['topology']!r}; expected one of {', '.join(TOPOLOGIES)}")
+        rules.append(TopologyRule(
+            rule["topology"],
+            tuple(rule.get("category", ())),
+            tuple(rule.get("priority", ())),
+            tuple(rule.get("region", ()))
+        ))
+    return rules
+
+
+class TopologyPolicy:
+    """Chooses a ticket's pipeline topology from an ordered list of rules; unmatched tickets run the full pipeline."""
+
+    def __init__(self, rules: Optional[Iterable[TopologyRule]] = None):
+        if rules is None:
+            rules = topology_rules_from_env()
+        self.rules = list(DEFAULT_TOPOLOGY_RULES if rules is None else rules)
+
+    def choose(self, region: str, query) -> Tuple[str, Optional[TopologyRule]]:
+        for rule in self.rules:
+            if rule.matches(region, query):
+                return rule.topology, rule
+        return FULL, None
+
+
+class RoutingPolicy:
+    """Assigns every stage to the endpoint in (or closest to) the customer's data region."""
+
+    def __init__(
+        self,
+        endpoints: Optional[Dict[str, str]] = None,
+        eu_validation_for_us: bool = False,
+        topologies: Optional[TopologyPolicy] = None,
+    ):
+        self.endpoints = endpoints or REGION_ENDPOINTS
+        # Set to restore the old behaviour of always validating US tickets in the EU
+        self.eu_validation_for_us = eu_validation_for_us
+        self.topologies = topologies or TopologyPolicy()
+
+    def home_region(self, customer) -> str:
+        return customer.region if customer.region in self.endpoints else "US"
+
+    def eu_stage_needed(self, customer, query) -> Optional[str]:
+        """Reason the EU data-access stage must run, or None if it can be skipped."""
+        if customer.region == "EU":
+            return "EU customer data is only accessible from the EU endpoint"
+        if self.eu_validation_for_us:
+            return "cross-regional validation enabled for all tickets"
+        if EU_RELEVANCE.search(query.message):
+            return "query references EU data or regulation"
+        return None
+
+    def plan(self, customer, query) -> RoutePlan:
+        home = self.home_region(customer)
+        plan = RoutePlan(data_region=home, stages={"analysis": home, "data_access": None, "response": home})
+        plan.reasons.append(f"analysis and response kept in {home} with the customer's data")
+
+        eu_reason = self.eu_stage_needed(customer, query)
+        if eu_reason:
+            plan.stages["data_access"] = "EU"
+            plan.reasons.append(eu_reason)
+            # Only a keyword match put a US ticket in the EU; the analysis may overrule it
+            if customer.region != "EU" and not self.eu_validation_for_us:
+                plan.optional.append("data_access")
+        else:
+            plan.reasons.append("EU data-access stage skipped: no EU data or regulation involved")
+
+        topology, rule = self.topologies.choose(home, query)
+        if topology == SINGLE_CALL:
+            # One call cannot span regions, so a mandatory stage elsewhere keeps the full pipeline
+            if plan.runs("data_access") and plan.region("data_access") != home and "data_access" not in plan.optional:
+                plan.reasons.append(f"single-call topology ({rule.describe()}) not applied: EU data-access stage is required")
+            else:
+                plan.collapse(f"single-call topology for {rule.describe()}: analysis merged into the response, compliance rules inlined")
+        return plan
+
+
+@dataclass(frozen=True)
+class ModelEndpoint:
+    """An OpenAI-compatible endpoint and the model it serves."""
+    base_url: str
+    model: str = DEFAULT_MODEL
+
+
+def language_endpoints_from_env() -> Dict[str, Dict[str, List[ModelEndpoint]]]:
+    """
+    Per-region, per-language endpoint pools from LANGUAGE_ENDPOINTS (JSON), e.g.
+    {"EU": {"German": [{"base_url": "http://...:61104/v1", "model": "openai/..."}]}}.
+    """
+    raw = os.getenv("LANGUAGE_ENDPOINTS")
+    if not raw:
+        return {}
+    return {
+        region: {language: [ModelEndpoint(**endpoint) for endpoint in pool] for language, pool in languages.items()}
+        for region, languages in json.loads(raw).items()
+    }
+
+
+class LanguageRouter:
+    """
+    Sends each language to a dedicated endpoint pool, round-robin, within the stage's region.
+
+    Pools are keyed by region first so language routing never moves customer data out
+    of the region the RoutingPolicy chose; languages without a pool use the region default.
+    """
+
+    def __init__(self, pools: Optional[Dict[str, Dict[str, List[ModelEndpoint]]]] = None):
+        self.pools = language_endpoints_from_env() if pools is None else pools
+        self._cycles: Dict[tuple, Iterator[ModelEndpoint]] = {
+            (region, language): itertools.cycle(pool)
+            for region, languages in self.pools.items() for language, pool in languages.items() if pool
+        }
+
+    def endpoint(self, region: str, language: str) -> Optional[ModelEndpoint]:
+        cycle = self._cycles.get((region, language))
+        return next(cycle) if cycle is not None else None
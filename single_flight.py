@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Query Coalescing
+Concurrent identical queries attach to one in-flight pipeline run and share its
+event stream instead of each starting their own LLM calls. Each run keeps a replay
+buffer so disconnected clients can resume, and is cancelled if every client leaves.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from cancellation import CancellationToken, QueryCancelled
+
+
+class Flight:
+    """One in-flight event stream, produced on a background thread and replayed to every subscriber."""
+
+    def __init__(self, key: Hashable, leader_id: str, on_idle: Optional[Callable[["Flight"], None]] = None):
+        self.key = key
+        self.id = leader_id
+        self.leader_id = leader_id
+        self.subscribers = 0
+        self.active = 0  # subscribers currently attached
+        self.last_detached = time.monotonic()  # when the last subscriber left (or the flight started)
+        self.idle_timer: Optional[threading.Timer] = None
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        self.token = CancellationToken()
+        self.finished_at: Optional[float] = None
+        self._on_idle = on_idle
+        self._condition = threading.Condition()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        with self._condition:
+            self.events.append(event)
+            self._condition.notify_all()
+
+    def finish(self) -> None:
+        with self._condition:
+            self.done = True
+            self.finished_at = time.monotonic()
+            self._condition.notify_all()
+        self.set_idle_timer(None)
+
+    def set_idle_timer(self, timer: Optional[threading.Timer]) -> None:
+        """Replace the pending grace timer, cancelling the old one."""
+        with self._condition:
+            previous, self.idle_timer = self.idle_timer, timer
+        if previous is not None:
+            previous.cancel()
+
+    def follow(self, start: int = 0, keepalive: Optional[float] = None) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+        """
+        (index, event) pairs from `start` onward, waiting for new events until the flight ends.
+        With `keepalive`, yields (index, None) whenever that many seconds pass without an event.
+        """
+        index = start
+        with self._condition:
+            self.active += 1
+        self.set_idle_timer(None)  # reattached within the grace period
+        try:
+            while True:
+                with self._condition:
+                    if index >= len(self.events) and not self.done:
+                        self._condition.wait(keepalive)
+                    batch = self.events[index:]
+                    finished = self.done
+                if not batch and not finished:
+                    yield index, None
+                    continue
+                for event in batch:
+                    yield index, event
+                    index += 1
+                if finished and index >= len(self.events):
+                    return
+        finally:
+            with self._condition:
+                self.active -= 1
+                self.last_detached = time.monotonic()
+                idle = self.active == 0 and not self.done
+            if idle and self._on_idle is not None:
+                self._on_idle(self)
+
+    def subscribe(self) -> Iterator[Dict[str, Any]]:
+        """Every event from the start of the flight, then new ones as they are produced."""
+        return (event for _, event in self.follow())
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one running event stream.
+
+    A flight whose subscribers have all gone is cancelled after `grace_period` seconds
+    unless one reattaches; finished flights stay resumable by id for `retention` seconds.
+    """
+
+    def __init__(self, grace_period: float = 30.0, retention: float = 300.0):
+        self.grace_period = grace_period
+        self.retention = retention
+        self._flights: Dict[Hashable, Flight] = {}
+        self._by_id: Dict[str, Flight] = {}
+        self._finished: Deque[Tuple[float, str]] = deque()  # (finished at, flight id) in finish order
+        self._lock = threading.Lock()
+        self.started = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.aborted_calls = 0
+        self.wasted_tokens = 0
+
+    def join(self, key: Hashable, leader_id: str, start: Callable[[CancellationToken], Iterator[Dict[str, Any]]]) -> Tuple[Flight, bool]:
+        """
+        The flight for `key`, starting it with `start(token)` if none is running; also whether we joined one.
+        `start` should check the token between stages and pass it to its LLM calls.
+        """
+        with self._lock:
+            self._prune()
+            flight = self._flights.get(key)
+            joined = flight is not None
+            if joined:
+                self.coalesced += 1
+            else:
+                flight = self._flights[key] = self._by_id[leader_id] = Flight(key, leader_id, self._idle)
+                self.started += 1
+            flight.subscribers += 1
+        if not joined:
+            threading.Thread(target=self._run, args=(flight, start), name="single-flight", daemon=True).start()
+            self._idle(flight)  # also covers a client that disconnects before reading any event
+        return flight, joined
+
+    def get(self, flight_id: str) -> Optional[Flight]:
+        """A running or recently finished flight, for clients resuming a stream."""
+        with self._lock:
+            self._prune()
+            return self._by_id.get(flight_id)
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.retention
+        while self._finished and self._finished[0][0] < cutoff:
+            self._by_id.pop(self._finished.popleft()[1], None)
+
+    def _idle(self, flight: Flight, delay: Optional[float] = None) -> None:
+        """(Re)start the flight's grace timer; a reattach cancels it, the next detach restarts it."""
+        timer = threading.Timer(self.grace_period if delay is None else delay, self._expire, args=(flight,))
+        timer.daemon = True
+        flight.set_idle_timer(timer)
+        timer.start()
+
+    def _expire(self, flight: Flight) -> None:
+        with flight._condition:
+            if flight.active or flight.done:
+                return
+            remaining = flight.last_detached + self.grace_period - time.monotonic()
+        if remaining > 0:
+            self._idle(flight, remaining)
+            return
+        # Nobody reattached during the grace period: stop spending LLM time on it
+        flight.token.cancel(f"no client attached for {self.grace_period:g}s")
+
+    def _run(self, flight: Flight, start: Callable[[CancellationToken], Iterator[Dict[str, Any]]]) -> None:
+        try:
+            events = start(flight.token)
+            for event in events:
+                flight.publish(event)
+                if flight.cancelled:
+                    events.close()  # streams that ignore the token stop at their next event
+                    flight.token.raise_if_cancelled()
+        except QueryCancelled:
+            report = flight.token.report()
+            with self._lock:
+                self.cancelled += 1
+                self.aborted_calls += report["aborted_llm_calls"]
+                self.wasted_tokens += report["wasted_tokens"]
+            flight.publish({
+                "type": "cancelled",
+                "reason": flight.token.reason,
+                "cancellation": report,
+                "timestamp": datetime.now().isoformat()
+            })
+        except Exception as e:
+            flight.publish({"error": str(e), "timestamp": datetime.now().isoformat()})
+        finally:
+            # Later identical queries start a fresh run rather than replaying a finished one
+            with self._lock:
+                self._flights.pop(flight.key, None)
+                self._finished.append((time.monotonic(), flight.id))
+            flight.finish()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "resumable": len(self._by_id),
+                "started": self.started,
+                "coalesced": self.coalesced,
+                "cancelled": self.cancelled,
+                "aborted_llm_calls": self.aborted_calls,
+                "wasted_tokens": self.wasted_tokens
+            }
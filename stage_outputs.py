@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Structured Stage Outputs
+JSON schemas for the intermediate pipeline stages and validated parsing of their
+outputs into typed results the pipeline can act on.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List
+
+
+URGENCY_LEVELS = ["low", "medium", "high", "urgent"]
+CONFIDENCE_LEVELS = ["low", "medium", "high"]
+COMPLIANCE_STATUSES = ["compliant", "restricted", "non_compliant"]
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "maxLength": 200},
+        "urgency": {"type": "string", "enum": URGENCY_LEVELS},
+        "needs_eu_collaboration": {"type": "boolean"},
+        "collaboration_reason": {"type": "string", "maxLength": 200},
+        "compliance_flags": {"type": "array", "items": {"type": "string"}, "maxItems": 6},
+        "recommended_action": {"type": "string", "maxLength": 300},
+        # Self-assessment that lets a model cascade escalate uncertain triage to a larger model
+        "confidence": {"type": "string", "enum": CONFIDENCE_LEVELS},
+    },
+    "required": ["intent", "urgency", "needs_eu_collaboration", "collaboration_reason", "compliance_flags", "recommended_action", "confidence"],
+    "additionalProperties": False,
+}
+
+DATA_ACCESS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "compliance_status": {"type": "string", "enum": COMPLIANCE_STATUSES},
+        "gdpr_consent_verified": {"type": "boolean"},
+        "customer_insights": {"type": "array", "items": {"type": "string", "maxLength": 200}, "maxItems": 5},
+        "risks": {"type": "array", "items": {"type": "string", "maxLength": 200}, "maxItems": 5},
+        "recommended_action": {"type": "string", "maxLength": 300},
+    },
+    "required": ["compliance_status", "gdpr_consent_verified", "customer_insights", "risks", "recommended_action"],
+    "additionalProperties": False,
+}
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+_TYPES = {"string": str, "boolean": bool, "array": list, "object": dict}
+
+
+class StageOutputError(ValueError):
+    """Raised when a stage's output does not match its schema."""
+
+
+@dataclass(slots=True)
+class AnalysisResult:
+    intent: str
+    urgency: str
+    needs_eu_collaboration: bool
+    collaboration_reason: str
+    compliance_flags: List[str] = field(default_factory=list)
+    recommended_action: str = ""
+    confidence: str = "high"
+
+
+@dataclass(slots=True)
+class DataAccessResult:
+    compliance_status: str
+    gdpr_consent_verified: bool
+    customer_insights: List[str] = field(default_factory=list)
+    risks: List[str] = field(default_factory=list)
+    recommended_action: str = ""
+
+
+STAGE_SCHEMAS = {
+    "analysis": (ANALYSIS_SCHEMA, AnalysisResult),
+    "data_access": (DATA_ACCESS_SCHEMA, DataAccessResult),
+}
+
+
+def response_format(stage: str) -> Dict[str, Any]:
+    """`response_format` for an OpenAI-compatible llama.cpp server: grammar-constrained JSON."""
+    return {"type": "json_object", "schema": STAGE_SCHEMAS[stage][0]}
+
+
+def schema_instructions(stage: str) -> str:
+    """Prompt suffix describing the required output, for servers that ignore `response_format`."""
+    return (
+        "Respond with ONLY a JSON object (no prose, no code fences) matching this JSON schema:\n"
+        f"{json.dumps(STAGE_SCHEMAS[stage][0], separators=(',', ':'))}"
+    )
+
+
+def _check(value: Any, schema: Dict[str, Any], path: str) -> None:
+    expected = _TYPES[schema["type"]]
+    if not isinstance(value, expected):
+        raise StageOutputError(f"{path}: expected {schema['type']}, got {type(value).__name__}")
+    if "enum" in schema and value not in schema["enum"]:
+        raise StageOutputError(f"{path}: {value!r} is not one of {schema['enum']}")
+    if schema["type"] == "array":
+        for i, item in enumerate(value):
+            _check(item, schema["items"], f"{path}[{i}]")
+    elif schema["type"] == "object":
+        missing = [name for name in schema["required"] if name not in value]
+        if missing:
+            raise StageOutputError(f"{path}: missing {', '.join(missing)}")
+        for name, item in value.items():
+            if name in schema["properties"]:
+                _check(item, schema["properties"][name], f"{path}.{name}")
+
+
+def parse_stage_output(text: str, stage: str):
+    """Parse and validate a stage's raw output into its typed result."""
+    schema, result_type = STAGE_SCHEMAS[stage]
+    match = _JSON_OBJECT.search(text)
+    if match is None:
+        raise StageOutputError(f"{stage}: no JSON object in output")
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        raise StageOutputError(f"{stage}: invalid JSON ({e.msg})") from e
+    _check(data, schema, stage)
+    # Unknown keys are dropped rather than rejected; the grammar already prevents them
+    return result_type(**{f.name: data[f.name] for f in fields(result_type) if f.name in data})
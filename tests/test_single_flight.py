@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Grace Period Tests
+Run with: uv run python -m unittest discover tests
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from single_flight import SingleFlight
+
+GRACE = 0.5
+
+
+def until_cancelled(token):
+    """A run that publishes one event, then waits for cancellation."""
+    yield {"type": "step"}
+    while not token.wait(0.01):
+        pass
+    token.raise_if_cancelled()
+
+
+def read_one(flight, start=0):
+    """Attach, read one event and detach, like a client that drops mid-stream."""
+    events = flight.follow(start)
+    next(events)
+    events.close()
+
+
+class GracePeriodTest(unittest.TestCase):
+
+    def setUp(self):
+        self.flights = SingleFlight(grace_period=GRACE)
+        self.flight, _ = self.flights.join("key", "q-1", until_cancelled)
+        self.addCleanup(self.flight.token.cancel, "test finished")
+
+    def test_grace_period_restarts_after_reconnect_and_drop(self):
+        read_one(self.flight)
+        time.sleep(GRACE * 0.6)
+        read_one(self.flight)  # reconnect, then drop again
+        # Past the grace period since the first detach, just under it since the last one
+        time.sleep(GRACE * 0.8)
+        self.assertFalse(self.flight.cancelled)
+        time.sleep(GRACE * 0.5)
+        self.assertTrue(self.flight.cancelled)
+
+    def test_attached_client_keeps_flight_running(self):
+        events = self.flight.follow()
+        next(events)
+        time.sleep(GRACE * 1.5)
+        self.assertFalse(self.flight.cancelled)
+        events.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Token Budget Tests
+Run with: uv run python -m unittest discover tests
+"""
+
+import json
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_compression import estimate_tokens
+from load_shedding import DEGRADED_BUDGET_SCALE
+from stage_outputs import parse_stage_output
+from token_budgets import CATEGORY_SCALE, PRIORITY_SCALE, BudgetPolicy
+
+# Realistic valid outputs of the JSON-schema stages
+STAGE_INSTANCES = {
+    "analysis": {
+        "intent": "Customer was charged twice for the Premium Analytics Suite subscription this month and wants a refund",
+        "urgency": "medium",
+        "needs_eu_collaboration": True,
+        "collaboration_reason": "EU customer: billing records and consent must be checked by the EU data team",
+        "compliance_flags": ["gdpr", "payment_data"],
+        "recommended_action": "Verify the duplicate charge in the EU billing system and refund the second payment",
+        "confidence": "high",
+    },
+    "data_access": {
+        "compliance_status": "compliant",
+        "gdpr_consent_verified": True,
+        "customer_insights": ["Gold tier customer since 2021 with monthly purchases", "Two charges for invoice INV-2024-0301"],
+        "risks": ["Refund must not expose payment details outside the EU"],
+        "recommended_action": "Approve the refund of the duplicate charge and confirm by email in German",
+    },
+}
+
+
+class DegradedBudgetTest(unittest.TestCase):
+
+    def test_degraded_budget_fits_a_valid_schema_instance(self):
+        policy = BudgetPolicy(load_scale=lambda: DEGRADED_BUDGET_SCALE)
+        for stage, instance in STAGE_INSTANCES.items():
+            text = json.dumps(instance, indent=2)
+            parse_stage_output(text, stage)
+            needed = estimate_tokens(text)
+            for category in CATEGORY_SCALE:
+                for priority in PRIORITY_SCALE:
+                    query = SimpleNamespace(category=category, priority=priority)
+                    with self.subTest(stage=stage, category=category, priority=priority):
+                        self.assertGreaterEqual(policy.budget_for(stage, query).max_tokens, needed)
+
+    def test_degraded_level_still_shortens_the_response(self):
+        query = SimpleNamespace(category="billing", priority="medium")
+        normal = BudgetPolicy().budget_for("response", query)
+        degraded = BudgetPolicy(load_scale=lambda: DEGRADED_BUDGET_SCALE).budget_for("response", query)
+        self.assertLess(degraded.max_tokens, normal.max_tokens)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Per-Stage Token Budgets
+Generation limits (max_tokens, temperature, stop sequences) for each pipeline stage,
+scaled by the ticket's category and priority.
+"""
+
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class StageBudget:
+    """Generation limits for one LLM stage; hashable so LLMs can be cached per budget."""
+    max_tokens: int
+    temperature: float
+    stop: Tuple[str, ...] = ()
+
+    def scaled(self, factor: float) -> "StageBudget":
+        # Round to a multiple of 32 so similar tickets share one cached LLM
+        return StageBudget(max(32, int(self.max_tokens * factor) // 32 * 32), self.temperature, self.stop)
+
+
+# Intermediate stages only feed the response prompt, so they get a fraction of its budget
+# and a low temperature; the customer-facing response keeps room for a full answer.
+DEFAULT_BUDGETS = {
+    "analysis": StageBudget(max_tokens=256, temperature=0.2),
+    "data_access": StageBudget(max_tokens=256, temperature=0.2),
+    "response": StageBudget(max_tokens=640, temperature=0.6, stop=("\nThought:",)),
+}
+
+# Floors for stages that must emit a complete JSON object (see stage_outputs.py): truncated
+# output fails validation and falls back, or escalates to a larger model under a cascade.
+# A typical valid analysis object is about 125 tokens.
+STRUCTURED_MIN_TOKENS = {"analysis": 192, "data_access": 192}
+
+CATEGORY_SCALE = {"billing": 0.75, "general": 0.75, "technical": 1.25, "complaint": 1.0}
+PRIORITY_SCALE = {"low": 0.75, "medium": 1.0, "high": 1.0, "urgent": 1.25}
+
+
+class BudgetPolicy:
+    """Resolves the budget for a stage of a ticket: explicit overrides first, then scaled defaults."""
+
+    def __init__(
+        self,
+        defaults: Optional[Dict[str, StageBudget]] = None,
+        overrides: Optional[Dict[Tuple[str, str], StageBudget]] = None,
+        load_scale: Optional[Callable[[], float]] = None,
+        minimums: Optional[Dict[str, int]] = None,
+    ):
+        self.defaults = defaults or DEFAULT_BUDGETS
+        # (stage, category) -> budget, bypassing the scale tables
+        self.overrides = overrides or {}
+        # Current overload factor, applied only to free-text stages (overrides included)
+        self.load_scale = load_scale
+        # stage -> max_tokens floor for structured stages, which are never load-scaled
+        self.minimums = STRUCTURED_MIN_TOKENS if minimums is None else minimums
+
+    def budget_for(self, stage: str, query) -> StageBudget:
+        floor = self.minimums.get(stage)
+        load = self.load_scale() if self.load_scale is not None and floor is None else 1.0
+        override = self.overrides.get((stage, query.category))
+        if override is not None:
+            budget = override if load == 1.0 else override.scaled(load)
+        else:
+            factor = CATEGORY_SCALE.get(query.category, 1.0) * PRIORITY_SCALE.get(query.priority, 1.0)
+            budget = self.defaults[stage].scaled(factor * load)
+        if floor is not None and budget.max_tokens < floor:
+            budget = replace(budget, max_tokens=floor)
+        return budget
+
+
+def usage_report(budget: StageBudget, crew_output) -> Dict[str, object]:
+    """Tokens a stage generated against its budget, from the crew's LiteLLM usage totals."""
+    usage = getattr(crew_output, "token_usage", None)
+    generated = getattr(usage, "completion_tokens", 0) or 0
+    requests = getattr(usage, "successful_requests", 0) or 0
+    return {
+        "generated_tokens": generated,
+        "max_tokens": budget.max_tokens,
+        # An agent may call the LLM more than once per stage; each call gets the full budget
+        "llm_calls": requests,
+        "utilization": round(generated / (budget.max_tokens * max(requests, 1)), 3),
+        "temperature": budget.temperature
+    }
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Endpoint Warm-Up
+Primes every configured LLM endpoint at startup: each agent role's static system prompt
+is sent with a one-token completion, so model load, the server's prompt-prefix cache and
+connection setup are paid before the first ticket instead of by it.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import litellm
+
+from routing import ModelEndpoint
+
+WARMUP_MESSAGE = "Reply with OK."
+
+
+@dataclass(frozen=True)
+class WarmupTarget:
+    """One endpoint and the system prompts of the agent roles that run on it."""
+    endpoint: ModelEndpoint
+    system_prompts: Tuple[str, ...]
+    api_key: str = "local"
+
+
+class Warmup:
+    """
+    Warms all targets in parallel on a background thread. The service counts as ready once
+    every endpoint has answered (or failed), or once `timeout_s` has passed, whichever is first.
+    """
+
+    def __init__(self, targets: Sequence[WarmupTarget], timeout_s: float = 60.0):
+        self.targets = list(targets)
+        self.timeout_s = timeout_s
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(endpoint: ModelEndpoint) -> str:
+        return f"{endpoint.model} @ {endpoint.base_url}"
+
+    def _warm(self, target: WarmupTarget) -> None:
+        endpoint = target.endpoint
+        result: Dict[str, Any] = {"prompts": len(target.system_prompts)}
+        started = time.perf_counter()
+        try:
+            for i, system_prompt in enumerate(target.system_prompts):
+                litellm.completion(
+                    model=endpoint.model,
+                    base_url=endpoint.base_url,
+                    api_key=target.api_key,
+                    messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": WARMUP_MESSAGE}],
+                    max_tokens=1,
+                    temperature=0.0,
+                    timeout=self.timeout_s
+                )
+                if i == 0:
+                    # The first call also pays for connection setup and, if cold, model load
+                    result["first_call_ms"] = round((time.perf_counter() - started) * 1000)
+            result["status"] = "ok"
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)[:200]
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000)
+        with self._lock:
+            self._results[self.key(endpoint)] = result
+        print(f"🔥 Warmed {endpoint.model} @ {endpoint.base_url}: {result['status']} in {result['latency_ms']} ms")
+
+    def _run(self) -> None:
+        with ThreadPoolExecutor(max_workers=max(1, len(self.targets)), thread_name_prefix="warmup") as pool:
+            list(pool.map(self._warm, self.targets))
+        self.finished_at = time.perf_counter()
+        self._done.set()
+
+    def start(self) -> "Warmup":
+        self.started_at = time.perf_counter()
+        threading.Thread(target=self._run, name="warmup", daemon=True).start()
+        return self
+
+    @property
+    def ready(self) -> bool:
+        if self._done.is_set():
+            return True
+        return self.started_at is not None and time.perf_counter() - self.started_at >= self.timeout_s
+
+    def wait(self) -> bool:
+        """Block until warm-up finishes or times out; True if every endpoint answered in time."""
+        remaining = self.timeout_s - (time.perf_counter() - self.started_at) if self.started_at is not None else 0
+        return self._done.wait(max(remaining, 0)) and all(r["status"] == "ok" for r in self._results.values())
+
+    def report(self) -> Dict[str, Any]:
+        if self._done.is_set():
+            state = "ready"
+        elif self.ready:
+            state = "timed_out"
+        else:
+            state = "warming"
+        end = self.finished_at or time.perf_counter()
+        with self._lock:
+            endpoints = {
+                self.key(target.endpoint): self._results.get(self.key(target.endpoint), {"status": "pending"})
+                for target in self.targets
+            }
+        return {
+            "state": state,
+            "elapsed_ms": round((end - self.started_at) * 1000) if self.started_at is not None else 0,
+            "endpoints": endpoints
+        }
+
+
+def warmup_enabled() -> bool:
+    """WARMUP=off skips warm-up, as does replaying an LLM cassette (no endpoint is contacted)."""
+    return os.environ.get("WARMUP", "on").lower() not in ("0", "off", "false", "no") and os.environ.get("LLM_CASSETTE") != "replay"
+
+
+def warmup_timeout() -> float:
+    return float(os.environ.get("WARMUP_TIMEOUT_S", 60.0))